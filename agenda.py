@@ -0,0 +1,198 @@
+"""Agendas individuais dos médicos (iCalendar e CSV).
+
+As escalas são percorridas uma única vez, em sequência (cada mês é lido,
+agrupado por médico e descartado), e depois cada médico recebe o seu
+arquivo ``.ics``, que pode ser importado no celular, e opcionalmente um CSV.
+Os horários vêm de ``escalador.HORARIOS``: a Noite começa às 19h e termina
+às 7h do dia seguinte.
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from armazenamento import ERROS_LEITURA
+from escalador import HORARIOS
+from modelo import CABECALHOS, COLUNAS_FIXAS, MESES, TURNOS, TabelaNomes, ler_escala, meses_do_periodo
+from unidades import abrir_indice, listar_unidades, slug_unidade
+
+
+PRODID = "-//Plantao Hospital//Escalas de Plantao//PT-BR"
+CABECALHOS_AGENDA = ['Data', 'Turno', 'Início', 'Fim', 'Unidade']
+LIMITE_LINHA_ICS = 75
+
+
+def plantoes_por_medico(escalas):
+    """Uma passada por ``(unidade, escala)``: {nome: [(início, fim, turno, unidade), ...]}."""
+    plantoes = {}
+    n = len(TURNOS)
+    horarios = [HORARIOS[turno] for turno in TURNOS]
+    for unidade, escala in escalas:
+        nomes = escala.nomes.nomes
+        primeiro = datetime(escala.ano, escala.mes, 1)
+        for pos, id_medico in enumerate(escala.celulas):
+            if id_medico:
+                row, turno = divmod(pos, n)
+                dia = primeiro + timedelta(days=row)
+                inicio, fim = horarios[turno]
+                plantoes.setdefault(nomes[id_medico], []).append(
+                    (dia + timedelta(hours=inicio), dia + timedelta(hours=fim), turno, unidade))
+    return plantoes
+
+
+def _escapar(texto):
+    return (texto.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _dobrar(linha):
+    """Quebra a linha em até 75 bytes, continuando com um espaço (RFC 5545)."""
+    if len(linha.encode('utf-8')) <= LIMITE_LINHA_ICS:
+        return linha
+    partes = []
+    atual = ''
+    tamanho = 0
+    for caractere in linha:
+        largura = len(caractere.encode('utf-8'))
+        if tamanho + largura > LIMITE_LINHA_ICS:
+            partes.append(atual)
+            atual = ' '
+            tamanho = 1
+        atual += caractere
+        tamanho += largura
+    partes.append(atual)
+    return '\r\n'.join(partes)
+
+
+def calendario_ics(nome, plantoes, carimbo=None):
+    """Texto iCalendar com os plantões de um médico.
+
+    Os horários vão sem fuso (hora local de quem importa). O UID depende só
+    de data, turno, unidade e médico, então reimportar uma agenda atualizada
+    substitui os eventos em vez de duplicá-los.
+    """
+    carimbo = carimbo or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    medico = slug_unidade(nome)
+    linhas = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN',
+              'METHOD:PUBLISH', f'X-WR-CALNAME:{_escapar("Plantões - " + nome)}']
+    for inicio, fim, turno, unidade in sorted(plantoes):
+        rotulo = CABECALHOS[COLUNAS_FIXAS + turno]
+        linhas.extend([
+            'BEGIN:VEVENT',
+            f'UID:{inicio:%Y%m%d}-{TURNOS[turno]}-{slug_unidade(unidade)}-{medico}@plantao-hospital',
+            f'DTSTAMP:{carimbo}',
+            f'DTSTART:{inicio:%Y%m%dT%H%M%S}',
+            f'DTEND:{fim:%Y%m%dT%H%M%S}',
+            f'SUMMARY:{_escapar(f"Plantão {rotulo} - {unidade}")}',
+            f'DESCRIPTION:{_escapar(f"Escala de Plantão {MESES[inicio.month]}/{inicio.year}")}',
+            'TRANSP:OPAQUE',
+            'END:VEVENT',
+        ])
+    linhas.append('END:VCALENDAR')
+    return ''.join(_dobrar(linha) + '\r\n' for linha in linhas)
+
+
+def agenda_csv(plantoes):
+    saida = io.StringIO()
+    writer = csv.writer(saida)
+    writer.writerow(CABECALHOS_AGENDA)
+    for inicio, fim, turno, unidade in sorted(plantoes):
+        writer.writerow([f"{inicio:%d/%m/%Y}", CABECALHOS[COLUNAS_FIXAS + turno],
+                         f"{inicio:%d/%m/%Y %H:%M}", f"{fim:%d/%m/%Y %H:%M}", unidade])
+    return saida.getvalue()
+
+
+def gerar_agendas(escalas, saida, incluir_csv=False):
+    """Grava um ``.ics`` (e um ``.csv``, se pedido) por médico em ``saida``.
+
+    ``escalas`` é um iterável de ``(unidade, escala)``, consumido uma vez.
+    Devolve os arquivos gravados.
+    """
+    saida = Path(saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    carimbo = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    arquivos = []
+    usados = set()
+    for nome, plantoes in sorted(plantoes_por_medico(escalas).items()):
+        slug = slug_unidade(nome) or "medico"
+        # Nomes que só diferem em acentos ou pontuação não podem sobrescrever um ao outro.
+        unico, n = slug, 2
+        while unico in usados:
+            unico, n = f"{slug}-{n}", n + 1
+        usados.add(unico)
+        base = saida / unico
+        caminho = base.with_suffix('.ics')
+        caminho.write_bytes(calendario_ics(nome, plantoes, carimbo).encode('utf-8'))
+        arquivos.append(caminho)
+        if incluir_csv:
+            caminho = base.with_suffix('.csv')
+            caminho.write_text(agenda_csv(plantoes), encoding='utf-8', newline='')
+            arquivos.append(caminho)
+    return arquivos
+
+
+def escalas_salvas(unidades, meses):
+    """(unidade, escala) da versão mais recente de cada mês, lidas sob demanda.
+
+    Arquivos que não podem ser lidos são pulados.
+    """
+    nomes = TabelaNomes()
+    for unidade in unidades:
+        indice = abrir_indice(unidade)
+        try:
+            indice.sincronizar()
+            caminhos = [indice.mais_recente(ano, mes) for ano, mes in meses]
+        finally:
+            indice.close()
+        for caminho in caminhos:
+            if caminho is None:
+                continue
+            try:
+                escala = ler_escala(caminho, nomes)
+            except ERROS_LEITURA:
+                # Arquivo ilegível ou corrompido: as demais agendas ainda são geradas.
+                continue
+            yield unidade, escala
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gera a agenda (.ics, opcionalmente .csv) de cada médico escalado.")
+    parser.add_argument('--mes', type=int, required=True)
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--meses', type=int, default=1,
+                        help="quantidade de meses a partir de --mes (padrão: 1)")
+    parser.add_argument('--unidade', action='append',
+                        help="apenas esta unidade (pode repetir; padrão: todas)")
+    parser.add_argument('-o', '--saida', default='agendas', help="pasta de destino (padrão: agendas)")
+    parser.add_argument('--csv', action='store_true', help="gravar também um CSV por médico")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.mes <= 12 or args.meses < 1:
+        parser.error("mês ou quantidade de meses inválidos")
+    unidades = listar_unidades()
+    for unidade in args.unidade or []:
+        if unidade not in unidades:
+            parser.error(f"unidade desconhecida: {unidade}")
+
+    meses = meses_do_periodo(args.mes, args.ano, args.meses)
+    lidas = []
+
+    def contar(escalas):
+        for item in escalas:
+            lidas.append(item[0])
+            yield item
+
+    arquivos = gerar_agendas(contar(escalas_salvas(args.unidade or unidades, meses)),
+                             args.saida, args.csv)
+    if not lidas:
+        print("nenhuma escala salva no período", file=sys.stderr)
+        return 1
+    print(f"{len(lidas)} escala(s) lida(s), {len(arquivos)} arquivo(s) gravado(s) em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
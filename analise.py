@@ -0,0 +1,170 @@
+import argparse
+import csv
+import sys
+from collections import Counter
+from itertools import compress
+
+from armazenamento import ERROS_LEITURA
+from feriados import DIAS_FIM_DE_SEMANA, FERIADO, calendario_padrao
+from modelo import TURNOS, ler_escala
+from unidades import abrir_indice, listar_unidades
+
+
+CAMPOS = ('noite', 'tarde', 'manha', 'fim_de_semana', 'feriados')
+CABECALHOS_RELATORIO = ['Médico', 'Noite', 'Tarde', 'Manhã', 'Total', 'Fim de semana', 'Feriados']
+
+
+def contar_escala(escala):
+    """Plantões por médico em uma escala: {nome: [noite, tarde, manha, fds, feriados]}.
+
+    A contagem é feita sobre as colunas de ids (fatias e máscaras do array de
+    células), sem percorrer célula por célula em Python.
+    """
+    n = len(TURNOS)
+    mascara_fds = [dia in DIAS_FIM_DE_SEMANA for dia in escala.dias_semana for _ in range(n)]
+    mascara_feriados = [tipo == FERIADO for tipo in escala.destaques for _ in range(n)]
+
+    contadores = [Counter(escala.celulas[turno::n]) for turno in range(n)]
+    contadores.append(Counter(compress(escala.celulas, mascara_fds)))
+    contadores.append(Counter(compress(escala.celulas, mascara_feriados)))
+
+    nomes = escala.nomes.nomes
+    resultado = {}
+    for campo, contador in enumerate(contadores):
+        for id_medico, quantidade in contador.items():
+            if id_medico:
+                resultado.setdefault(nomes[id_medico], [0] * len(CAMPOS))[campo] += quantidade
+    return resultado
+
+
+class AnaliseCarga:
+    """Carga de trabalho por médico sobre o histórico salvo.
+
+    Considera apenas a versão mais recente de cada mês. As contagens de cada
+    arquivo ficam guardadas no índice do histórico, associadas ao mtime do
+    arquivo, e só são recalculadas quando ele muda (ou quando o calendário de
+    feriados muda, já que ele define o que conta como feriado).
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.conn = indice.conn
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analise_arquivos (
+                arquivo TEXT PRIMARY KEY,
+                mtime_ns INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS analise_contagens (
+                arquivo TEXT,
+                nome TEXT,
+                noite INTEGER,
+                tarde INTEGER,
+                manha INTEGER,
+                fim_de_semana INTEGER,
+                feriados INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_analise_arquivo ON analise_contagens (arquivo);
+        """)
+        assinatura = calendario_padrao().assinatura()
+        if indice.ler_meta('calendario_analise') != assinatura:
+            self.conn.execute("DELETE FROM analise_arquivos")
+            self.conn.execute("DELETE FROM analise_contagens")
+            indice.gravar_meta('calendario_analise', assinatura)
+            self.conn.commit()
+
+    def _atualizar_cache(self, arquivos):
+        calculados = dict(self.conn.execute("SELECT arquivo, mtime_ns FROM analise_arquivos"))
+        for arquivo, mtime_ns in arquivos:
+            if calculados.get(arquivo) == mtime_ns:
+                continue
+            self.conn.execute("DELETE FROM analise_contagens WHERE arquivo = ?", (arquivo,))
+            try:
+                contagens = contar_escala(ler_escala(self.indice.caminho(arquivo)))
+            except ERROS_LEITURA:
+                # Arquivo ilegível fica fora do relatório; sem mtime gravado, é relido
+                # na próxima vez (depois de corrigido).
+                self.conn.execute("DELETE FROM analise_arquivos WHERE arquivo = ?", (arquivo,))
+                continue
+            self.conn.executemany(
+                "INSERT INTO analise_contagens VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(arquivo, nome, *valores) for nome, valores in contagens.items()])
+            self.conn.execute("INSERT OR REPLACE INTO analise_arquivos VALUES (?, ?)",
+                              (arquivo, mtime_ns))
+        self.conn.execute(
+            "DELETE FROM analise_contagens WHERE arquivo NOT IN (SELECT arquivo FROM escalas)")
+        self.conn.execute(
+            "DELETE FROM analise_arquivos WHERE arquivo NOT IN (SELECT arquivo FROM escalas)")
+        self.conn.commit()
+
+    def relatorio(self, ano=None):
+        self.indice.sincronizar()
+        arquivos = self.indice.mais_recentes(ano)
+        self._atualizar_cache(arquivos)
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS analise_selecao (arquivo TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM analise_selecao")
+        self.conn.executemany("INSERT INTO analise_selecao VALUES (?)",
+                              [(arquivo,) for arquivo, _ in arquivos])
+        linhas = self.conn.execute("""
+            SELECT nome, SUM(noite), SUM(tarde), SUM(manha),
+                   SUM(noite + tarde + manha) AS total, SUM(fim_de_semana), SUM(feriados)
+            FROM analise_contagens JOIN analise_selecao USING (arquivo)
+            GROUP BY nome
+            ORDER BY total DESC, nome
+        """).fetchall()
+        return linhas
+
+
+def relatorio_combinado(analises, ano=None):
+    """Soma os relatórios de várias unidades (cada uma com seu índice)."""
+    if len(analises) == 1:
+        return analises[0].relatorio(ano)
+    totais = {}
+    for analise in analises:
+        for nome, *valores in analise.relatorio(ano):
+            acumulado = totais.setdefault(nome, [0] * len(valores))
+            for i, valor in enumerate(valores):
+                acumulado[i] += valor
+    linhas = [(nome, *valores) for nome, valores in totais.items()]
+    linhas.sort(key=lambda linha: (-linha[4], linha[0]))
+    return linhas
+
+
+def salvar_csv(linhas, caminho):
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CABECALHOS_RELATORIO)
+        writer.writerows(linhas)
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Relatório de plantões por médico a partir do histórico salvo.")
+    parser.add_argument('--ano', type=int, help="considerar apenas este ano")
+    parser.add_argument('--csv', help="grava o relatório neste arquivo CSV")
+    parser.add_argument('--unidade', action='append',
+                        help="considerar apenas esta unidade (pode repetir; padrão: todas)")
+    args = parser.parse_args(argv)
+
+    unidades = listar_unidades()
+    for unidade in args.unidade or ():
+        if unidade not in unidades:
+            parser.error(f"unidade desconhecida: {unidade} (existentes: {', '.join(unidades)})")
+    indices = [abrir_indice(unidade) for unidade in args.unidade or unidades]
+    try:
+        linhas = relatorio_combinado([AnaliseCarga(indice) for indice in indices], args.ano)
+    finally:
+        for indice in indices:
+            indice.close()
+
+    if args.csv:
+        salvar_csv(linhas, args.csv)
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(CABECALHOS_RELATORIO)
+        writer.writerows(linhas)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
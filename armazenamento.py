@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+from diario import gravar_atomico, gravar_json_atomico
+from metricas import contar
+from modelo import TURNOS, Escala, ler_escala
+
+
+EXTENSAO_JSON = ".json"
+EXTENSAO_BINARIA = ".escb"
+EXTENSOES = (EXTENSAO_JSON, EXTENSAO_BINARIA)
+
+# Erros de ``ler_escala`` com um arquivo ilegível, JSON inválido ou binário
+# truncado/corrompido; quem percorre o histórico pula o arquivo.
+ERROS_LEITURA = (OSError, ValueError, struct.error, zlib.error)
+
+# Formato usado ao salvar: "json" (padrão, legível) ou "binario".
+FORMATO_SALVAR = os.environ.get('PLANTAO_FORMATO', 'json')
+
+MAGICO = b'ESCB'
+VERSAO = 1
+COMPRIMIDO = 0x01
+# mágico, versão, flags, mês, ano, médicos distintos, tamanho do cabeçalho, tamanho do corpo
+FIXO = struct.Struct('<4sBBBHHII')
+
+
+def contar_medicos(dados):
+    nomes = set()
+    for escala in dados.get('escalas', []):
+        for turno in TURNOS:
+            # Médicos do cadastro são gravados pelo id (int); os demais, pelo nome.
+            nome = escala.get(turno, '')
+            if isinstance(nome, str):
+                nome = nome.strip()
+            if nome:
+                nomes.add(nome)
+    return len(nomes)
+
+
+def _little_endian(valores):
+    """Bytes de um ``array`` em little-endian, a ordem do formato em qualquer máquina."""
+    if sys.byteorder != 'little':
+        valores = array(valores.typecode, valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def _de_little_endian(tipo, dados):
+    valores = array(tipo)
+    valores.frombytes(dados)
+    if sys.byteorder != 'little':
+        valores.byteswap()
+    return valores
+
+
+def eh_binario(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read(len(MAGICO)) == MAGICO
+
+
+def codificar(escala, ids=None, comprimir=True):
+    """Escala no formato binário compacto.
+
+    Depois de um trecho fixo (mês, ano, quantidade de médicos e tamanhos),
+    vem um cabeçalho JSON pequeno (feriados, unidade) e o corpo: a tabela de
+    nomes distintos, o id do cadastro de cada nome (0 se fora do cadastro) e
+    as colunas Noite, Tarde e Manhã como índices de 16 bits nessa tabela.
+    Datas e dias da semana não são gravados: derivam de mês/ano. O corpo é
+    comprimido com zlib quando isso o reduz. Todos os inteiros são
+    little-endian.
+    """
+    usados = sorted({id_medico for id_medico in escala.celulas if id_medico})
+    posicao = {id_medico: i + 1 for i, id_medico in enumerate(usados)}
+    nomes = [escala.nomes.nome(id_medico) for id_medico in usados]
+    ids = ids or {}
+
+    cabecalho = {'feriados': sorted(escala.feriados)}
+    if escala.unidade:
+        cabecalho['unidade'] = escala.unidade
+    cabecalho = json.dumps(cabecalho, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    indices = array('H', [0]) * len(escala.celulas)
+    n = len(TURNOS)
+    for pos, id_medico in enumerate(escala.celulas):
+        if id_medico:
+            row, turno = divmod(pos, n)
+            indices[turno * escala.num_dias + row] = posicao[id_medico]
+    textos = [nome.encode('utf-8') for nome in nomes]
+    corpo = b''.join([
+        struct.pack('<H', len(textos)),
+        _little_endian(array('H', [len(t) for t in textos])),
+        b''.join(textos),
+        _little_endian(array('I', [ids.get(nome, 0) for nome in nomes])),
+        _little_endian(indices),
+    ])
+    flags = 0
+    if comprimir:
+        comprimido = zlib.compress(corpo, 6)
+        if len(comprimido) < len(corpo):
+            corpo = comprimido
+            flags |= COMPRIMIDO
+    fixo = FIXO.pack(MAGICO, VERSAO, flags, escala.mes, escala.ano, len(nomes),
+                     len(cabecalho), len(corpo))
+    return fixo + cabecalho + corpo
+
+
+def _ler_inicio(f):
+    magico, versao, flags, mes, ano, medicos, tam_cabecalho, tam_corpo = FIXO.unpack(
+        f.read(FIXO.size))
+    if magico != MAGICO:
+        raise ValueError("Arquivo não está no formato binário de escala")
+    if versao > VERSAO:
+        raise ValueError(f"Versão {versao} do formato binário não suportada")
+    cabecalho = json.loads(f.read(tam_cabecalho).decode('utf-8'))
+    cabecalho.update({'mes': mes, 'ano': ano, 'medicos': medicos})
+    return cabecalho, flags, tam_corpo
+
+
+def ler_cabecalho(caminho):
+    """Mês, ano, feriados, unidade e quantidade de médicos, sem ler o corpo."""
+    with open(caminho, 'rb') as f:
+        return _ler_inicio(f)[0]
+
+
+def _ler_corpo(caminho):
+    """Cabeçalho, nomes distintos, id do cadastro de cada nome e o restante do corpo."""
+    with open(caminho, 'rb') as f:
+        cabecalho, flags, tam_corpo = _ler_inicio(f)
+        corpo = f.read(tam_corpo)
+    if flags & COMPRIMIDO:
+        corpo = zlib.decompress(corpo)
+
+    (quantidade,) = struct.unpack_from('<H', corpo)
+    inicio = 2
+    tamanhos = _de_little_endian('H', corpo[inicio:inicio + 2 * quantidade])
+    inicio += 2 * quantidade
+    textos = []
+    for tamanho in tamanhos:
+        textos.append(corpo[inicio:inicio + tamanho].decode('utf-8'))
+        inicio += tamanho
+    ids = _de_little_endian('I', corpo[inicio:inicio + 4 * quantidade])
+    inicio += 4 * quantidade
+    return cabecalho, textos, ids, corpo[inicio:]
+
+
+def ler_medicos(caminho):
+    """Tabela ``medicos`` (id do cadastro -> nome) de um arquivo salvo, em qualquer formato.
+
+    É a mesma tabela que ``Escala.para_dict(ids)`` grava no JSON: só os
+    médicos do cadastro usados na escala.
+    """
+    if eh_binario(caminho):
+        _, textos, ids, _ = _ler_corpo(caminho)
+        return {str(id_cadastro): nome for nome, id_cadastro in zip(textos, ids) if id_cadastro}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f).get('medicos', {})
+
+
+def ler_binario(caminho, nomes=None):
+    cabecalho, textos, _, corpo = _ler_corpo(caminho)
+    escala = Escala(cabecalho['mes'], cabecalho['ano'], set(cabecalho.get('feriados', [])),
+                    nomes, cabecalho.get('unidade'))
+    mapa = [0] + [escala.nomes.id(texto) for texto in textos]
+    indices = _de_little_endian('H', corpo[:2 * len(escala.celulas)])
+    n = len(TURNOS)
+    for turno in range(n):
+        coluna = indices[turno * escala.num_dias:(turno + 1) * escala.num_dias]
+        escala.celulas[turno::n] = array('I', [mapa[i] for i in coluna])
+    return escala
+
+
+def ler_resumo(caminho):
+    """(mês, ano, médicos distintos) de um arquivo salvo, em qualquer formato."""
+    contar('arquivos_lidos')
+    if eh_binario(caminho):
+        cabecalho = ler_cabecalho(caminho)
+        return cabecalho['mes'], cabecalho['ano'], cabecalho['medicos']
+    with open(caminho, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    return dados.get('mes'), dados.get('ano'), contar_medicos(dados)
+
+
+def salvar(caminho_sem_extensao, escala, ids=None, formato=None):
+    """Grava a escala no formato escolhido e devolve (caminho, resumo para o índice)."""
+    formato = formato or FORMATO_SALVAR
+    if formato == 'binario':
+        caminho = Path(f"{caminho_sem_extensao}{EXTENSAO_BINARIA}")
+        gravar_atomico(caminho, codificar(escala, ids))
+        medicos = len({id_medico for id_medico in escala.celulas if id_medico})
+        return caminho, (escala.mes, escala.ano, medicos)
+    caminho = Path(f"{caminho_sem_extensao}{EXTENSAO_JSON}")
+    dados = escala.para_dict(ids)
+    gravar_json_atomico(caminho, dados, indent=2)
+    return caminho, (escala.mes, escala.ano, contar_medicos(dados))
+
+
+def migrar(arquivos, manter_json=False, log=sys.stdout):
+    """Converte escalas JSON para o formato binário, conferindo cada conversão."""
+    antes = depois = convertidos = 0
+    for arquivo in arquivos:
+        origem = Path(arquivo)
+        if origem.suffix != EXTENSAO_JSON or eh_binario(origem):
+            continue
+        with open(origem, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        escala = Escala.de_dict(dados)
+        ids = {nome: int(id_cadastro) for id_cadastro, nome in dados.get('medicos', {}).items()}
+        destino = origem.with_suffix(EXTENSAO_BINARIA)
+        gravar_atomico(destino, codificar(escala, ids))
+        if (ler_escala(destino).para_dict() != escala.para_dict()
+                or ler_medicos(destino) != dados.get('medicos', {})):
+            destino.unlink()
+            print(f"ERRO {origem}: conversão não confere, arquivo mantido", file=log)
+            continue
+        antes += origem.stat().st_size
+        depois += destino.stat().st_size
+        convertidos += 1
+        if not manter_json:
+            origem.unlink()
+        print(f"ok   {origem} -> {destino.name}", file=log)
+    if convertidos:
+        print(f"{convertidos} escalas convertidas: {antes / 1024:.1f} KiB -> "
+              f"{depois / 1024:.1f} KiB ({depois / antes:.0%})", file=log)
+    return convertidos
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="plantao-hospital migrar",
+        description="Converte escalas salvas em JSON para o formato binário compacto.")
+    parser.add_argument('pastas', nargs='*', default=['escalas'],
+                        help="pastas com escalas (padrão: escalas; inclui as unidades)")
+    parser.add_argument('--manter-json', action='store_true',
+                        help="não apaga os arquivos JSON depois de converter")
+    args = parser.parse_args(argv)
+
+    arquivos = []
+    for pasta in args.pastas:
+        arquivos.extend(sorted(Path(pasta).glob(f"escala_*{EXTENSAO_JSON}")))
+        arquivos.extend(sorted(Path(pasta).glob(f"unidades/*/escala_*{EXTENSAO_JSON}")))
+    migrar(arquivos, args.manter_json)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
@@ -0,0 +1,240 @@
+"""Suíte de benchmarks das operações principais da janela, sem interface visível.
+
+Mede ``gerar_tabela``, ``carregar_escala``, ``salvar_escala``,
+``exportar_pdf`` e ``exportar_png`` da ``PlantaoApp`` em escalas sintéticas de
+tamanho crescente (um mês, um ano, várias unidades, nomes longos),
+informando o melhor tempo entre as repetições (menos sensível a ruído da
+máquina que a média) e o pico de memória alocada (tracemalloc).
+Os resultados podem ser gravados como referência e comparados depois.
+Executar a partir da raiz do repositório:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_suite.py
+    python3 benchmarks/bench_suite.py --salvar-referencia   # grava baseline.json
+    python3 benchmarks/bench_suite.py --comparar            # sai com 1 se houver regressão
+
+A referência guardada no repositório foi medida em uma máquina específica;
+ao comparar em outra máquina, grave antes a sua própria referência.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+import main
+from diario import gravar_json_atomico
+from modelo import Escala, TURNOS
+from unidades import UNIDADE_PADRAO, criar_unidade, diretorio_unidade
+
+
+REFERENCIA = Path(__file__).resolve().parent / "baseline.json"
+OPERACOES = ('gerar_tabela', 'carregar_escala', 'salvar_escala', 'exportar_pdf', 'exportar_png')
+ANO = 2025
+# Diferenças absolutas abaixo disto são ruído de medição, não regressão.
+FOLGA = {'ms': 2.0, 'pico_kib': 64.0}
+
+
+def nome_curto(i):
+    return f"Dr(a). Médico {i % 40}"
+
+
+def nome_longo(i):
+    return f"Dr(a). Maria Aparecida dos Santos Albuquerque Cavalcanti Figueiredo {i % 40}"
+
+
+# (nome do cenário, unidades, meses, gerador de nomes)
+CENARIOS = (
+    ("um mês", 1, (1,), nome_curto),
+    ("um ano", 1, tuple(range(1, 13)), nome_curto),
+    ("20 unidades", 20, (1,), nome_curto),
+    ("nomes longos", 1, (1,), nome_longo),
+)
+
+
+def escala_sintetica(mes, ano, unidade, nomes, deslocamento=0):
+    escala = Escala(mes, ano, unidade=None if unidade == UNIDADE_PADRAO else unidade)
+    for row in range(escala.num_dias):
+        for turno in range(len(TURNOS)):
+            escala.definir(row, turno, nomes(deslocamento + row * len(TURNOS) + turno))
+    return escala
+
+
+def preparar_cenario(quantidade_unidades, meses, nomes):
+    """Cria as unidades e uma escala salva por unidade e mês; devolve os alvos."""
+    unidades = [UNIDADE_PADRAO]
+    for i in range(1, quantidade_unidades):
+        unidades.append(criar_unidade(f"Unidade {i:02d}"))
+    alvos = []
+    for u, unidade in enumerate(unidades):
+        diretorio = diretorio_unidade(unidade)
+        diretorio.mkdir(parents=True, exist_ok=True)
+        for mes in meses:
+            caminho = diretorio / f"escala_{mes:02d}_{ANO}_20250101_000000.json"
+            # Cada unidade com um deslocamento diferente, para não gerar conflitos entre elas.
+            escala = escala_sintetica(mes, ANO, unidade, nomes, deslocamento=u * 7)
+            gravar_json_atomico(caminho, escala.para_dict())
+            alvos.append((unidade, mes, caminho))
+    return alvos
+
+
+class Executor:
+    def __init__(self, app, janela, saida):
+        self.app = app
+        self.janela = janela
+        self.saida = saida
+
+    def selecionar(self, unidade, mes):
+        self.janela.unidade_combo.setCurrentText(unidade)
+        self.janela.mes_combo.setCurrentIndex(mes - 1)
+        self.janela.ano_spin.setValue(ANO)
+
+    def preparar(self, operacao, alvo):
+        unidade, mes, caminho = alvo
+        self.selecionar(unidade, mes)
+        if operacao != 'gerar_tabela':
+            self.janela.carregar_escala(caminho)
+        if operacao.startswith('exportar_'):
+            destino = str(Path(self.saida) / f"{Path(caminho).stem}.{operacao[-3:]}")
+            QFileDialog.getSaveFileName = staticmethod(lambda *args, **kwargs: (destino, ''))
+
+    def executar(self, operacao, alvo):
+        if operacao == 'carregar_escala':
+            self.janela.carregar_escala(alvo[2])
+            return
+        getattr(self.janela, operacao)()
+        if operacao.startswith('exportar_'):
+            self.janela.exportacoes.pool.waitForDone()
+            self.app.processEvents()
+
+    def medir(self, operacao, alvos, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            total = 0.0
+            for alvo in alvos:
+                self.preparar(operacao, alvo)
+                inicio = time.perf_counter()
+                self.executar(operacao, alvo)
+                self.app.processEvents()
+                total += time.perf_counter() - inicio
+            tempos.append(total * 1000)
+
+        pico = 0
+        tracemalloc.start()
+        try:
+            for alvo in alvos:
+                self.preparar(operacao, alvo)
+                tracemalloc.reset_peak()
+                atual = tracemalloc.get_traced_memory()[0]
+                self.executar(operacao, alvo)
+                self.app.processEvents()
+                pico = max(pico, tracemalloc.get_traced_memory()[1] - atual)
+        finally:
+            tracemalloc.stop()
+        return min(tempos), pico / 1024
+
+
+def executar_suite(repeticoes, filtro=None):
+    app = QApplication.instance() or QApplication(sys.argv)
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: None)
+    QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Yes)
+
+    resultados = {}
+    cwd = os.getcwd()
+    for nome, quantidade_unidades, meses, nomes in CENARIOS:
+        if filtro and filtro not in nome:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                alvos = preparar_cenario(quantidade_unidades, meses, nomes)
+                saida = Path(tmp) / "exportacoes"
+                saida.mkdir()
+                janela = main.PlantaoApp()
+                janela.show()
+                app.processEvents()
+                executor = Executor(app, janela, saida)
+                for operacao in OPERACOES:
+                    ms, pico_kib = executor.medir(operacao, alvos, repeticoes)
+                    resultados[f"{nome}/{operacao}"] = {'ms': round(ms, 2),
+                                                        'pico_kib': round(pico_kib, 1)}
+                    print(f"{nome:<14}{operacao:<18}{ms:>10.2f} ms{pico_kib:>12.1f} KiB",
+                          flush=True)
+                janela.exportacoes.cancelar_todas()
+                janela.close()
+                janela.deleteLater()
+                app.processEvents()
+            finally:
+                os.chdir(cwd)
+    return resultados
+
+
+def comparar(resultados, referencia, tolerancia):
+    regressoes = []
+    print(f"\n{'medição':<34}{'referência':>12}{'atual':>12}{'razão':>8}")
+    for chave, atual in resultados.items():
+        anterior = referencia.get(chave)
+        if anterior is None:
+            print(f"{chave:<34}{'-':>12}{atual['ms']:>10.2f}ms{'novo':>8}")
+            continue
+        for campo, unidade in (('ms', 'ms'), ('pico_kib', 'KiB')):
+            razao = atual[campo] / anterior[campo] if anterior[campo] else 1.0
+            marca = ""
+            if razao > 1 + tolerancia and atual[campo] - anterior[campo] > FOLGA[campo]:
+                marca = "  REGRESSÃO"
+                regressoes.append((chave, campo, razao))
+            print(f"{chave + ' ' + unidade:<34}{anterior[campo]:>12.1f}{atual[campo]:>12.1f}"
+                  f"{razao:>7.2f}x{marca}")
+    return regressoes
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--repeticoes', type=int, default=5,
+                        help="repetições por medição (padrão: 5; vale o melhor tempo)")
+    parser.add_argument('--cenario', help="executa apenas cenários cujo nome contenha este texto")
+    parser.add_argument('--salvar-referencia', action='store_true',
+                        help=f"grava os resultados em {REFERENCIA.name}")
+    parser.add_argument('--comparar', action='store_true',
+                        help="compara com a referência e sai com código 1 se houver regressão")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="aumento relativo aceito antes de acusar regressão (padrão: 0.25)")
+    args = parser.parse_args(argv)
+
+    resultados = executar_suite(args.repeticoes, args.cenario)
+
+    if args.salvar_referencia:
+        dados = {'python': platform.python_version(), 'maquina': platform.machine(),
+                 'repeticoes': args.repeticoes, 'resultados': resultados}
+        if REFERENCIA.exists() and args.cenario:
+            with open(REFERENCIA, 'r', encoding='utf-8') as f:
+                anteriores = json.load(f).get('resultados', {})
+            dados['resultados'] = {**anteriores, **resultados}
+        gravar_json_atomico(REFERENCIA, dados, indent=2)
+        print(f"\nreferência gravada em {REFERENCIA}")
+        return 0
+
+    if args.comparar:
+        if not REFERENCIA.exists():
+            print(f"\nsem referência em {REFERENCIA}; use --salvar-referencia", file=sys.stderr)
+            return 2
+        with open(REFERENCIA, 'r', encoding='utf-8') as f:
+            referencia = json.load(f)['resultados']
+        regressoes = comparar(resultados, referencia, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}")
+            return 1
+        print("\nsem regressões")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_bench())
@@ -0,0 +1,149 @@
+"""Micro-benchmark da troca de mês e do carregamento da tabela principal.
+
+Compara a implementação original (um QTableWidgetItem e novos QColor por
+célula, a cada troca de mês) com a tabela atual baseada em ``Escala`` e
+``EscalaTableModel``. As duas tabelas são exibidas sozinhas, com o mesmo
+tamanho e estilo, e cada medição inclui a repintura. Executar a partir da
+raiz do repositório:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_tabela.py
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from calendar import monthrange
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtWidgets import (QApplication, QHeaderView, QMessageBox, QTableWidget,
+                             QTableWidgetItem)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+
+import main
+from modelo import DIAS_SEMANA, Escala
+
+
+REPETICOES = 50
+
+
+class TabelaLegada:
+    def __init__(self, referencia):
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Data", "Dia da Semana", "Noite", "Tarde", "Manhã"])
+        header = self.table.horizontalHeader()
+        for col in range(2):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        for col in range(2, 5):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
+        self.table.setAlternatingRowColors(True)
+        self.table.setStyleSheet(referencia.styleSheet().replace("QTableView", "QTableWidget"))
+        self.table.resize(referencia.size())
+        self.custom_holidays = set()
+        self.table.show()
+
+    def gerar_tabela(self, mes, ano):
+        num_dias = monthrange(ano, mes)[1]
+        self.table.setRowCount(num_dias)
+        for dia in range(1, num_dias + 1):
+            dia_semana = date(ano, mes, dia).weekday()
+            date_text = f"{dia:02d}/{mes:02d}/{ano}"
+            is_weekend = dia_semana in [4, 5, 6] or date_text in self.custom_holidays
+            itens = [QTableWidgetItem(date_text), QTableWidgetItem(DIAS_SEMANA[dia_semana]),
+                     QTableWidgetItem(""), QTableWidgetItem(""), QTableWidgetItem("")]
+            for col, item in enumerate(itens):
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if col < 2:
+                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                if is_weekend:
+                    item.setBackground(QColor(138, 180, 248))
+                    item.setForeground(QColor(Qt.GlobalColor.black))
+                self.table.setItem(dia - 1, col, item)
+
+    def carregar_escala(self, caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.custom_holidays = set(data.get('feriados', []))
+        self.gerar_tabela(data['mes'], data['ano'])
+        for row, escala in enumerate(data['escalas']):
+            self.table.item(row, 2).setText(escala.get('noite', ''))
+            self.table.item(row, 3).setText(escala.get('tarde', ''))
+            self.table.item(row, 4).setText(escala.get('manha', ''))
+
+
+def medir(funcao, app):
+    """Mediana em ms da operação sozinha e da operação seguida da repintura."""
+    sem_pintura = []
+    com_pintura = []
+    for i in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao(i)
+        meio = time.perf_counter()
+        app.processEvents()
+        fim = time.perf_counter()
+        sem_pintura.append((meio - inicio) * 1000)
+        com_pintura.append((fim - inicio) * 1000)
+    return statistics.median(sem_pintura), statistics.median(com_pintura)
+
+
+def escala_sintetica(mes, ano):
+    escala = Escala(mes, ano)
+    for row in range(escala.num_dias):
+        for turno in range(3):
+            escala.definir(row, turno, f"Dr(a). Médico {(row * 3 + turno) % 17}")
+    return escala
+
+
+def main_bench():
+    app = QApplication.instance() or QApplication(sys.argv)
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "escala_01_2025.json"
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(escala_sintetica(1, 2025).para_dict(), f, ensure_ascii=False)
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            janela = main.PlantaoApp()
+            janela.show()
+            app.processEvents()
+            legada = TabelaLegada(janela.table)
+            atual = janela.table
+            atual.setParent(None)
+            atual.resize(legada.table.size())
+            atual.show()
+            app.processEvents()
+
+            def trocar_legada(i):
+                legada.gerar_tabela(i % 12 + 1, 2025)
+
+            def trocar_atual(i):
+                janela.mes_combo.setCurrentIndex(i % 12)
+                janela.gerar_tabela()
+
+            resultados = [
+                ("troca de mês", medir(trocar_legada, app), medir(trocar_atual, app)),
+                ("carregar escala", medir(lambda i: legada.carregar_escala(caminho), app),
+                 medir(lambda i: janela.carregar_escala(caminho), app)),
+            ]
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'operação':<30}{'antes (ms)':>12}{'depois (ms)':>14}{'ganho':>9}")
+    for nome, antes, depois in resultados:
+        for sufixo, i in (("", 0), (" + pintura", 1)):
+            print(f"{nome + sufixo:<30}{antes[i]:>12.2f}{depois[i]:>14.2f}"
+                  f"{antes[i] / depois[i]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main_bench()
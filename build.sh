@@ -24,7 +24,7 @@ mkdir -p "$BUILD_DIR/usr/bin"
 mkdir -p "$BUILD_DIR/usr/share/pixmaps"
 
 # Copiar arquivos do aplicativo
-cp main.py "$BUILD_DIR/opt/$PACKAGE_NAME/"
+cp *.py "$BUILD_DIR/opt/$PACKAGE_NAME/"
 cp requirements.txt "$BUILD_DIR/opt/$PACKAGE_NAME/"
 cp web.png "$BUILD_DIR/opt/$PACKAGE_NAME/"
 cp web.png "$BUILD_DIR/usr/share/pixmaps/plantao-hospital.png"
@@ -60,7 +60,7 @@ source "$VENV_DIR/bin/activate"
 cd "$HOME/.local/share/plantao-hospital"
 
 # Executar aplicativo
-python3 "$APP_DIR/main.py"
+python3 "$APP_DIR/main.py" "$@"
 EOF
 
 chmod +x "$BUILD_DIR/opt/$PACKAGE_NAME/run.sh"
@@ -68,7 +68,7 @@ chmod +x "$BUILD_DIR/opt/$PACKAGE_NAME/run.sh"
 # Criar symlink em /usr/bin
 cat > "$BUILD_DIR/usr/bin/$PACKAGE_NAME" << 'EOF'
 #!/bin/bash
-/opt/plantao-hospital/run.sh
+/opt/plantao-hospital/run.sh "$@"
 EOF
 
 chmod +x "$BUILD_DIR/usr/bin/$PACKAGE_NAME"
@@ -0,0 +1,176 @@
+import argparse
+import sys
+
+from armazenamento import ERROS_LEITURA
+from cadastro import normalizar
+from modelo import CABECALHOS, COLUNAS_FIXAS, TURNOS, ler_escala
+from unidades import abrir_indice, listar_unidades
+
+
+CABECALHOS_BUSCA = ['Médico', 'Data', 'Turno', 'Unidade', 'Arquivo']
+LIMITE_RESULTADOS = 5000
+
+
+class BuscaMedicos:
+    """Índice invertido médico -> (arquivo, dia, turno) sobre o histórico de uma unidade.
+
+    Fica nas tabelas ``busca_*`` do índice do histórico. Cada nome distinto
+    tem uma chave normalizada (sem acentos nem maiúsculas), e a busca por
+    trecho percorre só a tabela de nomes, que é pequena, antes de ir aos
+    plantões pelo índice ``nome_id``. Como na análise, apenas arquivos novos
+    ou com mtime diferente são reindexados; ``atual`` marca a versão mais
+    recente de cada mês e só é recalculado quando o histórico muda.
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.conn = indice.conn
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS busca_arquivos (
+                arquivo TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                atual INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS busca_nomes (
+                id INTEGER PRIMARY KEY,
+                nome TEXT UNIQUE,
+                chave TEXT
+            );
+            CREATE TABLE IF NOT EXISTS busca_plantoes (
+                nome_id INTEGER,
+                arquivo TEXT,
+                dia INTEGER,
+                turno INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_busca_nome ON busca_plantoes (nome_id, arquivo, dia, turno);
+            CREATE INDEX IF NOT EXISTS idx_busca_arquivo ON busca_plantoes (arquivo);
+        """)
+        self.nome_ids = dict(self.conn.execute("SELECT nome, id FROM busca_nomes"))
+
+    def _id_nome(self, nome):
+        id_nome = self.nome_ids.get(nome)
+        if id_nome is None:
+            id_nome = self.conn.execute(
+                "INSERT INTO busca_nomes (nome, chave) VALUES (?, ?)",
+                (nome, normalizar(nome))).lastrowid
+            self.nome_ids[nome] = id_nome
+        return id_nome
+
+    def _indexar(self, arquivo):
+        escala = ler_escala(self.indice.caminho(arquivo))
+        nomes = escala.nomes.nomes
+        ids = {}
+        plantoes = []
+        n = len(TURNOS)
+        for pos, id_medico in enumerate(escala.celulas):
+            if id_medico:
+                id_nome = ids.get(id_medico)
+                if id_nome is None:
+                    id_nome = ids[id_medico] = self._id_nome(nomes[id_medico])
+                row, turno = divmod(pos, n)
+                plantoes.append((id_nome, arquivo, row + 1, turno))
+        self.conn.execute("DELETE FROM busca_plantoes WHERE arquivo = ?", (arquivo,))
+        self.conn.executemany("INSERT INTO busca_plantoes VALUES (?, ?, ?, ?)", plantoes)
+
+    def atualizar(self):
+        """Reindexa os arquivos novos ou alterados; devolve quantos foram lidos."""
+        self.indice.sincronizar()
+        indexados = dict(self.conn.execute("SELECT arquivo, mtime_ns FROM busca_arquivos"))
+        lidos = 0
+        for arquivo, mtime_ns in self.conn.execute(
+                "SELECT arquivo, mtime_ns FROM escalas").fetchall():
+            if indexados.get(arquivo) == mtime_ns:
+                continue
+            try:
+                self._indexar(arquivo)
+            except ERROS_LEITURA:
+                # Arquivo ilegível ou binário truncado/corrompido: fica fora da busca.
+                continue
+            self.conn.execute("INSERT OR REPLACE INTO busca_arquivos (arquivo, mtime_ns) "
+                              "VALUES (?, ?)", (arquivo, mtime_ns))
+            lidos += 1
+        if lidos or len(indexados) != self.indice.contar():
+            self.conn.execute(
+                "DELETE FROM busca_plantoes WHERE arquivo NOT IN (SELECT arquivo FROM escalas)")
+            self.conn.execute(
+                "DELETE FROM busca_arquivos WHERE arquivo NOT IN (SELECT arquivo FROM escalas)")
+            self.conn.execute("UPDATE busca_arquivos SET atual = 0")
+            self.conn.executemany("UPDATE busca_arquivos SET atual = 1 WHERE arquivo = ?",
+                                  [(arquivo,) for arquivo, _ in self.indice.mais_recentes()])
+        self.conn.commit()
+        return lidos
+
+    def buscar(self, texto, todas_versoes=False, limite=LIMITE_RESULTADOS):
+        """Plantões de médicos cujo nome contém ``texto`` (sem diferenciar acentos).
+
+        Devolve (nome, dia, mês, ano, turno, arquivo) em ordem cronológica,
+        considerando só a versão mais recente de cada mês, a menos que
+        ``todas_versoes`` seja verdadeiro.
+        """
+        chave = normalizar(texto)
+        if not chave:
+            return []
+        ids = [row[0] for row in self.conn.execute(
+            "SELECT id FROM busca_nomes WHERE instr(chave, ?) > 0", (chave,))]
+        if not ids:
+            return []
+        filtro = "" if todas_versoes else "AND a.atual = 1"
+        return self.conn.execute(f"""
+            SELECT n.nome, p.dia, e.mes, e.ano, p.turno, p.arquivo
+            FROM busca_plantoes p
+            JOIN busca_nomes n ON n.id = p.nome_id
+            JOIN busca_arquivos a ON a.arquivo = p.arquivo
+            JOIN escalas e ON e.arquivo = p.arquivo
+            WHERE p.nome_id IN ({','.join('?' * len(ids))}) {filtro}
+            ORDER BY e.ano, e.mes, p.dia, p.turno, e.timestamp
+            LIMIT ?
+        """, (*ids, limite)).fetchall()
+
+
+def buscar_em_unidades(buscas, texto, todas_versoes=False, limite=LIMITE_RESULTADOS):
+    """Junta as buscas de várias unidades: lista de (unidade, resultado), em ordem cronológica."""
+    resultados = []
+    for unidade, busca in buscas:
+        resultados.extend((unidade, linha) for linha in busca.buscar(texto, todas_versoes, limite))
+    resultados.sort(key=lambda item: (item[1][3], item[1][2], item[1][1], item[1][4]))
+    return resultados[:limite]
+
+
+def linha_resultado(unidade, resultado):
+    """Linha de exibição (ver ``CABECALHOS_BUSCA``)."""
+    nome, dia, mes, ano, turno, arquivo = resultado
+    return [nome, f"{dia:02d}/{mes:02d}/{ano}", CABECALHOS[COLUNAS_FIXAS + turno], unidade, arquivo]
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Procura os plantões de um médico em todo o histórico salvo.")
+    parser.add_argument('nome', help="nome ou trecho do nome (acentos e maiúsculas são ignorados)")
+    parser.add_argument('--unidade', action='append',
+                        help="procurar apenas nesta unidade (pode repetir; padrão: todas)")
+    parser.add_argument('--todas-versoes', action='store_true',
+                        help="incluir versões anteriores de cada mês, não só a mais recente")
+    args = parser.parse_args(argv)
+
+    unidades = listar_unidades()
+    for unidade in args.unidade or []:
+        if unidade not in unidades:
+            parser.error(f"unidade desconhecida: {unidade}")
+    indices = [(unidade, abrir_indice(unidade)) for unidade in args.unidade or unidades]
+    try:
+        buscas = [(unidade, BuscaMedicos(indice)) for unidade, indice in indices]
+        for _, busca in buscas:
+            busca.atualizar()
+        resultados = buscar_em_unidades(buscas, args.nome, args.todas_versoes)
+    finally:
+        for _, indice in indices:
+            indice.close()
+
+    for unidade, resultado in resultados:
+        print("  ".join(linha_resultado(unidade, resultado)))
+    print(f"\n{len(resultados)} plantões encontrados")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
@@ -0,0 +1,185 @@
+import bisect
+import difflib
+import json
+import sys
+import unicodedata
+from pathlib import Path
+
+from diario import gravar_json_atomico
+from historico import ESCALAS_DIR
+
+
+CADASTRO_ARQUIVO = ESCALAS_DIR / "medicos.json"
+LIMITE_SUGESTOES = 12
+# Busca por trecho e por semelhança (que percorrem todos os nomes) só a partir deste tamanho.
+MINIMO_BUSCA_APROXIMADA = 3
+
+
+def normalizar(texto):
+    """Chave de busca: sem acentos, sem diferença de maiúsculas e espaços simples."""
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+class MedicoCadastrado:
+    __slots__ = ('id', 'nome', 'especialidade', 'crm')
+
+    def __init__(self, id_medico, nome, especialidade='', crm=''):
+        self.id = id_medico
+        self.nome = nome
+        self.especialidade = especialidade
+        self.crm = crm
+
+    def para_dict(self):
+        return {'id': self.id, 'nome': self.nome,
+                'especialidade': self.especialidade, 'crm': self.crm}
+
+
+class Cadastro:
+    """Cadastro persistente de médicos, compartilhado por todas as unidades.
+
+    Os ids nunca são reutilizados, então continuam válidos nas escalas salvas
+    mesmo depois que um médico sai do cadastro. As sugestões vêm de uma lista
+    ordenada de chaves normalizadas (uma por palavra do nome, para achar
+    também pelo sobrenome) consultada por busca binária: cada tecla custa
+    O(log n) mais o número de sugestões, mesmo com milhares de médicos. Sem
+    resultado por prefixo, e com ao menos ``MINIMO_BUSCA_APROXIMADA`` letras,
+    tenta trecho do nome e, por fim, semelhança (erros de digitação).
+    """
+
+    def __init__(self, caminho=CADASTRO_ARQUIVO):
+        self.caminho = Path(caminho)
+        self.medicos = {}
+        self.proximo_id = 1
+        self._por_nome = {}
+        self._chaves = []
+        self.carregar()
+
+    def carregar(self):
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            dados = {}
+        if not isinstance(dados, dict):
+            print(f"[cadastro] {self.caminho} ignorado: esperado um objeto JSON", file=sys.stderr)
+            dados = {}
+        itens = dados.get('medicos', [])
+        if not isinstance(itens, list):
+            print("[cadastro] 'medicos' ignorado: esperada uma lista", file=sys.stderr)
+            itens = []
+        self.medicos = {}
+        for item in itens:
+            try:
+                medico = self._medico_do_item(item)
+            except KeyError as e:
+                self._avisar(item, f"falta a chave {e}")
+                continue
+            except (TypeError, ValueError, AttributeError) as e:
+                self._avisar(item, e)
+                continue
+            if medico.id in self.medicos:
+                self._avisar(item, f"id {medico.id} repetido")
+                continue
+            self.medicos[medico.id] = medico
+        proximo_id = dados.get('proximo_id', 1)
+        if not isinstance(proximo_id, int):
+            proximo_id = 1
+        self.proximo_id = max(proximo_id, max(self.medicos, default=0) + 1)
+        self._indexar()
+
+    @staticmethod
+    def _medico_do_item(item):
+        """MedicoCadastrado de um item do arquivo; KeyError/ValueError/TypeError se inválido."""
+        id_medico, nome = item['id'], item['nome']
+        if not isinstance(id_medico, int) or isinstance(id_medico, bool) or id_medico < 1:
+            raise ValueError(f"id inválido {id_medico!r}")
+        if not isinstance(nome, str) or not nome.strip():
+            raise ValueError(f"nome inválido {nome!r}")
+        return MedicoCadastrado(id_medico, nome, item.get('especialidade', ''), item.get('crm', ''))
+
+    @staticmethod
+    def _avisar(item, erro):
+        print(f"[cadastro] médico ignorado {item!r}: {erro}", file=sys.stderr)
+
+    def salvar(self):
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        gravar_json_atomico(self.caminho, {
+            'proximo_id': self.proximo_id,
+            'medicos': [m.para_dict() for m in sorted(self.medicos.values(), key=lambda m: m.id)],
+        }, indent=2)
+
+    def _chaves_do_medico(self, medico):
+        palavras = normalizar(medico.nome).split()
+        return [(' '.join(palavras[i:]), medico.id) for i in range(len(palavras))]
+
+    def _indexar(self):
+        self._por_nome = {normalizar(m.nome): m.id for m in self.medicos.values()}
+        self._chaves = sorted(chave for m in self.medicos.values()
+                              for chave in self._chaves_do_medico(m))
+
+    def __len__(self):
+        return len(self.medicos)
+
+    def buscar(self, nome):
+        id_medico = self._por_nome.get(normalizar(nome))
+        return self.medicos.get(id_medico) if id_medico is not None else None
+
+    def adicionar(self, nome, especialidade='', crm=''):
+        existente = self.buscar(nome)
+        if existente is not None:
+            return existente
+        nome = ' '.join(nome.split())
+        if not nome:
+            raise ValueError("Nome do médico não pode ser vazio")
+        medico = MedicoCadastrado(self.proximo_id, nome, especialidade, crm)
+        self.proximo_id += 1
+        self.medicos[medico.id] = medico
+        self._por_nome[normalizar(nome)] = medico.id
+        for chave in self._chaves_do_medico(medico):
+            bisect.insort(self._chaves, chave)
+        return medico
+
+    def atualizar(self, id_medico, nome, especialidade='', crm=''):
+        medico = self.medicos[id_medico]
+        outro = self.buscar(nome)
+        if outro is not None and outro.id != id_medico:
+            raise ValueError(f"Já existe um médico chamado '{outro.nome}'")
+        medico.nome = ' '.join(nome.split())
+        medico.especialidade = especialidade
+        medico.crm = crm
+        self._indexar()
+
+    def remover(self, id_medico):
+        if self.medicos.pop(id_medico, None) is not None:
+            self._indexar()
+
+    def canonico(self, nome):
+        """Nome como está no cadastro (acentos e maiúsculas), ou o texto digitado."""
+        medico = self.buscar(nome)
+        return medico.nome if medico is not None else nome.strip()
+
+    def ids_por_nome(self):
+        return {m.nome: m.id for m in self.medicos.values()}
+
+    def sugerir(self, texto, limite=LIMITE_SUGESTOES):
+        chave = normalizar(texto)
+        if not chave:
+            return []
+        encontrados = []
+        i = bisect.bisect_left(self._chaves, (chave,))
+        while i < len(self._chaves) and len(encontrados) < limite:
+            prefixo, id_medico = self._chaves[i]
+            if not prefixo.startswith(chave):
+                break
+            if id_medico not in encontrados:
+                encontrados.append(id_medico)
+            i += 1
+        if not encontrados and len(chave) >= MINIMO_BUSCA_APROXIMADA:
+            encontrados = [id_medico for nome, id_medico in self._por_nome.items()
+                           if chave in nome][:limite]
+            if not encontrados:
+                encontrados = [self._por_nome[nome] for nome in difflib.get_close_matches(
+                    chave, self._por_nome, n=limite, cutoff=0.7)]
+        return [self.medicos[id_medico].nome for id_medico in encontrados]
@@ -0,0 +1,179 @@
+from modelo import TURNOS, CABECALHOS, COLUNAS_FIXAS
+
+
+NOITE = TURNOS.index('noite')
+MANHA = TURNOS.index('manha')
+
+# Posições de todas as unidades num único inteiro: unidade * POR_UNIDADE + linha * 3 + turno.
+POR_UNIDADE = 31 * len(TURNOS)
+
+
+def _sem_descanso(pos, outra):
+    row, turno = divmod(pos % POR_UNIDADE, len(TURNOS))
+    outro_row, outro_turno = divmod(outra % POR_UNIDADE, len(TURNOS))
+    if row == outro_row:
+        return True
+    if outro_row == row + 1:
+        return turno == NOITE and outro_turno == MANHA
+    if outro_row == row - 1:
+        return turno == MANHA and outro_turno == NOITE
+    return False
+
+
+class VerificadorConflitos:
+    """Detecta médicos escalados sem descanso, mantendo um índice invertido.
+
+    ``por_medico`` guarda, para cada id de médico, as posições (unidade x
+    linha x turno) que ele ocupa. Há conflito quando o mesmo médico tem dois
+    turnos no mesmo dia, em qualquer unidade, ou uma Noite seguida da Manhã
+    do dia seguinte. Cada alteração de célula só reavalia as posições do
+    médico antigo e do novo, sem percorrer as tabelas.
+
+    Com várias unidades, as escalas precisam compartilhar a mesma
+    ``TabelaNomes`` (ver ``unidades.AreaTrabalho``) para que os ids coincidam.
+    """
+
+    def __init__(self, escalas, unidades=None):
+        self.reconstruir(escalas, unidades)
+
+    def reconstruir(self, escalas, unidades=None):
+        self.escalas = list(escalas)
+        self.unidades = list(unidades) if unidades else None
+        self.por_medico = {}
+        self.conflitos = set()
+        for unidade, escala in enumerate(self.escalas):
+            self._indexar(unidade, escala)
+        self._reavaliar(self.por_medico)
+
+    def _indexar(self, unidade, escala):
+        base = unidade * POR_UNIDADE
+        for pos, id_medico in enumerate(escala.celulas):
+            if id_medico:
+                self.por_medico.setdefault(id_medico, set()).add(base + pos)
+
+    def _reavaliar(self, ids):
+        """Refaz os conflitos de todas as posições dos médicos ``ids``.
+
+        As posições de cada médico são agrupadas por dia, então só os turnos
+        do mesmo dia e dos dias vizinhos são comparados.
+        """
+        for id_medico in ids:
+            por_dia = {}
+            for pos in self.por_medico.get(id_medico, ()):
+                por_dia.setdefault(pos % POR_UNIDADE // len(TURNOS), []).append(pos)
+            for row, posicoes in por_dia.items():
+                for pos in posicoes:
+                    turno = pos % POR_UNIDADE % len(TURNOS)
+                    vizinhas = (por_dia.get(row + 1, ()) if turno == NOITE else
+                                por_dia.get(row - 1, ()) if turno == MANHA else ())
+                    if len(posicoes) > 1 or any(_sem_descanso(pos, outra) for outra in vizinhas):
+                        self.conflitos.add(pos)
+                    else:
+                        self.conflitos.discard(pos)
+
+    def substituir(self, unidade, escala, nome=None):
+        """Troca a escala de uma unidade (ou acrescenta uma nova, de nome ``nome``, no fim).
+
+        Só os médicos da escala antiga e da nova são reavaliados; o restante
+        do índice continua valendo.
+        """
+        base = unidade * POR_UNIDADE
+        ids = set()
+        if unidade < len(self.escalas):
+            for pos, id_medico in enumerate(self.escalas[unidade].celulas):
+                if id_medico:
+                    ids.add(id_medico)
+                    self.conflitos.discard(base + pos)
+                    posicoes = self.por_medico[id_medico]
+                    posicoes.discard(base + pos)
+                    if not posicoes:
+                        del self.por_medico[id_medico]
+            self.escalas[unidade] = escala
+        else:
+            self.escalas.append(escala)
+            if self.unidades is not None:
+                self.unidades.append(nome)
+        self._indexar(unidade, escala)
+        ids.update(id_medico for id_medico in escala.celulas if id_medico)
+        self._reavaliar(ids)
+
+    def localizar(self, pos):
+        unidade, resto = divmod(pos, POR_UNIDADE)
+        return (unidade,) + divmod(resto, len(TURNOS))
+
+    def _id(self, pos):
+        unidade, resto = divmod(pos, POR_UNIDADE)
+        return self.escalas[unidade].celulas[resto]
+
+    def _relacionadas(self, id_medico, pos):
+        return [outra for outra in self.por_medico.get(id_medico, ())
+                if outra != pos and _sem_descanso(pos, outra)]
+
+    def _conflitantes(self, pos):
+        id_medico = self._id(pos)
+        if not id_medico:
+            return []
+        return self._relacionadas(id_medico, pos)
+
+    def alterar(self, row, turno, id_antigo, id_novo, unidade=0):
+        """Atualiza o índice após a célula mudar; devolve as posições afetadas."""
+        pos = unidade * POR_UNIDADE + row * len(TURNOS) + turno
+        afetadas = {pos}
+        if id_antigo:
+            afetadas.update(self._relacionadas(id_antigo, pos))
+            posicoes = self.por_medico.get(id_antigo)
+            if posicoes:
+                posicoes.discard(pos)
+                if not posicoes:
+                    del self.por_medico[id_antigo]
+        if id_novo:
+            self.por_medico.setdefault(id_novo, set()).add(pos)
+            afetadas.update(self._relacionadas(id_novo, pos))
+        for afetada in afetadas:
+            if self._conflitantes(afetada):
+                self.conflitos.add(afetada)
+            else:
+                self.conflitos.discard(afetada)
+        return afetadas
+
+    def em_conflito(self, row, turno, unidade=0):
+        return unidade * POR_UNIDADE + row * len(TURNOS) + turno in self.conflitos
+
+    def _turno(self, turno, unidade, com_unidade):
+        texto = CABECALHOS[COLUNAS_FIXAS + turno]
+        return f"{texto} ({self.unidades[unidade]})" if com_unidade else texto
+
+    def descrever(self, row, turno, unidade=0):
+        pos = unidade * POR_UNIDADE + row * len(TURNOS) + turno
+        escala = self.escalas[unidade]
+        nome = escala.nomes.nome(self._id(pos))
+        mensagens = []
+        for outra in self._conflitantes(pos):
+            outra_unidade, outro_row, outro_turno = self.localizar(outra)
+            com_unidade = self.unidades is not None and outra_unidade != unidade
+            if outro_row == row:
+                primeiro, segundo = sorted(((turno, unidade), (outro_turno, outra_unidade)))
+                mensagens.append(
+                    f"{nome}: {self._turno(*primeiro, com_unidade)} e "
+                    f"{self._turno(*segundo, com_unidade)} em {escala.data_texto(row)}")
+            else:
+                (noite_row, noite_unidade), (_, manha_unidade) = sorted(
+                    ((row, unidade), (outro_row, outra_unidade)))
+                mensagens.append(
+                    f"{nome}: {self._turno(NOITE, noite_unidade, com_unidade)} em "
+                    f"{escala.data_texto(noite_row)} seguida de "
+                    f"{self._turno(MANHA, manha_unidade, com_unidade)} em "
+                    f"{escala.data_texto(noite_row + 1)} (sem descanso)")
+        return mensagens
+
+    def listar(self, unidade=None):
+        """Mensagens de todos os conflitos, ou só dos que envolvem ``unidade``."""
+        mensagens = []
+        for pos in sorted(self.conflitos):
+            local = self.localizar(pos)
+            if unidade is not None and local[0] != unidade:
+                continue
+            for mensagem in self.descrever(local[1], local[2], local[0]):
+                if mensagem not in mensagens:
+                    mensagens.append(mensagem)
+        return mensagens
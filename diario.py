@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from metricas import contar
+from modelo import Escala
+
+
+AUTOSAVE_DIR = Path("escalas") / "autosave"
+COMPACTAR_A_CADA = 500
+INTERVALO_FSYNC = 1.0
+
+
+def gravar_atomico(caminho, conteudo):
+    caminho = Path(caminho)
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=f".{caminho.name}.", suffix=".tmp")
+    if isinstance(conteudo, bytes):
+        abrir = os.fdopen(fd, 'wb')
+    else:
+        abrir = os.fdopen(fd, 'w', encoding='utf-8')
+    try:
+        with abrir as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+            contar('bytes_gravados', os.fstat(f.fileno()).st_size)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.unlink(temporario)
+        except OSError:
+            pass
+        raise
+
+
+def gravar_json_atomico(caminho, dados, indent=None):
+    gravar_atomico(caminho, json.dumps(dados, ensure_ascii=False, indent=indent))
+
+
+class Diario:
+    """Salvamento automático de um mês em diário append-only.
+
+    Cada edição vira uma linha JSONL numerada (versão). A cada
+    ``compactar_a_cada`` edições o estado completo é gravado como base
+    (arquivo temporário + rename) e um novo segmento do diário é iniciado.
+    Bases e segmentos antigos são mantidos, então qualquer versão pode ser
+    reconstruída a partir da base anterior a ela mais o seu segmento.
+    Uma última linha incompleta (queda durante a escrita) é ignorada.
+
+    As linhas vão para o disco (fsync) no máximo a cada ``intervalo_fsync``
+    segundos, para que um lote de edições não custe um fsync por célula;
+    quem usa o diário chama ``sincronizar`` periodicamente para gravar as
+    últimas, e ``fechar`` também as grava.
+    """
+
+    def __init__(self, mes, ano, diretorio=AUTOSAVE_DIR, compactar_a_cada=COMPACTAR_A_CADA,
+                 intervalo_fsync=INTERVALO_FSYNC):
+        self.mes = mes
+        self.ano = ano
+        self.pasta = Path(diretorio) / f"escala_{mes:02d}_{ano}"
+        self.compactar_a_cada = compactar_a_cada
+        self.intervalo_fsync = intervalo_fsync
+        self.arquivo = None
+        self.pendente = False
+        self.ultimo_fsync = 0.0
+        bases = self._bases()
+        self.base = bases[-1] if bases else None
+        self.versao = self._ultima_versao(self.base)
+
+    def _caminho_base(self, versao):
+        return self.pasta / f"base_{versao:06d}.json"
+
+    def _caminho_segmento(self, versao):
+        return self.pasta / f"diario_{versao:06d}.jsonl"
+
+    def _bases(self):
+        if not self.pasta.exists():
+            return []
+        return sorted(int(p.stem[len("base_"):]) for p in self.pasta.glob("base_*.json"))
+
+    def _ler_segmento(self, base):
+        caminho = self._caminho_segmento(base)
+        if not caminho.exists():
+            return
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    yield json.loads(linha)
+                except ValueError:
+                    return
+
+    def _ultima_versao(self, base):
+        if base is None:
+            return 0
+        versao = base
+        for entrada in self._ler_segmento(base):
+            versao = entrada['v']
+        return versao
+
+    def existe(self):
+        return self.base is not None
+
+    def iniciar(self, escala):
+        if self.base is not None:
+            self.versao += 1
+        self.compactar(escala)
+
+    def compactar(self, escala):
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        dados = escala.para_dict()
+        dados['versao'] = self.versao
+        gravar_json_atomico(self._caminho_base(self.versao), dados)
+        self.fechar()
+        self.base = self.versao
+        self.arquivo = open(self._caminho_segmento(self.base), 'a', encoding='utf-8')
+
+    def _anotar(self, entrada, escala):
+        if self.arquivo is None:
+            self.compactar(escala)
+            return
+        self.versao += 1
+        entrada['v'] = self.versao
+        entrada['t'] = round(time.time(), 3)
+        linha = json.dumps(entrada, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self.arquivo.write(linha)
+        self.arquivo.flush()
+        self.pendente = True
+        contar('bytes_gravados', len(linha.encode('utf-8')))
+        if self.versao - self.base >= self.compactar_a_cada:
+            self.compactar(escala)
+        elif time.monotonic() - self.ultimo_fsync >= self.intervalo_fsync:
+            self.sincronizar()
+
+    def sincronizar(self):
+        """Garante no disco as linhas já anotadas (fsync do segmento atual)."""
+        if self.arquivo is not None and self.pendente:
+            os.fsync(self.arquivo.fileno())
+            self.pendente = False
+            self.ultimo_fsync = time.monotonic()
+
+    def registrar_celula(self, escala, row, turno, nome):
+        self._anotar({'r': row, 'c': turno, 'n': nome}, escala)
+
+    def registrar_feriado(self, escala, data_texto, marcado):
+        self._anotar({'f': data_texto, 'm': marcado}, escala)
+
+    def reconstruir(self, versao=None):
+        if versao is None:
+            versao = self.versao
+        bases = [b for b in self._bases() if b <= versao]
+        if not bases:
+            raise ValueError(f"Versão {versao} não encontrada no salvamento automático")
+        base = bases[-1]
+        with open(self._caminho_base(base), 'r', encoding='utf-8') as f:
+            escala = Escala.de_dict(json.load(f))
+        for entrada in self._ler_segmento(base):
+            if entrada['v'] > versao:
+                break
+            if 'f' in entrada:
+                if entrada['m']:
+                    escala.feriados.add(entrada['f'])
+                else:
+                    escala.feriados.discard(entrada['f'])
+                escala.recalcular_destaques()
+            else:
+                escala.definir(entrada['r'], entrada['c'], entrada['n'])
+        return escala
+
+    def fechar(self):
+        if self.arquivo is not None:
+            self.sincronizar()
+            self.arquivo.close()
+            self.arquivo = None
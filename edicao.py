@@ -0,0 +1,135 @@
+"""Edições em lote da escala e histórico de desfazer/refazer.
+
+As operações em lote (repetir a semana, rodízio numa coluna, colar TSV de
+uma planilha) só calculam a lista de ``(row, turno, nome)``; quem aplica é
+``EscalaTableModel.definir_celulas``, de uma vez. O histórico guarda apenas
+as células alteradas de cada passo (posição, id anterior, id novo) num
+``array``, nunca cópias da escala.
+"""
+from array import array
+from collections import deque
+
+from modelo import TURNOS
+
+
+DIAS_SEMANA_PADRAO = 7
+LIMITE_CELULAS_HISTORICO = 50000
+
+
+def repetir_semana(escala, inicio, turnos=None):
+    """Copia os 7 dias a partir de ``inicio`` para o restante do mês (antes e depois)."""
+    if inicio < 0 or inicio + DIAS_SEMANA_PADRAO > escala.num_dias:
+        raise ValueError("A semana de referência precisa caber no mês")
+    turnos = range(len(TURNOS)) if turnos is None else turnos
+    alteracoes = []
+    for row in range(escala.num_dias):
+        origem = inicio + (row - inicio) % DIAS_SEMANA_PADRAO
+        if origem != row:
+            alteracoes.extend((row, turno, escala.medico(origem, turno)) for turno in turnos)
+    return alteracoes
+
+
+def rodizio(escala, turno, nomes, inicio=0, fim=None):
+    """Distribui ``nomes`` em sequência, um por dia, na coluna ``turno``."""
+    nomes = [nome.strip() for nome in nomes if nome.strip()]
+    if not nomes:
+        raise ValueError("Informe ao menos um médico")
+    fim = escala.num_dias if fim is None else min(fim, escala.num_dias)
+    return [(row, turno, nomes[(row - inicio) % len(nomes)]) for row in range(inicio, fim)]
+
+
+def ler_tsv(texto):
+    """Linhas de células de um texto copiado de planilha (tabulações e quebras de linha)."""
+    linhas = texto.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if linhas and linhas[-1] == '':
+        linhas.pop()
+    return [linha.split('\t') for linha in linhas]
+
+
+def colar_tsv(escala, texto, row, turno, canonico=None):
+    """Alterações para colar ``texto`` a partir da célula (row, turno).
+
+    O que passar do fim do mês ou da última coluna é ignorado; células vazias
+    da planilha limpam o turno, como num colar comum. ``turno`` negativo
+    indica que a colagem começa nas colunas de Data/Dia, que são puladas.
+    """
+    alteracoes = []
+    for i, celulas in enumerate(ler_tsv(texto)):
+        if row + i >= escala.num_dias:
+            break
+        for j, nome in enumerate(celulas[:len(TURNOS) - turno]):
+            if turno + j < 0:
+                continue
+            nome = nome.strip()
+            if canonico is not None and nome:
+                nome = canonico(nome)
+            alteracoes.append((row + i, turno + j, nome))
+    return alteracoes
+
+
+def copiar_tsv(escala, rows, colunas):
+    """Texto TSV das células (linhas x colunas da tabela, incluindo Data e Dia)."""
+    return ''.join('\t'.join(escala.texto(row, col) for col in colunas) + '\n' for row in rows)
+
+
+class HistoricoEdicoes:
+    """Pilhas de desfazer/refazer com as diferenças de cada passo.
+
+    Cada passo é ``(descricao, delta)``, com ``delta`` um ``array('I')`` de
+    triplas (posição, id anterior, id novo). Quando o total de células passa
+    de ``limite_celulas``, os passos mais antigos são descartados.
+    """
+
+    def __init__(self, limite_celulas=LIMITE_CELULAS_HISTORICO):
+        self.limite_celulas = limite_celulas
+        self.passos = deque()
+        self.desfeitos = []
+        self.celulas = 0
+
+    def limpar(self):
+        self.passos.clear()
+        self.desfeitos.clear()
+        self.celulas = 0
+
+    def novo_delta(self):
+        return array('I')
+
+    def registrar(self, descricao, delta):
+        if not delta:
+            return
+        for _, desfeito in self.desfeitos:
+            self.celulas -= len(desfeito) // 3
+        self.desfeitos.clear()
+        self.passos.append((descricao, delta))
+        self.celulas += len(delta) // 3
+        while self.celulas > self.limite_celulas and len(self.passos) > 1:
+            _, antigo = self.passos.popleft()
+            self.celulas -= len(antigo) // 3
+
+    def pode_desfazer(self):
+        return bool(self.passos)
+
+    def pode_refazer(self):
+        return bool(self.desfeitos)
+
+    def proximo_desfazer(self):
+        return self.passos[-1][0] if self.passos else None
+
+    def proximo_refazer(self):
+        return self.desfeitos[-1][0] if self.desfeitos else None
+
+    def desfazer(self):
+        """Retira o último passo: (descricao, [(posição, id anterior), ...]) ou None."""
+        if not self.passos:
+            return None
+        descricao, delta = self.passos.pop()
+        self.desfeitos.append((descricao, delta))
+        return descricao, [(delta[i], delta[i + 1]) for i in range(len(delta) - 3, -1, -3)]
+
+    def refazer(self):
+        """Reaplica o último passo desfeito: (descricao, [(posição, id novo), ...]) ou None."""
+        if not self.desfeitos:
+            return None
+        descricao, delta = self.desfeitos.pop()
+        self.passos.append((descricao, delta))
+        return descricao, [(delta[i], delta[i + 2]) for i in range(0, len(delta), 3)]
@@ -0,0 +1,199 @@
+from calendar import monthrange
+from datetime import date
+
+from feriados import DIA_UTIL, tipos_do_mes
+from modelo import TURNOS
+
+
+# Horário de cada turno em horas a partir da meia-noite do dia da escala.
+# A noite atravessa a meia-noite e termina na manhã do dia seguinte.
+HORARIOS = {
+    'manha': (7, 13),
+    'tarde': (13, 19),
+    'noite': (19, 31),
+}
+
+
+class Medico:
+    __slots__ = ('nome', 'max_por_semana', 'turnos', 'dias_indisponiveis', 'turnos_indisponiveis')
+
+    def __init__(self, nome, max_por_semana=None, indisponivel=(), turnos=TURNOS):
+        self.nome = nome
+        self.max_por_semana = max_por_semana
+        self.turnos = frozenset(turnos)
+        self.dias_indisponiveis = set()
+        self.turnos_indisponiveis = set()
+        for item in indisponivel:
+            if isinstance(item, tuple):
+                dia, turno = item
+                self.turnos_indisponiveis.add((_numero_dia(dia), turno))
+            else:
+                self.dias_indisponiveis.add(_numero_dia(item))
+
+    def disponivel(self, dia, turno):
+        return (turno in self.turnos
+                and dia not in self.dias_indisponiveis
+                and (dia, turno) not in self.turnos_indisponiveis)
+
+
+def _numero_dia(dia):
+    return dia.day if isinstance(dia, date) else int(dia)
+
+
+class Solucao:
+    def __init__(self, num_dias, celulas, pendentes):
+        self.num_dias = num_dias
+        self.celulas = celulas
+        self.pendentes = pendentes
+
+    def get(self, dia, turno):
+        return self.celulas.get((dia, turno), '')
+
+
+class Escalador:
+    """Preenche automaticamente os turnos de um mês.
+
+    Respeita disponibilidade, limite semanal, um turno por dia e o descanso
+    mínimo (em horas) após uma noite, distribuindo de forma equilibrada os
+    plantões de fim de semana/feriado e o total de plantões. Células
+    travadas são mantidas; ``travar`` e ``liberar`` refazem apenas o que a
+    mudança invalidou, preservando o restante da solução anterior.
+    """
+
+    def __init__(self, ano, mes, medicos, feriados=(), descanso_horas=11, max_por_dia=1):
+        self.ano = ano
+        self.mes = mes
+        self.num_dias = monthrange(ano, mes)[1]
+        self.medicos = list(medicos)
+        self.descanso_horas = descanso_horas
+        self.max_por_dia = max_por_dia
+        self.travadas = {}
+        self.solucao = None
+
+        self.semana = [0] * (self.num_dias + 2)
+        self.destaque = [False] * (self.num_dias + 2)
+        tipos = tipos_do_mes(ano, mes, feriados)
+        for dia in range(1, self.num_dias + 1):
+            self.semana[dia] = date(ano, mes, dia).isocalendar()[1]
+            self.destaque[dia] = tipos[dia - 1] != DIA_UTIL
+
+        # Quantos dias para trás/frente um turno pode interferir no descanso.
+        self.janela = 1 + (max(HORARIOS[t][1] for t in TURNOS) + descanso_horas) // 24
+
+    def _novo_estado(self):
+        n = len(self.medicos)
+        return {
+            'por_dia': [dict() for _ in range(n)],
+            'total': [0] * n,
+            'destaque': [0] * n,
+            'semanas': [dict() for _ in range(n)],
+        }
+
+    def _conflita(self, estado, i, dia, turno):
+        por_dia = estado['por_dia'][i]
+        turnos_dia = por_dia.get(dia)
+        if turnos_dia and (len(turnos_dia) >= self.max_por_dia or turno in turnos_dia):
+            return True
+
+        inicio = (dia - 1) * 24 + HORARIOS[turno][0]
+        fim = (dia - 1) * 24 + HORARIOS[turno][1]
+        for outro_dia in range(dia - self.janela, dia + self.janela + 1):
+            for outro in por_dia.get(outro_dia, ()):
+                if outro_dia == dia and outro == turno:
+                    continue
+                outro_inicio = (outro_dia - 1) * 24 + HORARIOS[outro][0]
+                outro_fim = (outro_dia - 1) * 24 + HORARIOS[outro][1]
+                if outro_inicio < fim and inicio < outro_fim:
+                    return True
+                if outro == 'noite' and outro_fim <= inicio < outro_fim + self.descanso_horas:
+                    return True
+                if turno == 'noite' and fim <= outro_inicio < fim + self.descanso_horas:
+                    return True
+        return False
+
+    def _pode(self, estado, i, dia, turno):
+        medico = self.medicos[i]
+        if not medico.disponivel(dia, turno):
+            return False
+        if medico.max_por_semana is not None:
+            if estado['semanas'][i].get(self.semana[dia], 0) >= medico.max_por_semana:
+                return False
+        return not self._conflita(estado, i, dia, turno)
+
+    def _atribuir(self, estado, i, dia, turno):
+        estado['por_dia'][i].setdefault(dia, []).append(turno)
+        estado['total'][i] += 1
+        if self.destaque[dia]:
+            estado['destaque'][i] += 1
+        semanas = estado['semanas'][i]
+        semanas[self.semana[dia]] = semanas.get(self.semana[dia], 0) + 1
+
+    def _ordem_vagas(self):
+        vagas = [(dia, turno) for dia in range(1, self.num_dias + 1) for turno in TURNOS]
+        # Fins de semana/feriados primeiro, para que sejam repartidos por igual.
+        return sorted(vagas, key=lambda v: (not self.destaque[v[0]], v[0]))
+
+    def _resolver(self, preferidas):
+        indices = {medico.nome: i for i, medico in enumerate(self.medicos)}
+        estado = self._novo_estado()
+        celulas = {}
+
+        for (dia, turno), nome in self.travadas.items():
+            celulas[(dia, turno)] = nome
+            i = indices.get(nome)
+            if i is not None:
+                self._atribuir(estado, i, dia, turno)
+
+        for (dia, turno), nome in preferidas.items():
+            if (dia, turno) in celulas:
+                continue
+            i = indices.get(nome)
+            if i is not None and self._pode(estado, i, dia, turno):
+                celulas[(dia, turno)] = nome
+                self._atribuir(estado, i, dia, turno)
+
+        pendentes = []
+        n = len(self.medicos)
+        for dia, turno in self._ordem_vagas():
+            if (dia, turno) in celulas:
+                continue
+            escolhido = None
+            melhor = None
+            for desloc in range(n):
+                i = (dia * len(TURNOS) + TURNOS.index(turno) + desloc) % n
+                chave = (estado['destaque'][i] if self.destaque[dia] else 0, estado['total'][i])
+                if melhor is not None and chave >= melhor:
+                    continue
+                if self._pode(estado, i, dia, turno):
+                    escolhido, melhor = i, chave
+            if escolhido is None:
+                pendentes.append((dia, turno))
+                continue
+            celulas[(dia, turno)] = self.medicos[escolhido].nome
+            self._atribuir(estado, escolhido, dia, turno)
+
+        self.solucao = Solucao(self.num_dias, celulas, pendentes)
+        return self.solucao
+
+    def resolver(self, travadas=None):
+        if travadas is not None:
+            self.travadas = {k: v for k, v in travadas.items() if v}
+        return self._resolver({})
+
+    def travar(self, dia, turno, nome):
+        if nome:
+            self.travadas[(dia, turno)] = nome
+        else:
+            self.travadas.pop((dia, turno), None)
+        return self._resolver(self.solucao.celulas if self.solucao else {})
+
+    def liberar(self, dia, turno):
+        self.travadas.pop((dia, turno), None)
+        anteriores = dict(self.solucao.celulas) if self.solucao else {}
+        anteriores.pop((dia, turno), None)
+        return self._resolver(anteriores)
+
+
+def preencher_mes(ano, mes, medicos, feriados=(), travadas=None, descanso_horas=11):
+    escalador = Escalador(ano, mes, medicos, feriados, descanso_horas)
+    return escalador.resolver(travadas)
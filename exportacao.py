@@ -0,0 +1,608 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.lib.enums import TA_CENTER
+from PIL import Image, ImageDraw, ImageFont
+
+from armazenamento import EXTENSOES
+from modelo import MESES, CABECALHOS, ler_escala
+
+
+FONTE_NORMAL = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FONTE_NEGRITO = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+ESTILO_TABELA_PDF = (
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#5c6bc0')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+    ('TOPPADDING', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+)
+COR_DESTAQUE_PDF = colors.HexColor('#8AB4F8')
+LARGURAS_PDF = (35*mm, 40*mm, 60*mm, 60*mm, 60*mm)
+FONTE_CELULA_PDF = ('Helvetica', 9)
+# Padding horizontal padrão das células do Table (6 pt de cada lado).
+PADDING_CELULA_PDF = 12
+
+# Medidas do PNG são dadas a 96 dpi e escaladas para a resolução pedida.
+DPI_PNG = 96
+LARGURAS_PNG = (120, 140, 220, 220, 220)
+# Tamanhos (em pixels a DPI_PNG) tentados, em ordem, para os nomes das células.
+TAMANHOS_FONTE_CELULA = (11, 10, 9, 8)
+# Fundo das linhas: par, ímpar e fim de semana/feriado.
+CORES_FAIXA_PNG = ('#f5f5f5', 'white', '#8AB4F8')
+FAIXA_DESTAQUE = 2
+
+
+# Recursos de renderização compartilhados entre exportações (e entre as
+# tarefas de um mesmo processo na exportação em lote), com despejo LRU.
+
+@lru_cache(maxsize=16)
+def fonte(caminho, tamanho):
+    try:
+        return ImageFont.truetype(caminho, tamanho)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4096)
+def medir_texto(texto, font):
+    bbox = font.getbbox(texto)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+@lru_cache(maxsize=4096)
+def mascara_texto(texto, font):
+    """Texto rasterizado uma única vez: (máscara, deslocamento x, deslocamento y)."""
+    esquerda, topo, direita, base = font.getbbox(texto)
+    mascara = Image.new('L', (max(direita - esquerda, 1), max(base - topo, 1)))
+    ImageDraw.Draw(mascara).text((-esquerda, -topo), texto, fill=255, font=font)
+    return mascara, esquerda, topo
+
+
+@lru_cache(maxsize=4096)
+def largura_pdf(texto):
+    return stringWidth(texto, *FONTE_CELULA_PDF)
+
+
+@lru_cache(maxsize=1)
+def estilo_celula_pdf():
+    return ParagraphStyle('Celula', fontName=FONTE_CELULA_PDF[0], fontSize=FONTE_CELULA_PDF[1],
+                          leading=FONTE_CELULA_PDF[1] + 2, alignment=TA_CENTER)
+
+
+@lru_cache(maxsize=1)
+def estilo_titulo_pdf():
+    styles = getSampleStyleSheet()
+    return ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.HexColor('#1a237e'),
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+
+class ExportacaoCancelada(Exception):
+    """Exportação interrompida pelo ``progresso``; ``arquivos`` são as partes já gravadas."""
+
+    def __init__(self, arquivos=()):
+        super().__init__()
+        self.arquivos = list(arquivos)
+
+
+def _avancar(progresso, fracao):
+    if progresso is not None and progresso(fracao) is False:
+        raise ExportacaoCancelada()
+
+
+def titulo_escala(escala):
+    unidade = f" - {escala.unidade}" if escala.unidade else ""
+    return f"Escala de Plantão{unidade} - {MESES[escala.mes]}/{escala.ano}"
+
+
+def documento_pdf(filename, classe=SimpleDocTemplate, **kwargs):
+    return classe(filename, pagesize=landscape(A4),
+                  leftMargin=15*mm, rightMargin=15*mm,
+                  topMargin=15*mm, bottomMargin=15*mm, **kwargs)
+
+
+def _celula_pdf(texto, largura):
+    # Só nomes que não cabem na coluna viram Paragraph (que quebra linhas, mas custa mais).
+    if texto and largura_pdf(texto) > largura - PADDING_CELULA_PDF:
+        return Paragraph(escape(texto), estilo_celula_pdf())
+    return texto
+
+
+def elementos_pdf(escala):
+    """Título e tabela de uma escala; o cabeçalho da tabela se repete nas páginas seguintes."""
+    table_data = [list(CABECALHOS)]
+    for row in range(escala.num_dias):
+        table_data.append([_celula_pdf(texto, largura)
+                           for texto, largura in zip(escala.linha(row), LARGURAS_PDF)])
+
+    table = Table(table_data, colWidths=LARGURAS_PDF, repeatRows=1)
+
+    style = TableStyle(list(ESTILO_TABELA_PDF))
+
+    for row in range(escala.num_dias):
+        if escala.eh_destaque(row):
+            style.add('BACKGROUND', (0, row + 1), (-1, row + 1), COR_DESTAQUE_PDF)
+
+    table.setStyle(style)
+    return [Paragraph(titulo_escala(escala), estilo_titulo_pdf()), Spacer(1, 10*mm), table]
+
+
+class DocumentoEmGrupos(SimpleDocTemplate):
+    """Documento cujos flowables chegam em grupos, gerados sob demanda.
+
+    O ``build`` começa com o primeiro grupo; ``handle_flowable`` recebe a
+    própria lista que ele está consumindo e, quando o último flowable de um
+    grupo é paginado, acrescenta o grupo seguinte, então apenas uma escala
+    por vez fica em memória.
+    """
+
+    def __init__(self, filename, grupos, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.grupos = iter(grupos)
+        self.fluxo = []
+
+    def proximo_grupo(self):
+        return list(next(self.grupos, ()))
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        # Também é chamado para os flowables pendentes do reportlab; só a lista
+        # do ``build`` recebe os grupos seguintes.
+        if flowables is self.fluxo and not flowables:
+            flowables.extend(self.proximo_grupo())
+
+    def build(self, **kwargs):
+        self.fluxo = self.proximo_grupo()
+        super().build(self.fluxo, **kwargs)
+        if next(self.grupos, None) is not None:
+            raise RuntimeError("o PDF terminou antes de paginar todas as escalas")
+
+
+def gerar_pdf(escala, filename, progresso=None):
+    doc = documento_pdf(filename)
+
+    elements = elementos_pdf(escala)
+    _avancar(progresso, 0.2)
+
+    if progresso is not None:
+        total = [len(elements)]
+
+        def acompanhar(tipo, valor):
+            if tipo == 'SIZE_EST':
+                total[0] = max(valor, 1)
+            elif tipo == 'PROGRESS':
+                _avancar(progresso, 0.2 + 0.8 * valor / total[0])
+
+        doc.setProgressCallBack(acompanhar)
+    doc.build(elements)
+    if progresso is not None:
+        progresso(1.0)
+
+
+def gerar_pdf_combinado(escalas, filename, progresso=None, total=None):
+    """Um único PDF com várias escalas (unidades, meses), cada uma a partir de uma página nova.
+
+    ``escalas`` pode ser um gerador (ver ``ler_escalas``): cada escala é lida,
+    paginada e descartada antes da seguinte. ``total`` (a quantidade de
+    escalas) só é usado para o progresso.
+    """
+    if total is None and hasattr(escalas, '__len__'):
+        total = len(escalas)
+
+    def grupos():
+        for i, escala in enumerate(escalas):
+            if total:
+                _avancar(progresso, i / total)
+            elementos = elementos_pdf(escala)
+            if i:
+                elementos.insert(0, PageBreak())
+            yield elementos
+
+    documento_pdf(filename, DocumentoEmGrupos, grupos=grupos()).build()
+    if progresso is not None:
+        progresso(1.0)
+
+
+def ler_escalas(caminhos):
+    for caminho in caminhos:
+        yield ler_escala(caminho)
+
+
+class LayoutPNG:
+    """Medidas (em pixels) e partes fixas da tabela PNG numa resolução.
+
+    As faixas de fundo das linhas (com as bordas das células) e o cabeçalho
+    são desenhados uma única vez; cada imagem só os cola linha a linha e
+    escreve os textos por cima.
+    """
+
+    __slots__ = ('dpi', 'larguras', 'largura_tabela', 'altura_linha', 'altura_cabecalho',
+                 'altura_titulo', 'margem', 'folga', 'fonte_titulo', 'fontes_celula', 'faixas',
+                 'cabecalho')
+
+    def __init__(self, dpi):
+        fator = dpi / DPI_PNG
+
+        def px(valor):
+            return max(1, round(valor * fator))
+
+        self.dpi = dpi
+        self.larguras = [px(largura) for largura in LARGURAS_PNG]
+        self.largura_tabela = sum(self.larguras)
+        self.altura_linha = px(35)
+        self.altura_cabecalho = px(50)
+        self.altura_titulo = px(60)
+        self.margem = px(30)
+        # Espaço livre mínimo numa célula; nomes maiores são quebrados em duas
+        # linhas ou escritos com uma fonte menor (ver ``linhas_cabiveis``).
+        self.folga = px(8)
+        self.fonte_titulo = fonte(FONTE_NEGRITO, px(24))
+        self.fontes_celula = tuple(fonte(FONTE_NORMAL, px(tamanho))
+                                   for tamanho in TAMANHOS_FONTE_CELULA)
+
+        self.faixas = []
+        for cor in CORES_FAIXA_PNG:
+            faixa = Image.new('RGB', (self.largura_tabela + 1, self.altura_linha + 1), 'white')
+            draw = ImageDraw.Draw(faixa)
+            x = 0
+            for largura in self.larguras:
+                draw.rectangle([x, 0, x + largura, self.altura_linha],
+                               fill=cor, outline='#d0d0d0', width=px(1))
+                x += largura
+            self.faixas.append(faixa)
+
+        self.cabecalho = Image.new('RGB', (self.largura_tabela + 1, self.altura_cabecalho + 1),
+                                   'white')
+        draw = ImageDraw.Draw(self.cabecalho)
+        fonte_cabecalho = fonte(FONTE_NEGRITO, px(14))
+        x = 0
+        for largura, texto in zip(self.larguras, CABECALHOS):
+            draw.rectangle([x, 0, x + largura, self.altura_cabecalho],
+                           fill='#5c6bc0', outline='#4a5a9f', width=px(2))
+            colar_texto(self.cabecalho, texto, fonte_cabecalho, 'white',
+                        x, 0, largura, self.altura_cabecalho)
+            x += largura
+
+    def largura(self):
+        return self.largura_tabela + 2 * self.margem
+
+    def altura(self, linhas):
+        return self.altura_titulo + self.altura_cabecalho + linhas * self.altura_linha + 2 * self.margem
+
+
+@lru_cache(maxsize=4)
+def layout_png(dpi):
+    return LayoutPNG(dpi)
+
+
+@lru_cache(maxsize=4096)
+def texto_cabivel(texto, font, largura):
+    """O texto, ou o maior prefixo dele seguido de reticências que caiba na largura."""
+    if medir_texto(texto, font)[0] <= largura:
+        return texto
+    baixo, alto = 0, len(texto)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if medir_texto(texto[:meio].rstrip() + "…", font)[0] <= largura:
+            baixo = meio
+        else:
+            alto = meio - 1
+    return texto[:baixo].rstrip() + "…"
+
+
+def _quebrar_em_duas(palavras, font, largura):
+    """A quebra entre palavras em que as duas linhas cabem, a mais equilibrada."""
+    melhor = None
+    for i in range(1, len(palavras)):
+        linhas = (' '.join(palavras[:i]), ' '.join(palavras[i:]))
+        maior = max(medir_texto(linha, font)[0] for linha in linhas)
+        if maior <= largura and (melhor is None or maior < melhor[0]):
+            melhor = (maior, linhas)
+    return melhor[1] if melhor else None
+
+
+@lru_cache(maxsize=4096)
+def linhas_cabiveis(texto, fontes, largura):
+    """(fonte, linhas) para escrever o texto inteiro na largura da célula.
+
+    Em cada tamanho de ``fontes`` (do maior ao menor) tenta o texto numa linha
+    e depois quebrado em duas entre palavras. Só se nem a menor fonte der
+    conta, a segunda linha (ou a única, para uma palavra só) é abreviada com
+    reticências.
+    """
+    palavras = texto.split()
+    for font in fontes:
+        if medir_texto(texto, font)[0] <= largura:
+            return font, (texto,)
+        linhas = _quebrar_em_duas(palavras, font, largura)
+        if linhas:
+            return font, linhas
+    font = fontes[-1]
+    if medir_texto(palavras[0], font)[0] > largura:
+        return font, (texto_cabivel(texto, font, largura),)
+    i = 1
+    while medir_texto(' '.join(palavras[:i + 1]), font)[0] <= largura:
+        i += 1
+    return font, (' '.join(palavras[:i]), texto_cabivel(' '.join(palavras[i:]), font, largura))
+
+
+def colar_texto(img, texto, font, cor, x, y, largura, altura):
+    """Centraliza o texto na caixa (x, y, largura, altura), como ``draw.text`` faria."""
+    mascara, esquerda, topo = mascara_texto(texto, font)
+    text_width, text_height = medir_texto(texto, font)
+    x += (largura - text_width) // 2 + esquerda
+    y += (altura - text_height) // 2 + topo
+    img.paste(cor, (x, y, x + mascara.width, y + mascara.height), mascara)
+
+
+def colar_linhas(img, linhas, font, cor, x, y, largura, altura):
+    """Como ``colar_texto``, com as linhas empilhadas e o bloco centralizado na caixa."""
+    altura_linha = sum(font.getmetrics())
+    y += (altura - altura_linha * len(linhas)) // 2
+    for linha in linhas:
+        colar_texto(img, linha, font, cor, x, y, largura, altura_linha)
+        y += altura_linha
+
+
+def renderizar_png(escala, dpi=DPI_PNG, inicio=0, fim=None, titulo=None, progresso=None):
+    """Imagem das linhas ``inicio:fim`` da escala (todas, por padrão)."""
+    layout = layout_png(dpi)
+    fim = escala.num_dias if fim is None else fim
+    img = Image.new('RGB', (layout.largura(), layout.altura(fim - inicio)), color='white')
+
+    titulo = titulo or titulo_escala(escala)
+    colar_texto(img, titulo, layout.fonte_titulo, '#1a237e',
+                0, layout.margem, img.width, medir_texto(titulo, layout.fonte_titulo)[1])
+
+    y = layout.margem + layout.altura_titulo
+    img.paste(layout.cabecalho, (layout.margem, y))
+    y += layout.altura_cabecalho
+
+    for row in range(inicio, fim):
+        tipo = FAIXA_DESTAQUE if escala.eh_destaque(row) else row % 2
+        img.paste(layout.faixas[tipo], (layout.margem, y))
+        x = layout.margem
+        for largura, texto in zip(layout.larguras, escala.linha(row)):
+            if texto:
+                font, linhas = linhas_cabiveis(texto, layout.fontes_celula,
+                                               largura - layout.folga)
+                colar_linhas(img, linhas, font, 'black', x, y, largura, layout.altura_linha)
+            x += largura
+        y += layout.altura_linha
+        _avancar(progresso, (row + 1 - inicio) / (fim - inicio))
+    return img
+
+
+def gerar_png(escala, filename, progresso=None, dpi=DPI_PNG, linhas_por_imagem=None):
+    """Grava a escala em PNG; com ``linhas_por_imagem``, divide-a em várias imagens.
+
+    As partes são gravadas como ``nome_1.png``, ``nome_2.png``...; devolve
+    os arquivos gravados.
+    """
+    n = escala.num_dias
+    passo = linhas_por_imagem if linhas_por_imagem and linhas_por_imagem < n else n
+    partes = [(inicio, min(inicio + passo, n)) for inicio in range(0, n, passo)]
+    destino = Path(filename)
+    arquivos = []
+    for i, (inicio, fim) in enumerate(partes):
+        titulo = None
+        arquivo = destino
+        if len(partes) > 1:
+            titulo = f"{titulo_escala(escala)} ({i + 1}/{len(partes)})"
+            arquivo = destino.with_name(f"{destino.stem}_{i + 1}{destino.suffix}")
+
+        def progresso_parte(fracao, i=i):
+            return progresso(0.95 * (i + fracao) / len(partes))
+
+        try:
+            img = renderizar_png(escala, dpi, inicio, fim, titulo,
+                                 progresso_parte if progresso is not None else None)
+        except ExportacaoCancelada as e:
+            e.arquivos.extend(arquivos)
+            raise
+        img.save(arquivo, 'PNG', dpi=(dpi, dpi))
+        arquivos.append(str(arquivo))
+    if progresso is not None:
+        progresso(1.0)
+    return arquivos
+
+
+def gerar_png_combinado(escalas, filename, progresso=None, total=None, dpi=DPI_PNG,
+                        colunas=3, por_imagem=6):
+    """Mosaico de várias escalas (unidades, meses), ``por_imagem`` por arquivo.
+
+    Cada escala é renderizada e colada na sua posição da folha; só a folha
+    atual fica em memória. As folhas são gravadas como ``nome_1.png``,
+    ``nome_2.png``...; devolve os arquivos gravados.
+    """
+    if total is None and hasattr(escalas, '__len__'):
+        total = len(escalas)
+    layout = layout_png(dpi)
+    largura, altura = layout.largura(), layout.altura(31)
+    linhas = -(-por_imagem // colunas)
+    destino = Path(filename)
+    arquivos = []
+    folha = None
+
+    def gravar():
+        arquivo = destino.with_name(f"{destino.stem}_{len(arquivos) + 1}{destino.suffix}")
+        folha.save(arquivo, 'PNG', dpi=(dpi, dpi))
+        arquivos.append(str(arquivo))
+
+    try:
+        for i, escala in enumerate(escalas):
+            if total:
+                _avancar(progresso, i / total)
+            posicao = i % por_imagem
+            if posicao == 0:
+                if folha is not None:
+                    gravar()
+                folha = Image.new('RGB', (largura * colunas, altura * linhas), color='white')
+            linha, coluna = divmod(posicao, colunas)
+            folha.paste(renderizar_png(escala, dpi), (coluna * largura, linha * altura))
+    except ExportacaoCancelada as e:
+        e.arquivos.extend(arquivos)
+        raise
+    if folha is not None:
+        gravar()
+    if progresso is not None:
+        progresso(1.0)
+    return arquivos
+
+
+CACHES_RENDERIZACAO = (fonte, medir_texto, mascara_texto, texto_cabivel, linhas_cabiveis,
+                       layout_png, largura_pdf, estilo_celula_pdf, estilo_titulo_pdf)
+
+
+def limpar_cache_renderizacao():
+    for cache in CACHES_RENDERIZACAO:
+        cache.cache_clear()
+
+
+def estatisticas_cache_renderizacao():
+    return {cache.__name__: cache.cache_info() for cache in CACHES_RENDERIZACAO}
+
+
+GERADORES = {
+    'pdf': gerar_pdf,
+    'png': gerar_png,
+}
+
+
+def _renderizar(caminho, formato, saida, opcoes=None):
+    inicio = time.perf_counter()
+    destino = Path(saida) / f"{Path(caminho).stem}.{formato}"
+    try:
+        escala = ler_escala(caminho)
+        if escala.unidade:
+            # Unidades diferentes têm arquivos com o mesmo nome em pastas distintas.
+            destino = destino.with_name(f"{Path(caminho).parent.name}_{destino.name}")
+        # O PNG pode ter sido dividido em partes; o gerador devolve os arquivos gravados.
+        gravados = GERADORES[formato](escala, str(destino), **(opcoes or {}))
+    except Exception as e:
+        return caminho, str(destino), time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+    return caminho, ', '.join(gravados or [str(destino)]), time.perf_counter() - inicio, None
+
+
+def expandir_entradas(entradas):
+    arquivos = []
+    for entrada in entradas:
+        if Path(entrada).is_dir():
+            arquivos.extend(sorted(str(p) for p in Path(entrada).glob("escala_*")
+                                   if p.suffix in EXTENSOES))
+            continue
+        encontrados = sorted(glob.glob(entrada))
+        if encontrados:
+            arquivos.extend(encontrados)
+        else:
+            arquivos.append(entrada)
+    vistos = set()
+    return [a for a in arquivos if not (a in vistos or vistos.add(a))]
+
+
+def exportar_lote(arquivos, formatos, saida, processos=None, log=sys.stdout, opcoes=None):
+    """Exporta em paralelo; ``opcoes`` dá argumentos extras por formato (ex.: {'png': {'dpi': 150}})."""
+    opcoes = opcoes or {}
+    Path(saida).mkdir(parents=True, exist_ok=True)
+    tarefas = [(arquivo, formato) for arquivo in arquivos for formato in formatos]
+    falhas = []
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = [pool.submit(_renderizar, arquivo, formato, saida, opcoes.get(formato))
+                   for arquivo, formato in tarefas]
+        for futuro in as_completed(futuros):
+            caminho, destino, duracao, erro = futuro.result()
+            if erro:
+                falhas.append((caminho, erro))
+                print(f"ERRO {caminho} -> {destino}: {erro}", file=log)
+            else:
+                print(f"ok   {destino} ({duracao * 1000:.0f} ms)", file=log)
+    total = time.perf_counter() - inicio
+    gerados = len(tarefas) - len(falhas)
+    taxa = gerados / total if total > 0 else 0.0
+    print(f"{gerados}/{len(tarefas)} arquivos gerados a partir de {len(arquivos)} escalas "
+          f"em {total:.2f} s ({taxa:.1f} arquivos/s)", file=log)
+    return falhas
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="plantao-hospital exportar",
+        description="Exporta escalas salvas para PDF/PNG sem abrir a interface gráfica.")
+    parser.add_argument('entradas', nargs='+',
+                        help="arquivos .json/.escb, padrões glob (ex.: 'escalas/*.json') ou pastas")
+    parser.add_argument('-f', '--formato', choices=sorted(GERADORES), action='append',
+                        help="formato de saída (pode repetir; padrão: pdf e png)")
+    parser.add_argument('-o', '--saida', default='exportacoes',
+                        help="pasta de destino (padrão: exportacoes)")
+    parser.add_argument('-j', '--processos', type=int, default=os.cpu_count(),
+                        help="número de processos (padrão: número de CPUs)")
+    parser.add_argument('--combinado', metavar='ARQUIVO',
+                        help="grava todas as escalas, na ordem dada, em um único PDF ou em "
+                             "mosaicos PNG (conforme a extensão), em vez de um arquivo por escala")
+    parser.add_argument('--dpi', type=int, default=DPI_PNG,
+                        help=f"resolução dos PNG (padrão: {DPI_PNG})")
+    parser.add_argument('--linhas-por-imagem', type=int,
+                        help="divide cada PNG em imagens com no máximo este número de dias")
+    parser.add_argument('--por-imagem', type=int, default=6,
+                        help="escalas por mosaico PNG com --combinado (padrão: 6)")
+    args = parser.parse_args(argv)
+
+    arquivos = expandir_entradas(args.entradas)
+    if not arquivos:
+        parser.error("nenhuma escala encontrada")
+    if args.combinado:
+        inicio = time.perf_counter()
+        try:
+            if Path(args.combinado).suffix.lower() == '.png':
+                gravados = gerar_png_combinado(ler_escalas(arquivos), args.combinado,
+                                               total=len(arquivos), dpi=args.dpi,
+                                               por_imagem=args.por_imagem)
+            else:
+                gerar_pdf_combinado(ler_escalas(arquivos), args.combinado, total=len(arquivos))
+                gravados = [args.combinado]
+        except (OSError, ValueError) as e:
+            print(f"ERRO {args.combinado}: {type(e).__name__}: {e}", file=sys.stderr)
+            return 1
+        print(f"ok   {', '.join(gravados)}: {len(arquivos)} escalas em "
+              f"{time.perf_counter() - inicio:.2f} s")
+        return 0
+    opcoes = {'png': {'dpi': args.dpi, 'linhas_por_imagem': args.linhas_por_imagem}}
+    falhas = exportar_lote(arquivos, args.formato or ['pdf', 'png'], args.saida, args.processos,
+                           opcoes=opcoes)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
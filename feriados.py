@@ -0,0 +1,198 @@
+import json
+import sys
+import zlib
+from calendar import isleap, monthrange
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+
+FERIADOS_ARQUIVO = Path("escalas") / "feriados.json"
+
+# Tipos de dia da tabela anual. Qualquer tipo diferente de DIA_UTIL é destacado.
+DIA_UTIL = 0
+FIM_DE_SEMANA = 1
+FERIADO = 2
+
+# Sexta conta como fim de semana na escala de plantão.
+DIAS_FIM_DE_SEMANA = (4, 5, 6)
+
+# (dia, mês, nome, ano em que passou a valer)
+FERIADOS_NACIONAIS = (
+    (1, 1, "Confraternização Universal", None),
+    (21, 4, "Tiradentes", None),
+    (1, 5, "Dia do Trabalho", None),
+    (7, 9, "Independência do Brasil", None),
+    (12, 10, "Nossa Senhora Aparecida", None),
+    (2, 11, "Finados", None),
+    (15, 11, "Proclamação da República", None),
+    (20, 11, "Dia Nacional de Zumbi e da Consciência Negra", 2024),
+    (25, 12, "Natal", None),
+)
+
+# (dias a partir do domingo de Páscoa, nome)
+FERIADOS_MOVEIS = (
+    (-48, "Carnaval (segunda-feira)"),
+    (-47, "Carnaval (terça-feira)"),
+    (-2, "Sexta-feira Santa"),
+    (60, "Corpus Christi"),
+)
+
+
+def pascoa(ano):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+class CalendarioFeriados:
+    """Feriados nacionais, móveis (a partir da Páscoa) e regionais configurados.
+
+    Para cada ano é montada uma única vez uma tabela com o tipo de cada dia
+    (útil, fim de semana ou feriado), indexada pelo dia do ano; a tabela da
+    interface, o PDF, o PNG e o preenchimento automático consultam essa
+    tabela via ``tipos_do_mes``.
+
+    ``regionais`` aceita itens ``{"data": "dd/mm", "nome": ...}`` (todo ano),
+    ``{"data": "dd/mm/aaaa", "nome": ...}`` (só naquele ano) ou
+    ``{"pascoa": dias, "nome": ...}``; ``ignorar`` remove feriados cujo nome
+    comece com o texto dado (p.ex. "Carnaval"). Itens regionais inválidos
+    (data inexistente no ano, chave faltando, campo que não é número) são
+    ignorados com um aviso no terminal, em vez de impedir a montagem do ano.
+    """
+
+    def __init__(self, regionais=(), ignorar=()):
+        self.regionais = list(regionais)
+        self.ignorar = tuple(ignorar)
+        self._nomes = {}
+        self._tabelas = {}
+        self._avisados = set()
+
+    def _avisar(self, item, erro):
+        mensagem = f"feriado regional ignorado {item!r}: {erro}"
+        if mensagem not in self._avisados:
+            self._avisados.add(mensagem)
+            print(f"[feriados] {mensagem}", file=sys.stderr)
+
+    @staticmethod
+    def _data_regional(item, ano, domingo):
+        """Data do item regional em ``ano`` (None se for de outro ano); ValueError se inválido."""
+        if 'pascoa' in item:
+            return domingo + timedelta(days=int(item['pascoa']))
+        partes = [int(p) for p in item['data'].split('/')]
+        if len(partes) not in (2, 3):
+            raise ValueError("a data deve ser dd/mm ou dd/mm/aaaa")
+        if len(partes) == 3 and partes[2] != ano:
+            return None
+        return date(ano, partes[1], partes[0])
+
+    def _ignorado(self, nome):
+        return nome.startswith(self.ignorar) if self.ignorar else False
+
+    def feriados_do_ano(self, ano):
+        nomes = self._nomes.get(ano)
+        if nomes is not None:
+            return nomes
+        nomes = {}
+        for dia, mes, nome, desde in FERIADOS_NACIONAIS:
+            if desde is None or ano >= desde:
+                nomes[date(ano, mes, dia)] = nome
+        domingo = pascoa(ano)
+        for deslocamento, nome in FERIADOS_MOVEIS:
+            nomes[domingo + timedelta(days=deslocamento)] = nome
+        for item in self.regionais:
+            try:
+                data = self._data_regional(item, ano, domingo)
+                nome = item['nome']
+                if not isinstance(nome, str):
+                    raise ValueError("o nome deve ser texto")
+            except KeyError as e:
+                self._avisar(item, f"falta a chave {e}")
+                continue
+            except (TypeError, ValueError, AttributeError, OverflowError) as e:
+                self._avisar(item, e)
+                continue
+            if data is not None:
+                nomes[data] = nome
+        nomes = {data: nome for data, nome in nomes.items() if not self._ignorado(nome)}
+        self._nomes[ano] = nomes
+        return nomes
+
+    def tipos_do_ano(self, ano):
+        tabela = self._tabelas.get(ano)
+        if tabela is None:
+            total = 366 if isleap(ano) else 365
+            primeiro = date(ano, 1, 1).weekday()
+            tabela = bytearray(
+                FIM_DE_SEMANA if (primeiro + i) % 7 in DIAS_FIM_DE_SEMANA else DIA_UTIL
+                for i in range(total))
+            for data in self.feriados_do_ano(ano):
+                tabela[data.timetuple().tm_yday - 1] = FERIADO
+            self._tabelas[ano] = tabela
+        return tabela
+
+    def nome(self, data):
+        return self.feriados_do_ano(data.year).get(data)
+
+    def assinatura(self):
+        """Muda quando a configuração (ou a lista embutida) de feriados muda."""
+        conteudo = json.dumps([FERIADOS_NACIONAIS, FERIADOS_MOVEIS, self.regionais, self.ignorar],
+                              sort_keys=True)
+        return zlib.crc32(conteudo.encode('utf-8'))
+
+
+def carregar_calendario(caminho=FERIADOS_ARQUIVO):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+    except (OSError, ValueError):
+        dados = {}
+    if not isinstance(dados, dict):
+        print(f"[feriados] {caminho} ignorado: esperado um objeto JSON", file=sys.stderr)
+        dados = {}
+    regionais = dados.get('regionais', [])
+    if not isinstance(regionais, list):
+        print("[feriados] 'regionais' ignorado: esperada uma lista", file=sys.stderr)
+        regionais = []
+    ignorar = dados.get('ignorar', [])
+    if not isinstance(ignorar, list):
+        ignorar = [ignorar]
+    for texto in ignorar:
+        if not isinstance(texto, str):
+            print(f"[feriados] item de 'ignorar' ignorado {texto!r}: esperado um texto",
+                  file=sys.stderr)
+    return CalendarioFeriados(regionais, [texto for texto in ignorar if isinstance(texto, str)])
+
+
+@lru_cache(maxsize=1)
+def calendario_padrao():
+    return carregar_calendario()
+
+
+def tipos_do_mes(ano, mes, manuais=(), calendario=None):
+    """Tipo de cada dia do mês (bytearray), incluindo os feriados marcados à mão.
+
+    ``manuais`` são datas "dd/mm/aaaa" (o antigo conjunto de feriados da
+    escala), que valem como feriado além dos do calendário.
+    """
+    calendario = calendario or calendario_padrao()
+    inicio = date(ano, mes, 1).timetuple().tm_yday - 1
+    tipos = calendario.tipos_do_ano(ano)[inicio:inicio + monthrange(ano, mes)[1]]
+    sufixo = f"/{mes:02d}/{ano}"
+    for data_texto in manuais:
+        if data_texto.endswith(sufixo):
+            tipos[int(data_texto[:2]) - 1] = FERIADO
+    return tipos
+
+
+def nome_feriado(data, calendario=None):
+    return (calendario or calendario_padrao()).nome(data)
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import struct
+from pathlib import Path
+
+from armazenamento import EXTENSOES, ler_resumo
+
+
+ESCALAS_DIR = Path("escalas")
+INDICE_NOME = ".indice.sqlite"
+TAMANHO_PAGINA = 200
+
+
+def timestamp_do_arquivo(caminho):
+    partes = Path(caminho).stem.split('_')
+    if len(partes) >= 5:
+        return f"{partes[-2]}_{partes[-1]}"
+    return ''
+
+
+class HistoryIndex:
+    """Índice persistente (SQLite) dos arquivos salvos em ``escalas/``.
+
+    Guarda mês, ano, timestamp e quantidade de médicos de cada arquivo, para
+    que o histórico possa ser listado sem abrir os arquivos. A pasta só é
+    varrida quando seu mtime muda; dentro da varredura, apenas arquivos
+    novos ou com mtime diferente são lidos novamente (no formato binário,
+    apenas o cabeçalho).
+
+    O banco fica na própria pasta. Com ``journal_mode=TRUNCATE`` o arquivo
+    de journal é criado uma vez e depois só truncado, então as gravações do
+    índice não mudam o mtime da pasta (o modo padrão cria e apaga o journal
+    a cada commit, o que forçaria uma varredura em toda abertura).
+    """
+
+    def __init__(self, diretorio=ESCALAS_DIR):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(exist_ok=True)
+        self.conn = sqlite3.connect(str(self.diretorio / INDICE_NOME))
+        self.conn.execute("PRAGMA journal_mode=TRUNCATE")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS escalas (
+                arquivo TEXT PRIMARY KEY,
+                mes INTEGER,
+                ano INTEGER,
+                timestamp TEXT,
+                medicos INTEGER,
+                mtime_ns INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_escalas_ordem
+                ON escalas (ano DESC, mes DESC, timestamp DESC);
+            CREATE TABLE IF NOT EXISTS meta (
+                chave TEXT PRIMARY KEY,
+                valor INTEGER
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def _mtime_diretorio(self):
+        return os.stat(self.diretorio).st_mtime_ns
+
+    def ler_meta(self, chave):
+        row = self.conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return row[0] if row else None
+
+    def gravar_meta(self, chave, valor):
+        self.conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+    def _gravar_entrada(self, nome, resumo, mtime_ns):
+        mes, ano, medicos = resumo
+        self.conn.execute(
+            "INSERT OR REPLACE INTO escalas (arquivo, mes, ano, timestamp, medicos, mtime_ns) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (nome, mes, ano, timestamp_do_arquivo(nome), medicos, mtime_ns))
+
+    def sincronizar(self, forcar=False):
+        mtime_dir = self._mtime_diretorio()
+        if not forcar and self.ler_meta('mtime_diretorio') == mtime_dir:
+            return False
+        journal_existia = (self.diretorio / f"{INDICE_NOME}-journal").exists()
+
+        conhecidos = dict(self.conn.execute("SELECT arquivo, mtime_ns FROM escalas"))
+        encontrados = set()
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if not (entrada.name.startswith('escala_') and entrada.name.endswith(EXTENSOES)):
+                    continue
+                if not entrada.is_file():
+                    continue
+                encontrados.add(entrada.name)
+                mtime_ns = entrada.stat().st_mtime_ns
+                if conhecidos.get(entrada.name) == mtime_ns:
+                    continue
+                try:
+                    resumo = ler_resumo(entrada.path)
+                except (OSError, ValueError, struct.error):
+                    continue
+                self._gravar_entrada(entrada.name, resumo, mtime_ns)
+
+        removidos = [(nome,) for nome in conhecidos if nome not in encontrados]
+        self.conn.executemany("DELETE FROM escalas WHERE arquivo = ?", removidos)
+        self.conn.commit()
+        if not journal_existia:
+            # O primeiro commit criou o journal e mudou o mtime da pasta.
+            mtime_dir = self._mtime_diretorio()
+        self.gravar_meta('mtime_diretorio', mtime_dir)
+        self.conn.commit()
+        return True
+
+    def registrar(self, caminho, resumo=None):
+        caminho = Path(caminho)
+        if resumo is None:
+            resumo = ler_resumo(caminho)
+        self._gravar_entrada(caminho.name, resumo, os.stat(caminho).st_mtime_ns)
+        self.conn.commit()
+        self.sincronizar()
+
+    def remover(self, caminho):
+        caminho = Path(caminho)
+        if caminho.exists():
+            caminho.unlink()
+        self.conn.execute("DELETE FROM escalas WHERE arquivo = ?", (caminho.name,))
+        self.conn.commit()
+        self.sincronizar()
+
+    def contar(self):
+        return self.conn.execute("SELECT COUNT(*) FROM escalas").fetchone()[0]
+
+    def pagina(self, inicio, limite=TAMANHO_PAGINA):
+        return self.conn.execute(
+            "SELECT arquivo, mes, ano, timestamp, medicos FROM escalas "
+            "ORDER BY ano DESC, mes DESC, timestamp DESC LIMIT ? OFFSET ?",
+            (limite, inicio)).fetchall()
+
+    def mais_recente(self, ano, mes):
+        row = self.conn.execute(
+            "SELECT arquivo FROM escalas WHERE ano = ? AND mes = ? "
+            "ORDER BY timestamp DESC LIMIT 1", (ano, mes)).fetchone()
+        return self.caminho(row[0]) if row else None
+
+    def versoes(self, ano, mes):
+        return [row[0] for row in self.conn.execute(
+            "SELECT arquivo FROM escalas WHERE ano = ? AND mes = ? "
+            "ORDER BY timestamp, arquivo", (ano, mes))]
+
+    def mais_recentes(self, ano=None):
+        filtro = "WHERE ano = ?" if ano is not None else ""
+        parametros = (ano,) if ano is not None else ()
+        return self.conn.execute(
+            "SELECT arquivo, mtime_ns FROM ("
+            "  SELECT arquivo, mtime_ns, ROW_NUMBER() OVER ("
+            "    PARTITION BY ano, mes ORDER BY timestamp DESC) AS ordem"
+            f"  FROM escalas {filtro}"
+            ") WHERE ordem = 1", parametros).fetchall()
+
+    def anos(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT ano FROM escalas WHERE ano IS NOT NULL ORDER BY ano DESC")]
+
+    def caminho(self, arquivo):
+        return self.diretorio / arquivo
@@ -1,46 +1,992 @@
+import time
+INICIO_PROCESSO = time.perf_counter()
+
+import glob
+import os
 import sys
-import json
+import tempfile
+import threading
 from datetime import datetime, date
-from calendar import monthrange
 from pathlib import Path
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
-                             QComboBox, QLabel, QMessageBox, QDialog, QListWidget,
-                             QFileDialog, QHeaderView, QSpinBox, QMenu)
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QFont
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import mm
-from reportlab.lib.enums import TA_CENTER
-from PIL import Image, ImageDraw, ImageFont
+                             QHBoxLayout, QPushButton, QTableView, QTableWidget, QTableWidgetItem,
+                             QComboBox, QLabel, QMessageBox, QDialog, QListView,
+                             QFileDialog, QHeaderView, QSpinBox, QMenu, QInputDialog,
+                             QDateEdit, QCheckBox, QProgressBar, QStyledItemDelegate,
+                             QLineEdit, QCompleter, QAbstractItemDelegate)
+from PyQt6.QtCore import (Qt, QAbstractListModel, QAbstractTableModel, QModelIndex, QDate,
+                          QTimer, QObject, QRunnable, QThreadPool, QStringListModel, pyqtSignal)
+from PyQt6.QtGui import QColor, QFont, QBrush, QKeySequence, QShortcut
 
+from modelo import (MESES, DIAS_SEMANA, TURNOS, CABECALHOS, COLUNAS_FIXAS, Periodo,
+                    TabelaNomes, ler_escala)
+from escalador import Medico, preencher_mes
+from analise import AnaliseCarga, CABECALHOS_RELATORIO, relatorio_combinado, salvar_csv
+from diario import INTERVALO_FSYNC, Diario
+from metricas import METRICAS, RelatorioInicializacao, contar, iniciar_perfil, medido, medir
+from edicao import HistoricoEdicoes, colar_tsv, copiar_tsv, repetir_semana, rodizio
+import armazenamento
+from armazenamento import ERROS_LEITURA
+from conflitos import VerificadorConflitos
+from cadastro import Cadastro
+from feriados import nome_feriado
+from historico import timestamp_do_arquivo
+from agenda import gerar_agendas
+from busca import CABECALHOS_BUSCA, BuscaMedicos, buscar_em_unidades, linha_resultado
+from sincronizacao import (URL_SINCRONIZACAO, USUARIO_SINCRONIZACAO, ClienteSincronizacao,
+                           SessaoSincronizacao, documento)
+from versoes import (CABECALHOS_ALTERACOES, CadeiaVersoes, comparar, feriados_alterados,
+                     linhas_relatorio, relatorio_cadeia, salvar_csv as salvar_csv_alteracoes)
+from unidades import (UNIDADE_PADRAO, AreaTrabalho, abrir_indice, criar_unidade,
+                      diretorio_autosave, listar_unidades, slug_unidade)
 
-class HistoryDialog(QDialog):
+# reportlab e Pillow (via exportacao) são importados sob demanda ou
+# pré-carregados em segundo plano depois que a janela aparece.
+FIM_IMPORTS = time.perf_counter()
+
+
+COR_DESTAQUE = QBrush(QColor(138, 180, 248))
+COR_TEXTO_DESTAQUE = QBrush(QColor(Qt.GlobalColor.black))
+COR_CONFLITO = QBrush(QColor(239, 154, 154))
+COR_ALTERACAO = QBrush(QColor(255, 224, 130))
+COR_TRAVA = QBrush(QColor(207, 216, 220))
+
+ROLE_DISPLAY = Qt.ItemDataRole.DisplayRole
+ROLE_EDIT = Qt.ItemDataRole.EditRole
+ROLE_ALINHAMENTO = Qt.ItemDataRole.TextAlignmentRole
+ROLE_FUNDO = Qt.ItemDataRole.BackgroundRole
+ROLE_TEXTO = Qt.ItemDataRole.ForegroundRole
+ROLE_DICA = Qt.ItemDataRole.ToolTipRole
+HORIZONTAL = Qt.Orientation.Horizontal
+ALINHAMENTO_CENTRO = Qt.AlignmentFlag.AlignCenter
+FLAGS_FIXAS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+FLAGS_EDITAVEIS = FLAGS_FIXAS | Qt.ItemFlag.ItemIsEditable
+
+
+class EscalaTableModel(QAbstractTableModel):
+    celulaAlterada = pyqtSignal(int, int, str)
+
+    def __init__(self, escala, parent=None):
+        super().__init__(parent)
+        self.escala = escala
+        self.unidade = 0
+        self.conflitos = VerificadorConflitos([escala])
+        # (row, turno) -> médico anterior, das células destacadas numa comparação de versões
+        self.alteracoes = {}
+        self.historico = HistoricoEdicoes()
+        # Sincronização: pos -> usuário que está editando a célula em outra estação.
+        self.travas = {}
+        self.remoto = False
+
+    def set_escala(self, escala, conflitos=None, unidade=0):
+        antiga = self.escala
+        n_antigo, n_novo = antiga.num_dias, escala.num_dias
+
+        if n_novo < n_antigo:
+            self.beginRemoveRows(QModelIndex(), n_novo, n_antigo - 1)
+            self.escala = escala
+            self.endRemoveRows()
+        elif n_novo > n_antigo:
+            self.beginInsertRows(QModelIndex(), n_antigo, n_novo - 1)
+            self.escala = escala
+            self.endInsertRows()
+        else:
+            self.escala = escala
+
+        em_conflito = self._linhas_em_conflito()
+        self.conflitos = conflitos or VerificadorConflitos([escala])
+        self.unidade = unidade
+        destacadas = {row for row, _ in self.alteracoes if row < escala.num_dias}
+        self.alteracoes = {}
+        self.historico.limpar()
+        self.travas = {}
+        alteradas = sorted(set(escala.linhas_diferentes(antiga))
+                           | em_conflito | self._linhas_em_conflito() | destacadas)
+        if alteradas:
+            self.dataChanged.emit(self.index(alteradas[0], 0),
+                                  self.index(alteradas[-1], self.columnCount() - 1))
+
+    def destacar_alteracoes(self, alteracoes):
+        """Destaca as células de uma comparação (lista de (row, turno, antes, depois))."""
+        rows = {row for row, _ in self.alteracoes}
+        self.alteracoes = {(row, turno): antes for row, turno, antes, _ in alteracoes
+                           if row < self.escala.num_dias}
+        rows.update(row for row, _ in self.alteracoes)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0),
+                                  self.index(max(rows), self.columnCount() - 1))
+
+    def _linhas_em_conflito(self):
+        return {row for unidade, row, _ in map(self.conflitos.localizar, self.conflitos.conflitos)
+                if unidade == self.unidade and row < self.escala.num_dias}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.escala.num_dias
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(CABECALHOS)
+
+    def headerData(self, section, orientation, role=ROLE_DISPLAY):
+        # Chamado centenas de vezes a cada repintura; responde sem passar pela
+        # implementação base (que numera as linhas a partir de 1, como aqui).
+        if role == ROLE_DISPLAY:
+            return CABECALHOS[section] if orientation == HORIZONTAL else section + 1
+        return None
+
+    def flags(self, index):
+        return FLAGS_EDITAVEIS if index.column() >= COLUNAS_FIXAS else FLAGS_FIXAS
+
+    def data(self, index, role=ROLE_DISPLAY):
+        if role == ROLE_DISPLAY or role == ROLE_EDIT:
+            return self.escala.texto(index.row(), index.column())
+        if role == ROLE_ALINHAMENTO:
+            return ALINHAMENTO_CENTRO
+        if role == ROLE_FUNDO:
+            if index.column() >= COLUNAS_FIXAS:
+                if self._em_conflito(index):
+                    return COR_CONFLITO
+                if (index.row(), index.column() - COLUNAS_FIXAS) in self.alteracoes:
+                    return COR_ALTERACAO
+                if self.travas and self.posicao(index) in self.travas:
+                    return COR_TRAVA
+            return COR_DESTAQUE if self.escala.destaques[index.row()] else None
+        if role == ROLE_TEXTO:
+            return COR_TEXTO_DESTAQUE if self.escala.destaques[index.row()] else None
+        if role == ROLE_DICA:
+            if index.column() < COLUNAS_FIXAS:
+                return self._feriado(index.row())
+            if self._em_conflito(index):
+                return "\n".join(self.conflitos.descrever(
+                    index.row(), index.column() - COLUNAS_FIXAS, self.unidade))
+            antes = self.alteracoes.get((index.row(), index.column() - COLUNAS_FIXAS))
+            if antes is not None:
+                return f"Antes: {antes or '(vazio)'}"
+            dono = self.travas.get(self.posicao(index))
+            if dono is not None:
+                return f"Em edição por {dono}"
+        return None
+
+    def posicao(self, index):
+        return index.row() * len(TURNOS) + index.column() - COLUNAS_FIXAS
+
+    def _feriado(self, row):
+        nome = nome_feriado(date(self.escala.ano, self.escala.mes, row + 1))
+        if nome:
+            return nome
+        if self.escala.datas[row] in self.escala.feriados:
+            return "Feriado (marcado manualmente)"
+        return None
+
+    def _em_conflito(self, index):
+        return self.conflitos.em_conflito(index.row(), index.column() - COLUNAS_FIXAS, self.unidade)
+
+    def _definir(self, row, turno, nome, delta):
+        pos = row * len(TURNOS) + turno
+        antigo = self.escala.celulas[pos]
+        if not self.escala.definir(row, turno, nome):
+            return None
+        novo = self.escala.celulas[pos]
+        delta.extend((pos, antigo, novo))
+        return self.conflitos.alterar(row, turno, antigo, novo, self.unidade)
+
+    def _emitir_linhas(self, posicoes):
+        rows = [row for unidade, row, _ in map(self.conflitos.localizar, posicoes)
+                if unidade == self.unidade]
+        self.dataChanged.emit(self.index(min(rows), 0),
+                              self.index(max(rows), self.columnCount() - 1))
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() < COLUNAS_FIXAS:
+            return False
+        row, turno = index.row(), index.column() - COLUNAS_FIXAS
+        delta = self.historico.novo_delta()
+        afetadas = self._definir(row, turno, value or '', delta)
+        if afetadas is not None:
+            contar('celulas_alteradas')
+            self.historico.registrar("Editar célula", delta)
+            self._emitir_linhas(afetadas)
+            self.celulaAlterada.emit(row, turno, self.escala.medico(row, turno))
+        return True
+
+    def definir_celulas(self, alteracoes, descricao="Preencher"):
+        """Aplica várias células de uma vez: um só aviso à view e um só passo de desfazer."""
+        delta = self.historico.novo_delta()
+        alteradas = []
+        afetadas = set()
+        for row, turno, nome in alteracoes:
+            posicoes = self._definir(row, turno, nome, delta)
+            if posicoes is not None:
+                alteradas.append((row, turno))
+                afetadas.update(posicoes)
+        if descricao is not None:
+            self.historico.registrar(descricao, delta)
+        if not alteradas:
+            return 0
+        contar('celulas_alteradas', len(alteradas))
+        self._emitir_linhas(afetadas)
+        for row, turno in alteradas:
+            self.celulaAlterada.emit(row, turno, self.escala.medico(row, turno))
+        return len(alteradas)
+
+    def _reaplicar(self, passo):
+        if passo is None:
+            return None
+        descricao, celulas = passo
+        nomes = self.escala.nomes.nomes
+        n = len(TURNOS)
+        self.definir_celulas(((*divmod(pos, n), nomes[id_medico]) for pos, id_medico in celulas),
+                             descricao=None)
+        return descricao
+
+    def desfazer(self):
+        """Desfaz o último passo; devolve sua descrição (None se não havia)."""
+        return self._reaplicar(self.historico.desfazer())
+
+    def refazer(self):
+        return self._reaplicar(self.historico.refazer())
+
+    def aplicar_remotas(self, celulas):
+        """Aplica células (pos, nome) vindas da sincronização, fora do desfazer."""
+        n = len(TURNOS)
+        total = len(self.escala.celulas)
+        self.remoto = True
+        try:
+            self.definir_celulas(((*divmod(pos, n), nome) for pos, nome in celulas if pos < total),
+                                 descricao=None)
+        finally:
+            self.remoto = False
+
+    def definir_travas(self, travas):
+        rows = {pos // len(TURNOS) for pos in set(travas) ^ set(self.travas)}
+        self.travas = travas
+        rows = [row for row in rows if row < self.escala.num_dias]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0),
+                                  self.index(max(rows), self.columnCount() - 1))
+
+    def atualizar_linha(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
+class MedicoDelegate(QStyledItemDelegate):
+    """Editor dos turnos com sugestões do cadastro de médicos.
+    
+    A filtragem é feita pelo índice do cadastro a cada tecla; o QCompleter
+    só exibe a lista já filtrada (sem varrer todos os nomes).
+    """
+    
+    def __init__(self, cadastro, parent=None):
+        super().__init__(parent)
+        self.cadastro = cadastro
+        # Com sincronização: travar(index) -> bool e liberar(index) para cada edição.
+        self.travar = None
+        self.liberar = None
+        self.editores = {}
+    
+    def createEditor(self, parent, option, index):
+        if self.travar is not None and not self.travar(index):
+            return None
+        editor = QLineEdit(parent)
+        self.editores[(index.row(), index.column())] = editor
+        completer = QCompleter(QStringListModel(editor), editor)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        editor.setCompleter(completer)
+        editor.textEdited.connect(lambda texto: self.sugerir(completer, texto))
+        return editor
+    
+    def sugerir(self, completer, texto):
+        completer.model().setStringList(self.cadastro.sugerir(texto))
+        completer.complete()
+    
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.ItemDataRole.EditRole) or '')
+    
+    def setModelData(self, editor, model, index):
+        model.setData(index, self.cadastro.canonico(editor.text()), Qt.ItemDataRole.EditRole)
+    
+    def destroyEditor(self, editor, index):
+        if self.editores.get((index.row(), index.column())) is editor:
+            del self.editores[(index.row(), index.column())]
+        super().destroyEditor(editor, index)
+        if self.liberar is not None:
+            self.liberar(index)
+    
+    def cancelar_edicao(self, row, column):
+        """Fecha sem salvar o editor aberto na célula (trava negada pelo servidor)."""
+        editor = self.editores.get((row, column))
+        if editor is not None:
+            self.closeEditor.emit(editor, QAbstractItemDelegate.EndEditHint.RevertModelCache)
+
+
+class SinaisSincronizacao(QObject):
+    # sessão, células (pos, nome), travas (ou None se não mudaram), erro, resposta inicial
+    recebidas = pyqtSignal(object, list, object, str, bool)
+    # sessão, posição, dono da trava ('' se ficou livre)
+    trava = pyqtSignal(object, int, str)
+
+
+class SinaisExportacao(QObject):
+    progresso = pyqtSignal(int)
+    concluida = pyqtSignal(str)
+    falhou = pyqtSignal(str)
+    cancelada = pyqtSignal()
+
+
+class ExportacaoWorker(QRunnable):
+    def __init__(self, formato, escala, filename):
+        super().__init__()
+        self.formato = formato
+        self.escala = escala
+        self.filename = filename
+        self.sinais = SinaisExportacao()
+        self.cancelado = threading.Event()
+        self.duracao = 0.0
+    
+    def cancelar(self):
+        self.cancelado.set()
+    
+    def run(self):
+        from exportacao import GERADORES, ExportacaoCancelada, gerar_pdf_combinado
+        ultimo = [-1]
+        
+        def progresso(fracao):
+            percentual = int(fracao * 100)
+            if percentual != ultimo[0]:
+                ultimo[0] = percentual
+                self.sinais.progresso.emit(percentual)
+            return not self.cancelado.is_set()
+        
+        inicio = time.perf_counter()
+        # Grava num temporário ao lado do destino e só o põe no lugar no fim: cancelar
+        # ou falhar nunca apaga um arquivo que o usuário escolheu sobrescrever.
+        destino = Path(self.filename)
+        fd, temporario = tempfile.mkstemp(dir=destino.parent, prefix=f".{destino.stem}.",
+                                          suffix=f".tmp{destino.suffix}")
+        os.close(fd)
+        temporario = Path(temporario)
+        try:
+            if self.cancelado.is_set():
+                raise ExportacaoCancelada()
+            # Em 'pdf_combinado', ``escala`` é a lista de escalas do documento.
+            gerador = gerar_pdf_combinado if self.formato == 'pdf_combinado' else GERADORES[self.formato]
+            with medir(f"exportar_{self.formato}"):
+                arquivos = gerador(self.escala, str(temporario), progresso)
+                # gerar_png devolve os arquivos gravados (mais de um se a escala for dividida).
+                gravados = [Path(a) for a in arquivos] if isinstance(arquivos, list) else [temporario]
+                for arquivo in gravados:
+                    final = destino.with_name(arquivo.name.replace(temporario.stem, destino.stem, 1))
+                    os.replace(arquivo, final)
+                    contar('bytes_gravados', os.path.getsize(final))
+        except ExportacaoCancelada as e:
+            # O gerador informa as partes que já gravou a partir do temporário.
+            for arquivo in [temporario] + e.arquivos:
+                Path(arquivo).unlink(missing_ok=True)
+            self.sinais.cancelada.emit()
+        except Exception as e:
+            self._descartar(temporario)
+            self.sinais.falhou.emit(f"{type(e).__name__}: {e}")
+        else:
+            temporario.unlink(missing_ok=True)
+            self.duracao = time.perf_counter() - inicio
+            self.sinais.concluida.emit(self.filename)
+    
+    @staticmethod
+    def _descartar(temporario):
+        """Apaga o temporário e as partes já gravadas a partir dele (``nome_1``, ``nome_2``...).
+
+        O nome do temporário é único, então só arquivos desta exportação casam.
+        """
+        temporario.unlink(missing_ok=True)
+        for parte in temporario.parent.glob(f"{glob.escape(temporario.stem)}_*{temporario.suffix}"):
+            parte.unlink(missing_ok=True)
+
+
+class ExportacoesPanel(QWidget):
+    mensagem = pyqtSignal(str)
+    erro = pyqtSignal(str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.workers = []
+        
+        self.layout_linhas = QVBoxLayout(self)
+        self.layout_linhas.setContentsMargins(0, 0, 0, 0)
+        self.hide()
+    
+    def adicionar(self, worker, descricao):
+        linha = QWidget()
+        linha_layout = QHBoxLayout(linha)
+        linha_layout.setContentsMargins(0, 0, 0, 0)
+        linha_layout.addWidget(QLabel(descricao))
+        barra = QProgressBar()
+        barra.setRange(0, 100)
+        linha_layout.addWidget(barra, 1)
+        cancelar_btn = QPushButton("Cancelar")
+        cancelar_btn.clicked.connect(worker.cancelar)
+        linha_layout.addWidget(cancelar_btn)
+        self.layout_linhas.addWidget(linha)
+        
+        worker.sinais.progresso.connect(barra.setValue)
+        worker.sinais.concluida.connect(
+            lambda filename: self.finalizar(
+                worker, linha, f"{descricao} exportado: {filename} ({worker.duracao * 1000:.0f} ms)"))
+        worker.sinais.cancelada.connect(
+            lambda: self.finalizar(worker, linha, f"{descricao}: exportação cancelada"))
+        worker.sinais.falhou.connect(
+            lambda erro: self.finalizar(worker, linha, None, f"{descricao}: {erro}"))
+        
+        self.workers.append(worker)
+        self.show()
+        self.pool.start(worker)
+    
+    def finalizar(self, worker, linha, mensagem, erro=None):
+        self.workers.remove(worker)
+        self.layout_linhas.removeWidget(linha)
+        linha.deleteLater()
+        if not self.workers:
+            self.hide()
+        if erro:
+            self.erro.emit(erro)
+        else:
+            self.mensagem.emit(mensagem)
+    
+    def cancelar_todas(self):
+        for worker in self.workers:
+            worker.cancelar()
+        self.pool.waitForDone()
+
+
+class PeriodoTableModel(QAbstractTableModel):
+    def __init__(self, unidades, parent=None):
+        super().__init__(parent)
+        self.unidades = unidades
+        self.periodo = unidades[0][1]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.periodo.num_dias
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return COLUNAS_FIXAS + len(TURNOS) * len(self.unidades)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            if section < COLUNAS_FIXAS:
+                return CABECALHOS[section]
+            unidade, turno = divmod(section - COLUNAS_FIXAS, len(TURNOS))
+            titulo = CABECALHOS[COLUNAS_FIXAS + turno]
+            if len(self.unidades) > 1:
+                return f"{self.unidades[unidade][0]}\n{titulo}"
+            return titulo
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return FLAGS_FIXAS
+
+    def _celula(self, index):
+        col = index.column()
+        if col < COLUNAS_FIXAS:
+            return self.periodo, col
+        unidade, turno = divmod(col - COLUNAS_FIXAS, len(TURNOS))
+        return self.unidades[unidade][1], COLUNAS_FIXAS + turno
+
+    def data(self, index, role=ROLE_DISPLAY):
+        if role == ROLE_DISPLAY:
+            periodo, col = self._celula(index)
+            escala, row = periodo.localizar(index.row())
+            return escala.texto(row, col)
+        if role == ROLE_ALINHAMENTO:
+            return ALINHAMENTO_CENTRO
+        if role == ROLE_FUNDO or role == ROLE_TEXTO:
+            periodo, _ = self._celula(index)
+            escala, row = periodo.localizar(index.row())
+            if escala.destaques[row]:
+                return COR_DESTAQUE if role == ROLE_FUNDO else COR_TEXTO_DESTAQUE
+        return None
+
+
+class PeriodoDialog(QDialog):
+    def __init__(self, mes, ano, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Visão por Período")
+        self.setMinimumSize(1100, 650)
+        
+        self.indices = {unidade: abrir_indice(unidade) for unidade in listar_unidades()}
+        for indice in self.indices.values():
+            indice.sincronizar()
+        
+        layout = QVBoxLayout()
+        
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Início:"))
+        self.mes_combo = QComboBox()
+        for num, nome in MESES.items():
+            self.mes_combo.addItem(nome, num)
+        self.mes_combo.setCurrentIndex(mes - 1)
+        controls_layout.addWidget(self.mes_combo)
+        
+        self.ano_spin = QSpinBox()
+        self.ano_spin.setRange(2020, 2050)
+        self.ano_spin.setValue(ano)
+        controls_layout.addWidget(self.ano_spin)
+        
+        controls_layout.addWidget(QLabel("Meses:"))
+        self.meses_spin = QSpinBox()
+        self.meses_spin.setRange(1, 12)
+        self.meses_spin.setValue(3)
+        controls_layout.addWidget(self.meses_spin)
+        
+        visualizar_btn = QPushButton("Visualizar")
+        visualizar_btn.clicked.connect(self.atualizar)
+        controls_layout.addWidget(visualizar_btn)
+        
+        controls_layout.addStretch()
+        
+        controls_layout.addWidget(QLabel("Ir para:"))
+        self.data_edit = QDateEdit()
+        self.data_edit.setCalendarPopup(True)
+        self.data_edit.setDisplayFormat("dd/MM/yyyy")
+        self.data_edit.setDate(QDate.currentDate())
+        controls_layout.addWidget(self.data_edit)
+        
+        ir_btn = QPushButton("Ir")
+        ir_btn.clicked.connect(self.ir_para_data)
+        controls_layout.addWidget(ir_btn)
+        
+        layout.addLayout(controls_layout)
+        
+        self.table = QTableView()
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setAlternatingRowColors(True)
+        layout.addWidget(self.table)
+        
+        self.setLayout(layout)
+        self.atualizar()
+    
+    def carregador(self, indice):
+        def carregar_mes(ano, mes):
+            caminho = indice.mais_recente(ano, mes)
+            return ler_escala(caminho) if caminho else None
+        return carregar_mes
+    
+    def atualizar(self):
+        unidades = [
+            (unidade, Periodo(self.mes_combo.currentData(), self.ano_spin.value(),
+                              self.meses_spin.value(), self.carregador(indice)))
+            for unidade, indice in self.indices.items()
+        ]
+        self.model = PeriodoTableModel(unidades, self)
+        self.table.setModel(self.model)
+    
+    def ir_para_data(self):
+        alvo = self.data_edit.date()
+        row = self.model.periodo.linha_da_data(date(alvo.year(), alvo.month(), alvo.day()))
+        if row < 0:
+            QMessageBox.warning(self, "Aviso", "Data fora do período exibido!")
+            return
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index, QTableView.ScrollHint.PositionAtTop)
+        self.table.selectRow(row)
+    
+    def done(self, result):
+        for indice in self.indices.values():
+            indice.close()
+        super().done(result)
+
+
+class AnaliseDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Análise de Plantões por Médico")
+        self.setMinimumSize(800, 500)
+        
+        self.indices = [abrir_indice(unidade) for unidade in listar_unidades()]
+        self.analises = [AnaliseCarga(indice) for indice in self.indices]
+        self.linhas = []
+        
+        layout = QVBoxLayout()
+        
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Ano:"))
+        self.ano_combo = QComboBox()
+        self.ano_combo.addItem("Todos", None)
+        for indice in self.indices:
+            indice.sincronizar()
+        anos = sorted({ano for indice in self.indices for ano in indice.anos()}, reverse=True)
+        for ano in anos:
+            self.ano_combo.addItem(str(ano), ano)
+        self.ano_combo.currentIndexChanged.connect(self.atualizar)
+        controls_layout.addWidget(self.ano_combo)
+        controls_layout.addStretch()
+        
+        csv_btn = QPushButton("Exportar CSV")
+        csv_btn.clicked.connect(self.exportar_csv)
+        controls_layout.addWidget(csv_btn)
+        layout.addLayout(controls_layout)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(CABECALHOS_RELATORIO))
+        self.table.setHorizontalHeaderLabels(CABECALHOS_RELATORIO)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+        
+        self.setLayout(layout)
+        self.atualizar()
+    
+    def atualizar(self):
+        self.linhas = relatorio_combinado(self.analises, self.ano_combo.currentData())
+        self.table.setRowCount(len(self.linhas))
+        for row, linha in enumerate(self.linhas):
+            for col, valor in enumerate(linha):
+                item = QTableWidgetItem(str(valor))
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row, col, item)
+    
+    def exportar_csv(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Salvar CSV", "Plantoes_por_medico.csv", "CSV Files (*.csv)")
+        if not filename:
+            return
+        salvar_csv(self.linhas, filename)
+        QMessageBox.information(self, "Sucesso", f"CSV exportado com sucesso!\n{filename}")
+    
+    def done(self, result):
+        for indice in self.indices:
+            indice.close()
+        super().done(result)
+
+
+class BuscaDialog(QDialog):
+    """Busca dos plantões de um médico em todo o histórico, de todas as unidades."""
+    
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Histórico de Escalas")
+        self.setWindowTitle("Buscar Médico no Histórico")
+        self.setMinimumSize(800, 500)
+        # (unidade, caminho, row, turno) do plantão escolhido com duplo clique
+        self.selecionado = None
+        self.resultados = []
+        
+        self.indices = [(unidade, abrir_indice(unidade)) for unidade in listar_unidades()]
+        self.buscas = [(unidade, BuscaMedicos(indice)) for unidade, indice in self.indices]
+        for _, busca in self.buscas:
+            busca.atualizar()
+        
+        layout = QVBoxLayout()
+        
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Nome:"))
+        self.nome_edit = QLineEdit()
+        self.nome_edit.setPlaceholderText("nome ou trecho (acentos são ignorados)")
+        controls_layout.addWidget(self.nome_edit, 1)
+        self.versoes_check = QCheckBox("Todas as versões")
+        controls_layout.addWidget(self.versoes_check)
+        layout.addLayout(controls_layout)
+        
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(CABECALHOS_BUSCA))
+        self.table.setHorizontalHeaderLabels(CABECALHOS_BUSCA)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.doubleClicked.connect(self.abrir_resultado)
+        layout.addWidget(self.table)
+        
+        self.setLayout(layout)
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(150)
+        self.timer.timeout.connect(self.buscar)
+        self.nome_edit.textChanged.connect(self.timer.start)
+        self.versoes_check.toggled.connect(self.buscar)
+    
+    def buscar(self):
+        inicio = time.perf_counter()
+        self.resultados = buscar_em_unidades(self.buscas, self.nome_edit.text(),
+                                             self.versoes_check.isChecked())
+        duracao = (time.perf_counter() - inicio) * 1000
+        self.table.setRowCount(len(self.resultados))
+        for row, (unidade, resultado) in enumerate(self.resultados):
+            for col, valor in enumerate(linha_resultado(unidade, resultado)):
+                self.table.setItem(row, col, QTableWidgetItem(valor))
+        self.status_label.setText(f"{len(self.resultados)} plantões ({duracao:.1f} ms)"
+                                  if self.nome_edit.text().strip() else "")
+    
+    def abrir_resultado(self, index):
+        unidade, (_, dia, _, _, turno, arquivo) = self.resultados[index.row()]
+        indice = dict(self.indices)[unidade]
+        self.selecionado = (unidade, indice.caminho(arquivo), dia - 1, turno)
+        self.accept()
+    
+    def done(self, result):
+        for _, indice in self.indices:
+            indice.close()
+        super().done(result)
+
+
+class CadastroDialog(QDialog):
+    COLUNAS = ['ID', 'Nome', 'Especialidade', 'CRM']
+    
+    def __init__(self, cadastro, nomes_escala=(), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Cadastro de Médicos")
+        self.setMinimumSize(700, 500)
+        self.cadastro = cadastro
+        self.nomes_escala = nomes_escala
+        
+        layout = QVBoxLayout()
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.COLUNAS))
+        self.table.setHorizontalHeaderLabels(self.COLUNAS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+        
+        btn_layout = QHBoxLayout()
+        adicionar_btn = QPushButton("Adicionar")
+        adicionar_btn.clicked.connect(self.adicionar)
+        importar_btn = QPushButton("Importar da Escala")
+        importar_btn.clicked.connect(self.importar_da_escala)
+        remover_btn = QPushButton("Remover")
+        remover_btn.clicked.connect(self.remover)
+        salvar_btn = QPushButton("Salvar")
+        salvar_btn.clicked.connect(self.accept)
+        fechar_btn = QPushButton("Fechar")
+        fechar_btn.clicked.connect(self.reject)
+        
+        btn_layout.addWidget(adicionar_btn)
+        btn_layout.addWidget(importar_btn)
+        btn_layout.addWidget(remover_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(salvar_btn)
+        btn_layout.addWidget(fechar_btn)
+        layout.addLayout(btn_layout)
+        
+        self.setLayout(layout)
+        self.preencher()
+    
+    def preencher(self):
+        medicos = sorted(self.cadastro.medicos.values(), key=lambda m: m.nome)
+        self.table.setRowCount(len(medicos))
+        for row, medico in enumerate(medicos):
+            id_item = QTableWidgetItem(str(medico.id))
+            id_item.setFlags(id_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            id_item.setData(Qt.ItemDataRole.UserRole, medico.id)
+            self.table.setItem(row, 0, id_item)
+            self.table.setItem(row, 1, QTableWidgetItem(medico.nome))
+            self.table.setItem(row, 2, QTableWidgetItem(medico.especialidade))
+            self.table.setItem(row, 3, QTableWidgetItem(medico.crm))
+    
+    def aplicar_edicoes(self):
+        for row in range(self.table.rowCount()):
+            id_medico = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+            medico = self.cadastro.medicos[id_medico]
+            campos = tuple(self.table.item(row, col).text().strip() for col in (1, 2, 3))
+            if campos == (medico.nome, medico.especialidade, medico.crm):
+                continue
+            if not campos[0]:
+                raise ValueError("Nome do médico não pode ser vazio")
+            self.cadastro.atualizar(id_medico, *campos)
+    
+    def adicionar(self):
+        nome, ok = QInputDialog.getText(self, "Adicionar Médico", "Nome:")
+        if not ok or not nome.strip():
+            return
+        try:
+            self.aplicar_edicoes()
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        self.cadastro.adicionar(nome)
+        self.preencher()
+    
+    def importar_da_escala(self):
+        try:
+            self.aplicar_edicoes()
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        novos = [nome for nome in self.nomes_escala if self.cadastro.buscar(nome) is None]
+        for nome in novos:
+            self.cadastro.adicionar(nome)
+        self.preencher()
+        QMessageBox.information(self, "Cadastro", f"{len(novos)} médico(s) adicionado(s).")
+    
+    def remover(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return
+        reply = QMessageBox.question(self, 'Confirmar Exclusão',
+                                    f'Remover {self.table.item(row, 1).text()} do cadastro?',
+                                    QMessageBox.StandardButton.Yes |
+                                    QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.cadastro.remover(self.table.item(row, 0).data(Qt.ItemDataRole.UserRole))
+            self.table.removeRow(row)
+    
+    def accept(self):
+        try:
+            self.aplicar_edicoes()
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        self.cadastro.salvar()
+        super().accept()
+    
+    def reject(self):
+        self.cadastro.carregar()
+        super().reject()
+
+
+class HistoryListModel(QAbstractListModel):
+    def __init__(self, indice, parent=None):
+        super().__init__(parent)
+        self.indice = indice
+        self.linhas = []
+        self.total = 0
+        self.recarregar()
+
+    def recarregar(self):
+        self.beginResetModel()
+        self.total = self.indice.contar()
+        self.linhas = self.indice.pagina(0)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.linhas)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and len(self.linhas) < self.total
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        novas = self.indice.pagina(len(self.linhas))
+        if not novas:
+            self.total = len(self.linhas)
+            return
+        inicio = len(self.linhas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(novas) - 1)
+        self.linhas.extend(novas)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        arquivo, mes, ano, _, medicos = self.linhas[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{mes}/{ano} - {Path(arquivo).stem} ({medicos} médicos)"
+        if role == Qt.ItemDataRole.UserRole:
+            return arquivo
+        return None
+
+
+class AlteracoesDialog(QDialog):
+    """Relatório de alterações entre versões, com exportação para CSV.
+    
+    Com ``destacar``, o botão "Destacar na Tabela" fecha o diálogo como aceito.
+    """
+    
+    def __init__(self, titulo, linhas, parent=None, destacar=False):
+        super().__init__(parent)
+        self.setWindowTitle("Alterações entre Versões")
+        self.setMinimumSize(750, 450)
+        self.linhas = linhas
+        
+        layout = QVBoxLayout()
+        resumo = f"{len(linhas)} alteração(ões)" if linhas else "Nenhuma alteração"
+        layout.addWidget(QLabel(f"{titulo}: {resumo}"))
+        
+        self.table = QTableWidget(len(linhas), len(CABECALHOS_ALTERACOES))
+        self.table.setHorizontalHeaderLabels(CABECALHOS_ALTERACOES)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for row, linha in enumerate(linhas):
+            for col, valor in enumerate(linha):
+                self.table.setItem(row, col, QTableWidgetItem(valor))
+        layout.addWidget(self.table)
+        
+        btn_layout = QHBoxLayout()
+        csv_btn = QPushButton("Exportar CSV")
+        csv_btn.clicked.connect(self.exportar_csv)
+        btn_layout.addWidget(csv_btn)
+        if destacar:
+            destacar_btn = QPushButton("Destacar na Tabela")
+            destacar_btn.clicked.connect(self.accept)
+            btn_layout.addWidget(destacar_btn)
+        close_btn = QPushButton("Fechar")
+        close_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        
+        self.setLayout(layout)
+    
+    def exportar_csv(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Salvar CSV", "Alteracoes.csv", "CSV Files (*.csv)")
+        if not filename:
+            return
+        salvar_csv_alteracoes(self.linhas, filename)
+        QMessageBox.information(self, "Sucesso", f"CSV exportado com sucesso!\n{filename}")
+
+
+class HistoryDialog(QDialog):
+    def __init__(self, parent=None, unidade=UNIDADE_PADRAO, escala=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Histórico de Escalas - {unidade}")
         self.setMinimumSize(500, 400)
         self.selected_file = None
+        self.escala = escala
+        # (arquivo a carregar ou None para a escala atual, alterações a destacar)
+        self.comparacao = None
+        
+        self.indice = abrir_indice(unidade)
         
         layout = QVBoxLayout()
         
-        self.list_widget = QListWidget()
-        self.list_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
-        layout.addWidget(QLabel("Escalas Salvas:"))
-        layout.addWidget(self.list_widget)
+        self.model = HistoryListModel(self.indice, self)
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.list_view.setModel(self.model)
+        self.list_view.doubleClicked.connect(self.on_item_double_clicked)
+        layout.addWidget(QLabel("Escalas Salvas (selecione uma ou duas para comparar):"))
+        layout.addWidget(self.list_view)
         
         btn_layout = QHBoxLayout()
         load_btn = QPushButton("Carregar Selecionada")
         load_btn.clicked.connect(self.accept)
+        compare_btn = QPushButton("Comparar")
+        compare_btn.clicked.connect(self.comparar_selecionadas)
+        chain_btn = QPushButton("Alterações do Mês")
+        chain_btn.clicked.connect(self.alteracoes_do_mes)
         delete_btn = QPushButton("Excluir")
         delete_btn.clicked.connect(self.delete_selected)
         close_btn = QPushButton("Fechar")
         close_btn.clicked.connect(self.reject)
         
         btn_layout.addWidget(load_btn)
+        btn_layout.addWidget(compare_btn)
+        btn_layout.addWidget(chain_btn)
         btn_layout.addWidget(delete_btn)
         btn_layout.addWidget(close_btn)
         layout.addLayout(btn_layout)
@@ -48,44 +994,194 @@ class HistoryDialog(QDialog):
         self.setLayout(layout)
         self.load_history()
     
+    @medido("carregar_historico")
     def load_history(self):
-        self.list_widget.clear()
-        escalas_dir = Path("escalas")
-        if escalas_dir.exists():
-            files = sorted(escalas_dir.glob("*.json"), reverse=True)
-            for file in files:
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    mes = data.get('mes', '')
-                    ano = data.get('ano', '')
-                    item_text = f"{mes}/{ano} - {file.stem}"
-                    self.list_widget.addItem(item_text)
-    
-    def on_item_double_clicked(self, item):
+        self.indice.sincronizar()
+        self.model.recarregar()
+    
+    def on_item_double_clicked(self, index):
         self.accept()
     
+    def done(self, result):
+        self.indice.close()
+        super().done(result)
+    
     def delete_selected(self):
-        current_item = self.list_widget.currentItem()
-        if current_item:
+        file_path = self.get_selected_file()
+        if file_path:
             reply = QMessageBox.question(self, 'Confirmar Exclusão', 
                                         'Deseja realmente excluir esta escala?',
                                         QMessageBox.StandardButton.Yes | 
                                         QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
-                item_text = current_item.text()
-                file_name = item_text.split(" - ")[1] + ".json"
-                file_path = Path("escalas") / file_name
-                if file_path.exists():
-                    file_path.unlink()
-                    self.load_history()
+                self.indice.remover(file_path)
+                self.model.recarregar()
     
     def get_selected_file(self):
-        current_item = self.list_widget.currentItem()
-        if current_item:
-            item_text = current_item.text()
-            file_name = item_text.split(" - ")[1] + ".json"
-            return Path("escalas") / file_name
+        index = self.list_view.currentIndex()
+        if index.isValid():
+            return self.indice.caminho(index.data(Qt.ItemDataRole.UserRole))
         return None
+    
+    def arquivos_selecionados(self):
+        arquivos = [index.data(Qt.ItemDataRole.UserRole)
+                    for index in self.list_view.selectionModel().selectedIndexes()]
+        return sorted(arquivos, key=timestamp_do_arquivo)
+    
+    def comparar_selecionadas(self):
+        arquivos = self.arquivos_selecionados()
+        try:
+            if len(arquivos) == 1 and self.escala is not None:
+                antiga = ler_escala(self.indice.caminho(arquivos[0]))
+                nova, arquivo_novo = self.escala, None
+                titulo = f"{Path(arquivos[0]).stem} → escala atual"
+            elif len(arquivos) == 2:
+                nomes = TabelaNomes()
+                antiga = ler_escala(self.indice.caminho(arquivos[0]), nomes)
+                arquivo_novo = self.indice.caminho(arquivos[1])
+                nova = ler_escala(arquivo_novo, nomes)
+                titulo = f"{Path(arquivos[0]).stem} → {arquivo_novo.stem}"
+            else:
+                QMessageBox.warning(self, "Aviso",
+                                    "Selecione uma versão (para comparar com a escala atual) "
+                                    "ou duas versões do mesmo mês.")
+                return
+        except ERROS_LEITURA as e:
+            QMessageBox.warning(self, "Aviso", f"Versão ilegível:\n{e}")
+            return
+        
+        try:
+            alteracoes = comparar(antiga, nova)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        versao = arquivo_novo.stem if arquivo_novo else "atual"
+        linhas = linhas_relatorio(nova, alteracoes, feriados_alterados(antiga, nova), versao)
+        dialog = AlteracoesDialog(titulo, linhas, self, destacar=bool(alteracoes))
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            self.comparacao = (arquivo_novo, alteracoes)
+            self.accept()
+    
+    def alteracoes_do_mes(self):
+        index = self.list_view.currentIndex()
+        if not index.isValid():
+            QMessageBox.warning(self, "Aviso", "Selecione uma escala do mês desejado.")
+            return
+        _, mes, ano, _, _ = self.model.linhas[index.row()]
+        cadeia = CadeiaVersoes(self.indice, ano, mes)
+        linhas = relatorio_cadeia(cadeia)
+        titulo = f"{MESES[mes]}/{ano} ({len(cadeia.arquivos)} versões)"
+        AlteracoesDialog(titulo, linhas, self).exec()
+
+
+class DiagnosticoDialog(QDialog):
+    """Painel oculto (Ctrl+Shift+D) com a latência das operações recentes."""
+    
+    CABECALHOS_RESUMO = ['Operação', 'Vezes', 'Média (ms)', 'Máximo (ms)']
+    CABECALHOS_OPERACOES = ['Operação', 'Duração (ms)', 'Contadores']
+    CABECALHOS_CACHES = ['Cache de renderização', 'Acertos', 'Faltas', 'Itens']
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnóstico de Desempenho")
+        self.setMinimumSize(700, 500)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Por operação:"))
+        self.resumo = QTableWidget(0, len(self.CABECALHOS_RESUMO))
+        self.resumo.setHorizontalHeaderLabels(self.CABECALHOS_RESUMO)
+        self.resumo.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.resumo.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.resumo)
+        
+        layout.addWidget(QLabel("Recentes (mais nova primeiro):"))
+        self.operacoes = QTableWidget(0, len(self.CABECALHOS_OPERACOES))
+        self.operacoes.setHorizontalHeaderLabels(self.CABECALHOS_OPERACOES)
+        self.operacoes.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.operacoes.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.operacoes)
+        
+        self.caches_label = QLabel()
+        layout.addWidget(self.caches_label)
+        self.caches = QTableWidget(0, len(self.CABECALHOS_CACHES))
+        self.caches.setHorizontalHeaderLabels(self.CABECALHOS_CACHES)
+        self.caches.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.caches.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.caches)
+        
+        btn_layout = QHBoxLayout()
+        atualizar_btn = QPushButton("Atualizar")
+        atualizar_btn.clicked.connect(self.atualizar)
+        btn_layout.addWidget(atualizar_btn)
+        trace_btn = QPushButton("Salvar Trace JSON")
+        trace_btn.clicked.connect(self.salvar_trace)
+        btn_layout.addWidget(trace_btn)
+        limpar_btn = QPushButton("Limpar")
+        limpar_btn.clicked.connect(self.limpar)
+        btn_layout.addWidget(limpar_btn)
+        limpar_caches_btn = QPushButton("Limpar Caches")
+        limpar_caches_btn.clicked.connect(self.limpar_caches)
+        btn_layout.addWidget(limpar_caches_btn)
+        close_btn = QPushButton("Fechar")
+        close_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        
+        self.setLayout(layout)
+        self.atualizar()
+    
+    def atualizar(self):
+        resumo = METRICAS.resumo()
+        self.resumo.setRowCount(len(resumo))
+        for row, (nome, vezes, media, maximo) in enumerate(resumo):
+            for col, valor in enumerate((nome, str(vezes), f"{media * 1000:.1f}",
+                                         f"{maximo * 1000:.1f}")):
+                self.resumo.setItem(row, col, QTableWidgetItem(valor))
+        
+        operacoes = METRICAS.operacoes()
+        self.operacoes.setRowCount(len(operacoes))
+        for row, (nome, _, duracao, contadores, _) in enumerate(operacoes):
+            extras = ", ".join(f"{chave}={valor}" for chave, valor in contadores.items())
+            for col, valor in enumerate((nome, f"{duracao * 1000:.1f}", extras)):
+                self.operacoes.setItem(row, col, QTableWidgetItem(valor))
+        
+        exportacao = self._exportacao()
+        caches = exportacao.estatisticas_cache_renderizacao() if exportacao else {}
+        self.caches_label.setText("Caches da exportação:" if exportacao else
+                                  "Caches da exportação (módulo ainda não carregado):")
+        self.caches.setRowCount(len(caches))
+        for row, (nome, info) in enumerate(sorted(caches.items())):
+            itens = f"{info.currsize}/{info.maxsize}" if info.maxsize else str(info.currsize)
+            for col, valor in enumerate((nome, str(info.hits), str(info.misses), itens)):
+                self.caches.setItem(row, col, QTableWidgetItem(valor))
+    
+    @staticmethod
+    def _exportacao():
+        # A exportação é importada em segundo plano (ou na primeira exportação); o
+        # painel não força a importação, que carrega o reportlab e o Pillow.
+        exportacao = sys.modules.get('exportacao')
+        if exportacao is None or not hasattr(exportacao, 'estatisticas_cache_renderizacao'):
+            return None
+        return exportacao
+    
+    def salvar_trace(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Salvar Trace", "trace_plantao.json", "JSON Files (*.json)")
+        if not filename:
+            return
+        METRICAS.salvar_trace(filename)
+        QMessageBox.information(self, "Sucesso",
+                                f"Trace salvo (abra em chrome://tracing ou no Perfetto):\n{filename}")
+    
+    def limpar(self):
+        METRICAS.limpar()
+        self.atualizar()
+    
+    def limpar_caches(self):
+        exportacao = self._exportacao()
+        if exportacao:
+            exportacao.limpar_cache_renderizacao()
+        self.atualizar()
 
 
 class PlantaoApp(QMainWindow):
@@ -94,23 +1190,36 @@ class PlantaoApp(QMainWindow):
         self.setWindowTitle("Sistema de Escalas de Plantão")
         self.setMinimumSize(1200, 700)
         
-        self.meses = {
-            1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril",
-            5: "Maio", 6: "Junho", 7: "Julho", 8: "Agosto",
-            9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"
-        }
+        self.meses = MESES
         
-        self.dias_semana = {
-            0: "Segunda", 1: "Terça", 2: "Quarta", 3: "Quinta",
-            4: "Sexta", 5: "Sábado", 6: "Domingo"
-        }
+        self.dias_semana = DIAS_SEMANA
         
         Path("escalas").mkdir(exist_ok=True)
         
         self.custom_holidays = set()
+        self.unidade = UNIDADE_PADRAO
+        self.area = AreaTrabalho(datetime.now().month, datetime.now().year, self.custom_holidays)
+        self.escala = self.area.nova_escala(self.unidade)
+        self.model = EscalaTableModel(self.escala, self)
+        self.model.celulaAlterada.connect(self.registrar_autosave)
+        self.model.celulaAlterada.connect(self.enviar_sincronizacao)
+        self.sessao = None
+        self.editadas_ao_conectar = set()
+        self.sinais_sincronizacao = SinaisSincronizacao()
+        self.sinais_sincronizacao.recebidas.connect(self.receber_sincronizacao)
+        self.sinais_sincronizacao.trava.connect(self.receber_trava)
+        self.diario = None
+        # As últimas linhas do diário vão para o disco em até um segundo.
+        self.timer_diario = QTimer(self)
+        self.timer_diario.setInterval(int(INTERVALO_FSYNC * 1000))
+        self.timer_diario.timeout.connect(self.sincronizar_diario)
+        self.timer_diario.start()
+        self.cadastro = Cadastro()
         
         self.init_ui()
-        
+        if URL_SINCRONIZACAO:
+            self.conectar_sincronizacao(publicar=False)
+    
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -129,6 +1238,16 @@ class PlantaoApp(QMainWindow):
         controls_layout = QHBoxLayout()
         controls_layout.setSpacing(10)
         
+        controls_layout.addWidget(QLabel("Unidade:"))
+        self.unidade_combo = QComboBox()
+        self.unidade_combo.addItems(self.area.unidades)
+        self.unidade_combo.currentTextChanged.connect(self.trocar_unidade)
+        controls_layout.addWidget(self.unidade_combo)
+        
+        nova_unidade_btn = QPushButton("Nova Unidade")
+        nova_unidade_btn.clicked.connect(self.nova_unidade)
+        controls_layout.addWidget(nova_unidade_btn)
+        
         controls_layout.addWidget(QLabel("Mês:"))
         self.mes_combo = QComboBox()
         for num, nome in self.meses.items():
@@ -181,15 +1300,92 @@ class PlantaoApp(QMainWindow):
         historico_btn.clicked.connect(self.abrir_historico)
         controls_layout.addWidget(historico_btn)
         
+        periodo_btn = QPushButton("Visão por Período")
+        periodo_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #3f51b5;
+                color: white;
+                padding: 8px 20px;
+                font-size: 14px;
+                font-weight: bold;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #303f9f;
+            }
+        """)
+        periodo_btn.clicked.connect(self.abrir_periodo)
+        controls_layout.addWidget(periodo_btn)
+        
+        analise_btn = QPushButton("Análise")
+        analise_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #607d8b;
+                color: white;
+                padding: 8px 20px;
+                font-size: 14px;
+                font-weight: bold;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #455a64;
+            }
+        """)
+        analise_btn.clicked.connect(self.abrir_analise)
+        controls_layout.addWidget(analise_btn)
+        
+        medicos_btn = QPushButton("Médicos")
+        medicos_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #795548;
+                color: white;
+                padding: 8px 20px;
+                font-size: 14px;
+                font-weight: bold;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #5d4037;
+            }
+        """)
+        medicos_btn.clicked.connect(self.abrir_cadastro)
+        controls_layout.addWidget(medicos_btn)
+        
+        busca_btn = QPushButton("Buscar Médico")
+        busca_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #3f51b5;
+                color: white;
+                padding: 8px 20px;
+                font-size: 14px;
+                font-weight: bold;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #303f9f;
+            }
+        """)
+        busca_btn.clicked.connect(self.abrir_busca)
+        controls_layout.addWidget(busca_btn)
+        
         main_layout.addLayout(controls_layout)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Data", "Dia da Semana", "Noite", "Tarde", "Manhã"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.delegate = MedicoDelegate(self.cadastro, self.table)
+        if URL_SINCRONIZACAO:
+            self.delegate.travar = self.travar_celula
+            self.delegate.liberar = self.liberar_celula
+        self.table.setItemDelegate(self.delegate)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         
         header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
@@ -198,11 +1394,11 @@ class PlantaoApp(QMainWindow):
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #d0d0d0;
                 font-size: 13px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
             }
             QHeaderView::section {
@@ -217,9 +1413,36 @@ class PlantaoApp(QMainWindow):
         
         main_layout.addWidget(self.table)
         
+        for tecla, acao in ((QKeySequence.StandardKey.Undo, self.desfazer),
+                            (QKeySequence.StandardKey.Redo, self.refazer),
+                            (QKeySequence.StandardKey.Copy, self.copiar),
+                            (QKeySequence.StandardKey.Paste, self.colar)):
+            atalho = QShortcut(QKeySequence(tecla), self.table)
+            atalho.setContext(Qt.ShortcutContext.WidgetShortcut)
+            atalho.activated.connect(acao)
+        
+        diagnostico = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostico.activated.connect(self.abrir_diagnostico)
+        
         buttons_layout = QHBoxLayout()
         buttons_layout.setSpacing(10)
         
+        self.autosave_check = QCheckBox("Salvamento automático")
+        self.autosave_check.toggled.connect(self.alternar_autosave)
+        buttons_layout.addWidget(self.autosave_check)
+        
+        versoes_btn = QPushButton("Versões")
+        versoes_btn.clicked.connect(self.restaurar_versao)
+        buttons_layout.addWidget(versoes_btn)
+        
+        desfazer_btn = QPushButton("Desfazer")
+        desfazer_btn.clicked.connect(self.desfazer)
+        buttons_layout.addWidget(desfazer_btn)
+        
+        refazer_btn = QPushButton("Refazer")
+        refazer_btn.clicked.connect(self.refazer)
+        buttons_layout.addWidget(refazer_btn)
+        
         salvar_btn = QPushButton("Salvar Escala")
         salvar_btn.setStyleSheet("""
             QPushButton {
@@ -238,6 +1461,24 @@ class PlantaoApp(QMainWindow):
         salvar_btn.clicked.connect(self.salvar_escala)
         buttons_layout.addWidget(salvar_btn)
         
+        auto_btn = QPushButton("Preencher Automaticamente")
+        auto_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #009688;
+                color: white;
+                padding: 10px 25px;
+                font-size: 14px;
+                font-weight: bold;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #00796b;
+            }
+        """)
+        auto_btn.clicked.connect(self.preencher_automaticamente)
+        buttons_layout.addWidget(auto_btn)
+        
         pdf_btn = QPushButton("Exportar PDF")
         pdf_btn.setStyleSheet("""
             QPushButton {
@@ -256,6 +1497,14 @@ class PlantaoApp(QMainWindow):
         pdf_btn.clicked.connect(self.exportar_pdf)
         buttons_layout.addWidget(pdf_btn)
         
+        pdf_unidades_btn = QPushButton("PDF de Todas as Unidades")
+        pdf_unidades_btn.clicked.connect(self.exportar_pdf_unidades)
+        buttons_layout.addWidget(pdf_unidades_btn)
+        
+        agendas_btn = QPushButton("Agendas dos Médicos")
+        agendas_btn.clicked.connect(self.exportar_agendas)
+        buttons_layout.addWidget(agendas_btn)
+        
         png_btn = QPushButton("Exportar PNG")
         png_btn.setStyleSheet("""
             QPushButton {
@@ -276,7 +1525,17 @@ class PlantaoApp(QMainWindow):
         
         main_layout.addLayout(buttons_layout)
         
+        self.exportacoes = ExportacoesPanel()
+        self.exportacoes.mensagem.connect(lambda texto: self.statusBar().showMessage(texto, 10000))
+        self.exportacoes.erro.connect(
+            lambda texto: QMessageBox.warning(self, "Erro", f"Falha na exportação:\n{texto}"))
+        main_layout.addWidget(self.exportacoes)
+        
         self.gerar_tabela()
+        # Data e dia da semana têm largura estável: medir uma vez evita
+        # que o cabeçalho percorra todas as linhas a cada atualização.
+        self.table.resizeColumnToContents(0)
+        self.table.resizeColumnToContents(1)
     
     def show_context_menu(self, position):
         row = self.table.rowAt(position.y())
@@ -284,354 +1543,586 @@ class PlantaoApp(QMainWindow):
             return
         
         menu = QMenu()
-        date_item = self.table.item(row, 0)
-        if not date_item:
-            return
-        
-        date_text = date_item.text()
+        date_text = self.escala.data_texto(row)
         is_holiday = date_text in self.custom_holidays
         
-        if is_holiday:
+        col = self.table.columnAt(position.x())
+        historico = self.model.historico
+        desfazer = refazer = None
+        if historico.pode_desfazer():
+            desfazer = menu.addAction(f"Desfazer: {historico.proximo_desfazer()}")
+        if historico.pode_refazer():
+            refazer = menu.addAction(f"Refazer: {historico.proximo_refazer()}")
+        colar = menu.addAction("Colar da planilha")
+        colar.setEnabled(bool(QApplication.clipboard().text()))
+        repetir = None
+        if row + 7 <= self.escala.num_dias:
+            repetir = menu.addAction(f"Repetir a semana de {date_text} no mês")
+        rodizio_acao = None
+        if col >= COLUNAS_FIXAS:
+            rodizio_acao = menu.addAction(f"Rodízio na coluna {CABECALHOS[col]} a partir deste dia...")
+        menu.addSeparator()
+        
+        limpar = None
+        if self.model.alteracoes:
+            limpar = menu.addAction("Limpar destaque de alterações")
+        
+        nome = nome_feriado(date(self.escala.ano, self.escala.mes, row + 1))
+        if nome and not is_holiday:
+            menu.addAction(f"Feriado do calendário: {nome}").setEnabled(False)
+            action = None
+        elif is_holiday:
             action = menu.addAction("❌ Remover como feriado")
         else:
             action = menu.addAction("⭐ Marcar como feriado")
         
         result = menu.exec(self.table.viewport().mapToGlobal(position))
         
-        if result == action:
-            if is_holiday:
-                self.custom_holidays.discard(date_text)
-            else:
-                self.custom_holidays.add(date_text)
+        if result is None:
+            return
+        if result == desfazer:
+            self.desfazer()
+        elif result == refazer:
+            self.refazer()
+        elif result == colar:
+            self.colar(row, col)
+        elif result == repetir:
+            self.repetir_semana(row)
+        elif result == rodizio_acao:
+            self.rodizio(row, col - COLUNAS_FIXAS)
+        elif result == limpar:
+            self.model.destacar_alteracoes([])
+        elif result == action:
+            self.escala.alternar_feriado(row)
+            self.area.recalcular_destaques()
             self.aplicar_destaque_linha(row)
+            if self.diario:
+                self.diario.registrar_feriado(self.escala, date_text, not is_holiday)
     
-    def aplicar_destaque_linha(self, row):
-        date_item = self.table.item(row, 0)
-        dia_item = self.table.item(row, 1)
-        
-        if not date_item or not dia_item:
+    def desfazer(self):
+        descricao = self.model.desfazer()
+        self.statusBar().showMessage(f"Desfeito: {descricao}" if descricao else "Nada a desfazer",
+                                     5000)
+    
+    def refazer(self):
+        descricao = self.model.refazer()
+        self.statusBar().showMessage(f"Refeito: {descricao}" if descricao else "Nada a refazer",
+                                     5000)
+    
+    def copiar(self):
+        indices = self.table.selectedIndexes()
+        if not indices:
             return
-        
-        date_text = date_item.text()
-        dia_semana = date_text.split('/')[0]
-        
-        mes = self.mes_combo.currentData()
-        ano = self.ano_spin.value()
-        dia_num = int(dia_semana)
-        data_obj = date(ano, mes, dia_num)
-        dia_semana_num = data_obj.weekday()
-        
-        is_weekend = dia_semana_num in [4, 5, 6] or date_text in self.custom_holidays
-        cor_fundo_azul = QColor(138, 180, 248)
-        
-        for col in range(5):
-            item = self.table.item(row, col)
-            if item:
-                if is_weekend:
-                    item.setBackground(cor_fundo_azul)
-                    item.setForeground(QColor(Qt.GlobalColor.black))
-                else:
-                    item.setData(Qt.ItemDataRole.BackgroundRole, None)
-                    item.setData(Qt.ItemDataRole.ForegroundRole, None)
+        rows = sorted({index.row() for index in indices})
+        colunas = sorted({index.column() for index in indices})
+        QApplication.clipboard().setText(copiar_tsv(self.escala, rows, colunas))
+    
+    def colar(self, row=None, col=None):
+        if row is None:
+            atual = self.table.currentIndex()
+            if not atual.isValid():
+                return
+            row, col = atual.row(), atual.column()
+        texto = QApplication.clipboard().text()
+        if not texto:
+            return
+        alteracoes = colar_tsv(self.escala, texto, row, col - COLUNAS_FIXAS, self.cadastro.canonico)
+        alteradas = self.model.definir_celulas(alteracoes, "Colar")
+        self.statusBar().showMessage(f"{alteradas} célula(s) coladas", 5000)
+    
+    def repetir_semana(self, row):
+        alteradas = self.model.definir_celulas(repetir_semana(self.escala, row), "Repetir semana")
+        self.statusBar().showMessage(f"Semana repetida: {alteradas} célula(s) alteradas", 5000)
+    
+    def rodizio(self, row, turno):
+        nomes = sorted({self.escala.medico(r, turno) for r in range(self.escala.num_dias)} - {''})
+        texto, ok = QInputDialog.getMultiLineText(
+            self, "Rodízio",
+            f"Médicos em sequência a partir de {self.escala.data_texto(row)} (um por linha):",
+            "\n".join(nomes))
+        if not ok:
+            return
+        try:
+            alteracoes = rodizio(self.escala, turno,
+                                 [self.cadastro.canonico(nome) for nome in texto.splitlines()], row)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        self.model.definir_celulas(alteracoes, f"Rodízio {CABECALHOS[COLUNAS_FIXAS + turno]}")
+    
+    def aplicar_destaque_linha(self, row):
+        self.model.atualizar_linha(row)
     
     def gerar_tabela(self):
         mes = self.mes_combo.currentData()
         ano = self.ano_spin.value()
         
-        num_dias = monthrange(ano, mes)[1]
-        self.table.setRowCount(num_dias)
-        
-        for dia in range(1, num_dias + 1):
-            data_obj = date(ano, mes, dia)
-            dia_semana = data_obj.weekday()
-            
-            item_data = QTableWidgetItem(f"{dia:02d}/{mes:02d}/{ano}")
-            item_data.setFlags(item_data.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_dia = QTableWidgetItem(self.dias_semana[dia_semana])
-            item_data.setFlags(item_data.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_dia.setFlags(item_dia.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_data.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_dia.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            date_text = f"{dia:02d}/{mes:02d}/{ano}"
-            is_weekend = dia_semana in [4, 5, 6] or date_text in self.custom_holidays
-            
-            if is_weekend:
-                cor_fundo = QColor(138, 180, 248)
-                item_data.setBackground(cor_fundo)
-                item_dia.setBackground(cor_fundo)
-                item_data.setForeground(QColor(Qt.GlobalColor.black))
-                item_dia.setForeground(QColor(Qt.GlobalColor.black))
-
-            self.table.setItem(dia - 1, 0, item_data)
-            self.table.setItem(dia - 1, 1, item_dia)
-            
-            item_noite = QTableWidgetItem("")
-            item_tarde = QTableWidgetItem("")
-            item_manha = QTableWidgetItem("")
-
-            for cell in (item_noite, item_tarde, item_manha):
-                cell.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-            if is_weekend:
-                for cell in (item_noite, item_tarde, item_manha):
-                    cell.setBackground(cor_fundo)
-                    cell.setForeground(QColor(Qt.GlobalColor.black))
-
-            self.table.setItem(dia - 1, 2, item_noite)
-            self.table.setItem(dia - 1, 3, item_tarde)
-            self.table.setItem(dia - 1, 4, item_manha)
+        with medir("gerar_tabela"):
+            if (mes, ano) != (self.area.mes, self.area.ano):
+                self.area = AreaTrabalho(mes, ano, self.custom_holidays)
+            self.trocar_escala(self.area.nova_escala(self.unidade))
+        if self.autosave_check.isChecked():
+            self.iniciar_autosave(perguntar=True)
+    
+    def trocar_escala(self, escala, publicar=False):
+        self.escala = escala
+        conflitos = self.area.verificador()
+        self.model.set_escala(escala, conflitos, self.area.unidades.index(self.unidade))
+        if URL_SINCRONIZACAO:
+            self.conectar_sincronizacao(publicar)
+    
+    def conectar_sincronizacao(self, publicar):
+        """Entra na escala compartilhada do servidor, sem bloquear a janela.
+        
+        A sessão entra na escala em segundo plano: se o servidor ainda não a
+        conhece, ou com ``publicar`` (escala carregada do histórico ou
+        restaurada), as células locais são enviadas; senão a tabela passa a
+        mostrar o que está no servidor, menos as células editadas aqui
+        enquanto a resposta não chegava.
+        """
+        if self.sessao:
+            self.sessao.parar()
+            self.sessao = None
+        self.model.definir_travas({})
+        nome = documento(self.unidade, self.escala.ano, self.escala.mes)
+        cliente = ClienteSincronizacao(URL_SINCRONIZACAO, USUARIO_SINCRONIZACAO, nome)
+        nomes = self.escala.nomes.nomes
+        sinais = self.sinais_sincronizacao
+        sessao = SessaoSincronizacao(
+            cliente,
+            lambda celulas, travas, erro, inicial: sinais.recebidas.emit(
+                sessao, celulas, travas, erro or '', inicial),
+            [nomes[id_medico] for id_medico in self.escala.celulas], publicar,
+            lambda pos, dono: sinais.trava.emit(sessao, pos, dono or ''))
+        self.editadas_ao_conectar = set()
+        sessao.iniciar()
+        self.sessao = sessao
+        self.statusBar().showMessage(f"Conectando à sincronização de {nome}...", 5000)
+    
+    def enviar_sincronizacao(self, row, turno, nome):
+        if self.sessao and not self.model.remoto:
+            pos = row * len(TURNOS) + turno
+            if self.editadas_ao_conectar is not None:
+                self.editadas_ao_conectar.add(pos)
+            self.sessao.enviar([(pos, nome)])
+    
+    def receber_sincronizacao(self, sessao, celulas, travas, erro, inicial):
+        if sessao is not self.sessao:
+            return
+        if erro:
+            self.statusBar().showMessage(f"Sincronização indisponível (offline): {erro}", 5000)
+            return
+        if inicial:
+            editadas = self.editadas_ao_conectar
+            celulas = [(pos, nome) for pos, nome in celulas if pos not in editadas]
+            self.editadas_ao_conectar = None
+            self.statusBar().showMessage(
+                f"Sincronizando {documento(self.unidade, self.escala.ano, self.escala.mes)} "
+                f"como {USUARIO_SINCRONIZACAO}", 5000)
+        self.model.aplicar_remotas(celulas)
+        if travas is not None:
+            self.model.definir_travas(travas)
+    
+    def travar_celula(self, index):
+        """Libera a edição na hora; a trava é pedida ao servidor em segundo plano.
+        
+        Só as travas já conhecidas (da última consulta) impedem a edição; se o
+        servidor responder que outro usuário travou a célula antes, o editor é
+        fechado em ``receber_trava``.
+        """
+        if self.sessao is None:
+            return True
+        pos = self.model.posicao(index)
+        dono = self.model.travas.get(pos)
+        if dono is not None:
+            self.statusBar().showMessage(f"Célula em edição por {dono}", 5000)
+            return False
+        if not self.sessao.offline:
+            self.sessao.travar(pos)
+        return True
+    
+    def receber_trava(self, sessao, pos, dono):
+        if sessao is not self.sessao or not dono or dono == USUARIO_SINCRONIZACAO:
+            return
+        self.model.definir_travas({**self.model.travas, pos: dono})
+        row, turno = divmod(pos, len(TURNOS))
+        self.delegate.cancelar_edicao(row, COLUNAS_FIXAS + turno)
+        self.statusBar().showMessage(f"Célula em edição por {dono}", 5000)
+    
+    def liberar_celula(self, index):
+        if self.sessao is not None:
+            self.sessao.travar(self.model.posicao(index), travar=False)
+    
+    def trocar_unidade(self, unidade):
+        if not unidade or unidade == self.unidade:
+            return
+        self.unidade = unidade
+        self.area.adicionar_unidade(unidade)
+        self.trocar_escala(self.area.escala(unidade))
+        if self.autosave_check.isChecked():
+            self.iniciar_autosave(perguntar=False)
+    
+    def nova_unidade(self):
+        nome, ok = QInputDialog.getText(self, "Nova Unidade", "Nome da unidade (ala/setor):")
+        if not ok or not nome.strip():
+            return
+        try:
+            nome = criar_unidade(nome)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        self.area.adicionar_unidade(nome)
+        self.unidade_combo.addItem(nome)
+        self.unidade_combo.setCurrentText(nome)
+    
+    def confirmar_conflitos(self, acao):
+        mensagens = self.model.conflitos.listar(self.model.unidade)
+        if not mensagens:
+            return True
+        
+        detalhes = "\n".join(mensagens[:10])
+        if len(mensagens) > 10:
+            detalhes += f"\n... e mais {len(mensagens) - 10}"
+        reply = QMessageBox.question(self, 'Conflitos na Escala',
+                                    f'A escala tem {len(mensagens)} conflito(s):\n\n{detalhes}'
+                                    f'\n\nDeseja {acao} mesmo assim?',
+                                    QMessageBox.StandardButton.Yes |
+                                    QMessageBox.StandardButton.No)
+        return reply == QMessageBox.StandardButton.Yes
     
     def salvar_escala(self):
-        mes = self.mes_combo.currentData()
-        ano = self.ano_spin.value()
+        if not self.confirmar_conflitos("salvar"):
+            return
         
-        data = {
-            'mes': mes,
-            'ano': ano,
-            'feriados': list(self.custom_holidays),
-            'escalas': []
-        }
+        mes = self.escala.mes
+        ano = self.escala.ano
         
-        for row in range(self.table.rowCount()):
-            data_item = self.table.item(row, 0)
-            dia_item = self.table.item(row, 1)
-            noite_item = self.table.item(row, 2)
-            tarde_item = self.table.item(row, 3)
-            manha_item = self.table.item(row, 4)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        with medir("salvar_escala"):
+            indice = abrir_indice(self.unidade)
+            filename, resumo = armazenamento.salvar(
+                indice.caminho(f"escala_{mes:02d}_{ano}_{timestamp}"),
+                self.escala, self.cadastro.ids_por_nome())
             
-            data['escalas'].append({
-                'data': data_item.text() if data_item else '',
-                'dia_semana': dia_item.text() if dia_item else '',
-                'noite': noite_item.text() if noite_item else '',
-                'tarde': tarde_item.text() if tarde_item else '',
-                'manha': manha_item.text() if manha_item else ''
-            })
+            indice.registrar(filename, resumo)
+            indice.close()
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"escalas/escala_{mes:02d}_{ano}_{timestamp}.json"
+        QMessageBox.information(self, "Sucesso", "Escala salva com sucesso!")
+    
+    def preencher_automaticamente(self):
+        mes = self.escala.mes
+        ano = self.escala.ano
+        
+        travadas = {}
+        for row in range(self.escala.num_dias):
+            for turno, chave in enumerate(TURNOS):
+                nome = self.escala.medico(row, turno)
+                if nome:
+                    travadas[(row + 1, chave)] = nome
+        
+        nomes = "\n".join(sorted(set(travadas.values()))
+                          or sorted(m.nome for m in self.cadastro.medicos.values()))
+        texto, ok = QInputDialog.getMultiLineText(
+            self, "Preenchimento Automático",
+            "Médicos disponíveis (um por linha):", nomes)
+        if not ok:
+            return
+        
+        # Dias em que o médico já está escalado em outra unidade ficam indisponíveis.
+        ocupados = self.area.indisponibilidades(self.unidade)
+        medicos = [Medico(nome.strip(), indisponivel=ocupados.get(nome.strip(), ()))
+                   for nome in texto.splitlines() if nome.strip()]
+        if not medicos:
+            QMessageBox.warning(self, "Aviso", "Informe ao menos um médico!")
+            return
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        solucao = preencher_mes(ano, mes, medicos, self.custom_holidays, travadas)
         
-        QMessageBox.information(self, "Sucesso", "Escala salva com sucesso!")
+        self.model.definir_celulas((
+            (row, turno, solucao.get(row + 1, chave))
+            for row in range(self.escala.num_dias)
+            for turno, chave in enumerate(TURNOS)), "Preenchimento automático")
+        
+        if solucao.pendentes:
+            QMessageBox.warning(self, "Aviso",
+                                f"{len(solucao.pendentes)} turno(s) ficaram sem médico disponível.")
+    
+    def alternar_autosave(self, ativo):
+        if ativo:
+            self.iniciar_autosave(perguntar=True)
+        elif self.diario:
+            self.diario.fechar()
+            self.diario = None
+    
+    def iniciar_autosave(self, perguntar):
+        if self.diario:
+            self.diario.fechar()
+        self.diario = Diario(self.escala.mes, self.escala.ano, diretorio_autosave(self.unidade))
+        
+        if perguntar and self.diario.existe():
+            reply = QMessageBox.question(self, 'Salvamento Automático',
+                                        'Existe um salvamento automático para este mês. '
+                                        'Deseja recuperá-lo?',
+                                        QMessageBox.StandardButton.Yes |
+                                        QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes:
+                escala = self.area.adotar(self.unidade, self.diario.reconstruir())
+                self.trocar_escala(escala, publicar=True)
+                self.diario.compactar(escala)
+                return
+        
+        self.diario.iniciar(self.escala)
+    
+    def sincronizar_diario(self):
+        if self.diario:
+            self.diario.sincronizar()
+    
+    def registrar_autosave(self, row, turno, nome):
+        if self.diario:
+            self.diario.registrar_celula(self.escala, row, turno, nome)
+    
+    def restaurar_versao(self):
+        diario = self.diario or Diario(self.escala.mes, self.escala.ano,
+                                       diretorio_autosave(self.unidade))
+        if not diario.existe():
+            QMessageBox.warning(self, "Aviso", "Não há salvamento automático para este mês!")
+            return
+        
+        versao, ok = QInputDialog.getInt(
+            self, "Versões", f"Versão a restaurar (0 a {diario.versao}):",
+            diario.versao, 0, diario.versao)
+        if not ok:
+            return
+        
+        escala = self.area.adotar(self.unidade, diario.reconstruir(versao))
+        self.trocar_escala(escala, publicar=True)
+        if self.diario:
+            self.diario.iniciar(escala)
     
     def abrir_historico(self):
-        dialog = HistoryDialog(self)
+        dialog = HistoryDialog(self, self.unidade, self.escala)
         if dialog.exec() == QDialog.DialogCode.Accepted:
+            if dialog.comparacao is not None:
+                arquivo, alteracoes = dialog.comparacao
+                if arquivo is not None:
+                    self.carregar_escala(arquivo)
+                self.model.destacar_alteracoes(alteracoes)
+                return
             file_path = dialog.get_selected_file()
             if file_path and file_path.exists():
                 self.carregar_escala(file_path)
     
+    def closeEvent(self, event):
+        self.exportacoes.cancelar_todas()
+        if self.sessao:
+            self.sessao.parar()
+        if self.diario:
+            self.diario.fechar()
+        super().closeEvent(event)
+    
+    def abrir_periodo(self):
+        dialog = PeriodoDialog(self.mes_combo.currentData(), self.ano_spin.value(), self)
+        dialog.exec()
+    
+    def abrir_analise(self):
+        dialog = AnaliseDialog(self)
+        dialog.exec()
+    
+    def abrir_busca(self):
+        dialog = BuscaDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted or dialog.selecionado is None:
+            return
+        unidade, file_path, row, turno = dialog.selecionado
+        if unidade != self.unidade:
+            self.unidade_combo.setCurrentText(unidade)
+        if file_path.exists():
+            self.carregar_escala(file_path)
+            index = self.model.index(row, COLUNAS_FIXAS + turno)
+            self.table.setCurrentIndex(index)
+            self.table.scrollTo(index)
+    
+    def abrir_diagnostico(self):
+        DiagnosticoDialog(self).exec()
+    
+    def abrir_cadastro(self):
+        nomes_escala = sorted({self.escala.nomes.nome(id_medico)
+                               for id_medico in self.escala.celulas if id_medico})
+        dialog = CadastroDialog(self.cadastro, nomes_escala, self)
+        dialog.exec()
+    
     def carregar_escala(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        mes = data['mes']
-        ano = data['ano']
-        self.custom_holidays = set(data.get('feriados', []))
-        
-        self.mes_combo.setCurrentIndex(mes - 1)
-        self.ano_spin.setValue(ano)
-        
-        self.gerar_tabela()
-        
-        for row, escala in enumerate(data['escalas']):
-            if row < self.table.rowCount():
-                self.table.item(row, 2).setText(escala.get('noite', ''))
-                self.table.item(row, 3).setText(escala.get('tarde', ''))
-                self.table.item(row, 4).setText(escala.get('manha', ''))
+        with medir("carregar_escala"):
+            try:
+                escala = ler_escala(file_path)
+            except ERROS_LEITURA as e:
+                escala, erro = None, e
+            else:
+                if (escala.mes, escala.ano) != (self.area.mes, self.area.ano):
+                    self.area = AreaTrabalho(escala.mes, escala.ano, self.custom_holidays)
+                escala = self.area.adotar(self.unidade, escala)
+                
+                self.mes_combo.setCurrentIndex(escala.mes - 1)
+                self.ano_spin.setValue(escala.ano)
+                
+                self.trocar_escala(escala, publicar=True)
+                if self.autosave_check.isChecked():
+                    self.iniciar_autosave(perguntar=False)
         
+        if escala is None:
+            QMessageBox.warning(self, "Aviso", f"Não foi possível ler a escala:\n{erro}")
+            return
         QMessageBox.information(self, "Sucesso", "Escala carregada com sucesso!")
     
+    def prefixo_unidade(self):
+        if self.unidade == UNIDADE_PADRAO:
+            return ""
+        return f"{slug_unidade(self.unidade)}_"
+    
+    def sufixo_unidade(self):
+        return "" if self.unidade == UNIDADE_PADRAO else f" ({self.unidade})"
+    
     def exportar_pdf(self):
-        if self.table.rowCount() == 0:
+        if self.model.rowCount() == 0:
             QMessageBox.warning(self, "Aviso", "Gere uma tabela primeiro!")
             return
         
-        mes = self.mes_combo.currentData()
-        ano = self.ano_spin.value()
+        if not self.confirmar_conflitos("exportar"):
+            return
+        
+        mes = self.escala.mes
+        ano = self.escala.ano
         mes_nome = self.meses[mes]
         
         filename, _ = QFileDialog.getSaveFileName(
             self, "Salvar PDF", 
-            f"Escala_{mes_nome}_{ano}.pdf",
+            f"Escala_{self.prefixo_unidade()}{mes_nome}_{ano}.pdf",
             "PDF Files (*.pdf)"
         )
         
         if not filename:
             return
         
-        doc = SimpleDocTemplate(filename, pagesize=landscape(A4),
-                               leftMargin=15*mm, rightMargin=15*mm,
-                               topMargin=15*mm, bottomMargin=15*mm)
+        self.exportacoes.adicionar(ExportacaoWorker('pdf', self.escala.copiar(), filename),
+                                   f"PDF {mes_nome}/{ano}{self.sufixo_unidade()}")
+    
+    def exportar_pdf_unidades(self):
+        if self.model.rowCount() == 0:
+            QMessageBox.warning(self, "Aviso", "Gere uma tabela primeiro!")
+            return
         
-        elements = []
+        if not self.confirmar_conflitos("exportar"):
+            return
+        
+        mes = self.escala.mes
+        ano = self.escala.ano
+        mes_nome = self.meses[mes]
         
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#1a237e'),
-            spaceAfter=12,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Salvar PDF", 
+            f"Escala_Hospital_{mes_nome}_{ano}.pdf",
+            "PDF Files (*.pdf)"
         )
         
-        title = Paragraph(f"Escala de Plantão - {mes_nome}/{ano}", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 10*mm))
+        if not filename:
+            return
         
-        table_data = [['Data', 'Dia da Semana', 'Noite', 'Tarde', 'Manhã']]
+        escalas = [self.area.escala(unidade).copiar() for unidade in self.area.unidades]
+        self.exportacoes.adicionar(ExportacaoWorker('pdf_combinado', escalas, filename),
+                                   f"PDF {mes_nome}/{ano} (todas as unidades)")
+    
+    def exportar_agendas(self):
+        if self.model.rowCount() == 0:
+            QMessageBox.warning(self, "Aviso", "Gere uma tabela primeiro!")
+            return
         
-        for row in range(self.table.rowCount()):
-            row_data = []
-            for col in range(5):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else '')
-            table_data.append(row_data)
-        
-        table = Table(table_data, colWidths=[35*mm, 40*mm, 60*mm, 60*mm, 60*mm])
-        
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#5c6bc0')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-            ('TOPPADDING', (0, 1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-        ])
-        
-        for row in range(1, len(table_data)):
-            dia_semana = table_data[row][1]
-            date_text = table_data[row][0]
-            if dia_semana in ['Sexta', 'Sábado', 'Domingo'] or date_text in self.custom_holidays:
-                style.add('BACKGROUND', (0, row), (-1, row), colors.HexColor('#8AB4F8'))
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        doc.build(elements)
-        
-        QMessageBox.information(self, "Sucesso", f"PDF exportado com sucesso!\n{filename}")
+        pasta = QFileDialog.getExistingDirectory(self, "Pasta das Agendas")
+        if not pasta:
+            return
+        
+        reply = QMessageBox.question(self, 'Agendas dos Médicos',
+                                    'Gravar também um CSV por médico?',
+                                    QMessageBox.StandardButton.Yes |
+                                    QMessageBox.StandardButton.No)
+        incluir_csv = reply == QMessageBox.StandardButton.Yes
+        
+        escalas = [(unidade, self.area.escala(unidade)) for unidade in self.area.unidades]
+        try:
+            arquivos = gerar_agendas(escalas, pasta, incluir_csv)
+        except OSError as e:
+            QMessageBox.warning(self, "Erro", f"Falha ao gravar as agendas:\n{e}")
+            return
+        medicos = sum(1 for arquivo in arquivos if arquivo.suffix == '.ics')
+        self.statusBar().showMessage(
+            f"Agendas de {medicos} médico(s) gravadas em {pasta}", 10000)
     
     def exportar_png(self):
-        if self.table.rowCount() == 0:
+        if self.model.rowCount() == 0:
             QMessageBox.warning(self, "Aviso", "Gere uma tabela primeiro!")
             return
         
-        mes = self.mes_combo.currentData()
-        ano = self.ano_spin.value()
+        if not self.confirmar_conflitos("exportar"):
+            return
+        
+        mes = self.escala.mes
+        ano = self.escala.ano
         mes_nome = self.meses[mes]
         
         filename, _ = QFileDialog.getSaveFileName(
             self, "Salvar PNG", 
-            f"Escala_{mes_nome}_{ano}.png",
+            f"Escala_{self.prefixo_unidade()}{mes_nome}_{ano}.png",
             "PNG Files (*.png)"
         )
         
         if not filename:
             return
         
-        row_height = 35
-        header_height = 50
-        title_height = 60
-        margin = 30
-        
-        col_widths = [120, 140, 220, 220, 220]
-        width = sum(col_widths) + 2 * margin
-        height = title_height + header_height + (self.table.rowCount() * row_height) + 2 * margin
-        
-        img = Image.new('RGB', (width, height), color='white')
-        draw = ImageDraw.Draw(img)
-        
-        try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-            header_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)
-            cell_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
-        except:
-            title_font = ImageFont.load_default()
-            header_font = ImageFont.load_default()
-            cell_font = ImageFont.load_default()
-        
-        title_text = f"Escala de Plantão - {mes_nome}/{ano}"
-        title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        draw.text(((width - title_width) // 2, margin), title_text, 
-                 fill='#1a237e', font=title_font)
-        
-        headers = ['Data', 'Dia da Semana', 'Noite', 'Tarde', 'Manhã']
-        y = margin + title_height
-        x = margin
-        
-        for i, header in enumerate(headers):
-            draw.rectangle([x, y, x + col_widths[i], y + header_height], 
-                          fill='#5c6bc0', outline='#4a5a9f', width=2)
-            
-            text_bbox = draw.textbbox((0, 0), header, font=header_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            text_x = x + (col_widths[i] - text_width) // 2
-            text_y = y + (header_height - text_height) // 2
-            draw.text((text_x, text_y), header, fill='white', font=header_font)
-            
-            x += col_widths[i]
-        
-        y += header_height
-        
-        for row in range(self.table.rowCount()):
-            x = margin
-            
-            dia_semana = self.table.item(row, 1).text() if self.table.item(row, 1) else ''
-            date_text = self.table.item(row, 0).text() if self.table.item(row, 0) else ''
-            is_weekend = dia_semana in ['Sexta', 'Sábado', 'Domingo'] or date_text in self.custom_holidays
-            bg_color = '#8AB4F8' if is_weekend else ('#f5f5f5' if row % 2 == 0 else 'white')
-            
-            for col in range(5):
-                item = self.table.item(row, col)
-                text = item.text() if item else ''
-                
-                draw.rectangle([x, y, x + col_widths[col], y + row_height], 
-                              fill=bg_color, outline='#d0d0d0', width=1)
-                
-                if text:
-                    text_bbox = draw.textbbox((0, 0), text, font=cell_font)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_height = text_bbox[3] - text_bbox[1]
-                    
-                    text_x = x + (col_widths[col] - text_width) // 2
-                    text_y = y + (row_height - text_height) // 2
-                    draw.text((text_x, text_y), text, fill='black', font=cell_font)
-                
-                x += col_widths[col]
-            
-            y += row_height
-        
-        img.save(filename, 'PNG')
-        
-        QMessageBox.information(self, "Sucesso", f"PNG exportado com sucesso!\n{filename}")
+        self.exportacoes.adicionar(ExportacaoWorker('png', self.escala.copiar(), filename),
+                                   f"PNG {mes_nome}/{ano}{self.sufixo_unidade()}")
+
+
+def precarregar_exportacao(relatorio):
+    inicio = time.perf_counter()
+    with medir("precarregar_exportacao"):
+        import exportacao  # noqa: F401
+    relatorio.imprimir(f"backends de exportação pré-carregados em "
+                       f"{(time.perf_counter() - inicio) * 1000:.1f} ms (segundo plano)")
 
 
 def main():
+    iniciar_perfil()
+    relatorio = RelatorioInicializacao(INICIO_PROCESSO, FIM_IMPORTS)
     app = QApplication(sys.argv)
     
     app.setStyle('Fusion')
+    relatorio.marcar("QApplication")
     
     window = PlantaoApp()
+    relatorio.marcar("janela criada")
     window.show()
     
+    def primeira_pintura():
+        relatorio.marcar("primeira pintura")
+        relatorio.relatar()
+        if os.environ.get('PLANTAO_PRECARREGAR', '1') != '0':
+            threading.Thread(target=precarregar_exportacao, args=(relatorio,), daemon=True).start()
+    
+    QTimer.singleShot(0, primeira_pintura)
+    
     sys.exit(app.exec())
 
 
+def exportar():
+    from exportacao import executar_cli
+    sys.exit(executar_cli(sys.argv[2:]))
+
+
+def migrar():
+    sys.exit(armazenamento.executar_cli(sys.argv[2:]))
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'exportar':
+        exportar()
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrar':
+        migrar()
     main()
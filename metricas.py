@@ -0,0 +1,177 @@
+"""Medição do tempo das operações do aplicativo e contadores de trabalho.
+
+``medir(nome)`` (ou o decorador ``medido``) cronometra um trecho com
+``perf_counter`` e guarda as últimas operações em memória, com quanto os
+contadores globais (``contar``: células alteradas, arquivos lidos, bytes
+gravados) andaram durante ela. O custo é de poucos microssegundos por
+operação, então fica sempre ligado; o painel de diagnóstico da janela
+(Ctrl+Shift+D) mostra as operações recentes.
+
+Variáveis de ambiente:
+
+- ``PLANTAO_METRICAS=1``: imprime cada operação no terminal;
+- ``PLANTAO_TRACE=arquivo.json``: grava ao sair todas as operações no
+  formato de trace do Chrome (abre em chrome://tracing ou no Perfetto);
+- ``PLANTAO_PERFIL=arquivo.prof``: roda o aplicativo sob cProfile
+  (veja com ``python3 -m pstats arquivo.prof``);
+- ``PLANTAO_STARTUP=1``: tempos da inicialização (``RelatorioInicializacao``).
+
+Os contadores são globais: com operações simultâneas em threads
+diferentes, os valores de cada uma são aproximados.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+OPERACOES_RECENTES = 500
+IMPRIMIR = os.environ.get('PLANTAO_METRICAS') == '1'
+ARQUIVO_TRACE = os.environ.get('PLANTAO_TRACE', '')
+ARQUIVO_PERFIL = os.environ.get('PLANTAO_PERFIL', '')
+
+
+class Metricas:
+    """Operações recentes (nome, início, duração, contadores) e totais por nome."""
+
+    def __init__(self, limite=OPERACOES_RECENTES, imprimir=False, trace=False):
+        self.recentes = deque(maxlen=limite)
+        self.trace = [] if trace else None
+        self.contadores = {}
+        self.totais = {}
+        self.trava = threading.Lock()
+        self.imprimir = imprimir
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def registrar(self, nome, inicio, duracao, contadores=None):
+        operacao = (nome, inicio, duracao, contadores or {}, threading.get_ident())
+        with self.trava:
+            self.recentes.append(operacao)
+            if self.trace is not None:
+                self.trace.append(operacao)
+            total = self.totais.get(nome)
+            if total is None:
+                self.totais[nome] = [1, duracao, duracao]
+            else:
+                total[0] += 1
+                total[1] += duracao
+                total[2] = max(total[2], duracao)
+        if self.imprimir:
+            extras = "".join(f" {chave}={valor}" for chave, valor in (contadores or {}).items())
+            print(f"[métricas] {nome}: {duracao * 1000:.1f} ms{extras}", file=sys.stderr)
+
+    @contextmanager
+    def medir(self, nome):
+        antes = dict(self.contadores)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            contadores = {chave: valor - antes.get(chave, 0)
+                          for chave, valor in dict(self.contadores).items()
+                          if valor != antes.get(chave, 0)}
+            self.registrar(nome, inicio, duracao, contadores)
+
+    def medido(self, nome):
+        def decorador(funcao):
+            @wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.medir(nome):
+                    return funcao(*args, **kwargs)
+            return medida
+        return decorador
+
+    def limpar(self):
+        with self.trava:
+            self.recentes.clear()
+            self.totais.clear()
+
+    def operacoes(self):
+        """Operações recentes, da mais nova para a mais antiga."""
+        with self.trava:
+            return list(reversed(self.recentes))
+
+    def resumo(self):
+        """(nome, quantidade, média, máximo) em segundos, por tempo total decrescente."""
+        with self.trava:
+            linhas = [(nome, n, soma / n, maximo) for nome, (n, soma, maximo) in self.totais.items()]
+        linhas.sort(key=lambda linha: linha[1] * linha[2], reverse=True)
+        return linhas
+
+    def eventos_trace(self, operacoes=None):
+        """Operações no formato de eventos completos ("ph": "X") do trace do Chrome."""
+        if operacoes is None:
+            operacoes = self.trace if self.trace is not None else list(self.recentes)
+        pid = os.getpid()
+        return {'traceEvents': [
+            {'name': nome, 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': round(inicio * 1e6), 'dur': round(duracao * 1e6),
+             'args': contadores}
+            for nome, inicio, duracao, contadores, tid in operacoes
+        ], 'displayTimeUnit': 'ms'}
+
+    def salvar_trace(self, caminho):
+        with self.trava:
+            operacoes = list(self.trace if self.trace is not None else self.recentes)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.eventos_trace(operacoes), f, ensure_ascii=False)
+
+
+METRICAS = Metricas(imprimir=IMPRIMIR, trace=bool(ARQUIVO_TRACE))
+contar = METRICAS.contar
+medir = METRICAS.medir
+medido = METRICAS.medido
+
+if ARQUIVO_TRACE:
+    atexit.register(METRICAS.salvar_trace, ARQUIVO_TRACE)
+
+
+def iniciar_perfil():
+    """Liga o cProfile se ``PLANTAO_PERFIL`` estiver definido; grava o perfil ao sair."""
+    if not ARQUIVO_PERFIL:
+        return None
+    import cProfile
+    perfil = cProfile.Profile()
+    perfil.enable()
+
+    def gravar():
+        perfil.disable()
+        perfil.dump_stats(ARQUIVO_PERFIL)
+    atexit.register(gravar)
+    return perfil
+
+
+class RelatorioInicializacao:
+    """Marcos da inicialização, medidos a partir do início do processo.
+
+    Cada intervalo entre marcos também é registrado nas métricas; com
+    ``PLANTAO_STARTUP=1`` o relatório é impresso no terminal.
+    """
+
+    def __init__(self, inicio_processo, fim_imports):
+        self.ativo = os.environ.get('PLANTAO_STARTUP') == '1'
+        self.inicio = inicio_processo
+        self.marcos = [("imports", fim_imports)]
+
+    def marcar(self, nome):
+        self.marcos.append((nome, time.perf_counter()))
+
+    def imprimir(self, linha):
+        if self.ativo:
+            print(f"[inicialização] {linha}", file=sys.stderr)
+
+    def relatar(self):
+        anterior = self.inicio
+        for nome, instante in self.marcos:
+            METRICAS.registrar(f"inicialização: {nome}", anterior, instante - anterior)
+            self.imprimir(f"{nome}: +{(instante - anterior) * 1000:.1f} ms "
+                          f"({(instante - self.inicio) * 1000:.1f} ms desde o início)")
+            anterior = instante
@@ -0,0 +1,246 @@
+import json
+from array import array
+from calendar import monthrange
+from datetime import date
+
+from feriados import tipos_do_mes
+from metricas import contar
+
+
+MESES = {
+    1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril",
+    5: "Maio", 6: "Junho", 7: "Julho", 8: "Agosto",
+    9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"
+}
+
+DIAS_SEMANA = {
+    0: "Segunda", 1: "Terça", 2: "Quarta", 3: "Quinta",
+    4: "Sexta", 5: "Sábado", 6: "Domingo"
+}
+
+TURNOS = ('noite', 'tarde', 'manha')
+CABECALHOS = ['Data', 'Dia da Semana', 'Noite', 'Tarde', 'Manhã']
+COLUNAS_FIXAS = 2
+
+
+class TabelaNomes:
+    """Internação dos nomes de médicos: cada nome distinto vira um id inteiro.
+
+    O id 0 é reservado para a célula vazia.
+    """
+
+    __slots__ = ('nomes', 'ids')
+
+    def __init__(self):
+        self.nomes = ['']
+        self.ids = {'': 0}
+
+    def id(self, nome):
+        nome = nome.strip()
+        id_medico = self.ids.get(nome)
+        if id_medico is None:
+            id_medico = len(self.nomes)
+            self.nomes.append(nome)
+            self.ids[nome] = id_medico
+        return id_medico
+
+    def nome(self, id_medico):
+        return self.nomes[id_medico]
+
+
+class Escala:
+    """Escala de um mês: ``num_dias`` linhas x 3 turnos de ids de médicos.
+
+    É a fonte da verdade da tabela; interface, salvamento e exportações leem
+    e escrevem aqui, sem depender de widgets. ``destaques`` guarda o tipo de
+    cada dia (ver ``feriados.tipos_do_mes``): diferente de zero é fim de
+    semana ou feriado. ``feriados`` são as datas marcadas à mão.
+    """
+
+    __slots__ = ('mes', 'ano', 'unidade', 'feriados', 'nomes', 'num_dias', 'dias_semana',
+                 'datas', 'destaques', 'celulas')
+
+    def __init__(self, mes, ano, feriados=None, nomes=None, unidade=None):
+        self.mes = mes
+        self.ano = ano
+        self.unidade = unidade
+        self.feriados = feriados if feriados is not None else set()
+        self.nomes = nomes if nomes is not None else TabelaNomes()
+        self.num_dias = monthrange(ano, mes)[1]
+        primeiro = date(ano, mes, 1).weekday()
+        self.dias_semana = array('B', [(primeiro + i) % 7 for i in range(self.num_dias)])
+        self.datas = tuple(f"{dia:02d}/{mes:02d}/{ano}" for dia in range(1, self.num_dias + 1))
+        self.destaques = None
+        self.celulas = array('I', [0]) * (self.num_dias * len(TURNOS))
+        self.recalcular_destaques()
+
+    def copiar(self):
+        """Cópia independente (instantâneo) da escala, p.ex. para exportar em outra thread."""
+        nomes = TabelaNomes()
+        nomes.nomes = list(self.nomes.nomes)
+        nomes.ids = dict(self.nomes.ids)
+        copia = Escala(self.mes, self.ano, set(self.feriados), nomes, self.unidade)
+        copia.celulas = array('I', self.celulas)
+        copia.destaques = bytearray(self.destaques)
+        return copia
+
+    def recalcular_destaques(self):
+        self.destaques = tipos_do_mes(self.ano, self.mes, self.feriados)
+
+    def alternar_feriado(self, row):
+        date_text = self.datas[row]
+        if date_text in self.feriados:
+            self.feriados.discard(date_text)
+        else:
+            self.feriados.add(date_text)
+        self.recalcular_destaques()
+
+    def data_texto(self, row):
+        return self.datas[row]
+
+    def dia_semana_texto(self, row):
+        return DIAS_SEMANA[self.dias_semana[row]]
+
+    def eh_destaque(self, row):
+        return self.destaques[row]
+
+    def medico(self, row, turno):
+        return self.nomes.nomes[self.celulas[row * len(TURNOS) + turno]]
+
+    def definir(self, row, turno, nome):
+        id_medico = self.nomes.id(nome)
+        pos = row * len(TURNOS) + turno
+        if self.celulas[pos] == id_medico:
+            return False
+        self.celulas[pos] = id_medico
+        return True
+
+    def texto(self, row, col):
+        if col == 0:
+            return self.data_texto(row)
+        if col == 1:
+            return self.dia_semana_texto(row)
+        return self.medico(row, col - COLUNAS_FIXAS)
+
+    def linha(self, row):
+        base = row * len(TURNOS)
+        nomes = self.nomes.nomes
+        return [self.data_texto(row), self.dia_semana_texto(row)] + [
+            nomes[self.celulas[base + t]] for t in range(len(TURNOS))]
+
+    def linhas(self):
+        return [self.linha(row) for row in range(self.num_dias)]
+
+    def linhas_diferentes(self, outra):
+        if (outra.mes, outra.ano) != (self.mes, self.ano):
+            return list(range(min(self.num_dias, outra.num_dias)))
+        diferentes = []
+        for row in range(self.num_dias):
+            if self.destaques[row] != outra.destaques[row] or self.linha(row) != outra.linha(row):
+                diferentes.append(row)
+        return diferentes
+
+    def para_dict(self, ids=None):
+        """Formato JSON da escala.
+
+        Com ``ids`` (nome -> id do cadastro de médicos), os médicos cadastrados
+        são gravados pelo id e a tabela ``medicos`` guarda o nome de cada id
+        usado; nomes fora do cadastro continuam gravados como texto.
+        """
+        linhas = [
+            dict(zip(('data', 'dia_semana') + TURNOS, self.linha(row)))
+            for row in range(self.num_dias)
+        ]
+        dados = {
+            'mes': self.mes,
+            'ano': self.ano,
+            'feriados': list(self.feriados),
+        }
+        if self.unidade:
+            dados['unidade'] = self.unidade
+        if ids:
+            medicos = {}
+            for linha in linhas:
+                for chave in TURNOS:
+                    id_cadastro = ids.get(linha[chave])
+                    if id_cadastro is not None:
+                        medicos[str(id_cadastro)] = linha[chave]
+                        linha[chave] = id_cadastro
+            dados['medicos'] = medicos
+        dados['escalas'] = linhas
+        return dados
+
+    @classmethod
+    def de_dict(cls, dados, nomes=None):
+        escala = cls(dados['mes'], dados['ano'], set(dados.get('feriados', [])), nomes,
+                     dados.get('unidade'))
+        medicos = dados.get('medicos', {})
+        for row, linha in enumerate(dados.get('escalas', [])[:escala.num_dias]):
+            for turno, chave in enumerate(TURNOS):
+                nome = linha.get(chave, '')
+                if isinstance(nome, int):
+                    nome = medicos.get(str(nome), '')
+                if nome:
+                    escala.definir(row, turno, nome)
+        return escala
+
+
+def meses_do_periodo(mes, ano, quantidade):
+    meses = []
+    for _ in range(quantidade):
+        meses.append((ano, mes))
+        mes += 1
+        if mes > 12:
+            mes = 1
+            ano += 1
+    return meses
+
+
+class Periodo:
+    """Sequência contínua de dias cobrindo vários meses (trimestre, ano...).
+
+    As escalas de cada mês só são obtidas (via ``carregar(ano, mes)``) quando
+    algum dia daquele mês é consultado; meses sem escala salva usam uma
+    escala vazia, que ainda respeita fins de semana e feriados.
+    """
+
+    __slots__ = ('inicio', 'num_dias', 'meses', 'carregar', 'escalas')
+
+    def __init__(self, mes, ano, quantidade, carregar=None):
+        self.meses = meses_do_periodo(mes, ano, quantidade)
+        ultimo_ano, ultimo_mes = self.meses[-1]
+        fim = date(ultimo_ano, ultimo_mes, monthrange(ultimo_ano, ultimo_mes)[1])
+        self.inicio = date(ano, mes, 1).toordinal()
+        self.num_dias = fim.toordinal() - self.inicio + 1
+        self.carregar = carregar
+        self.escalas = {}
+
+    def data(self, row):
+        return date.fromordinal(self.inicio + row)
+
+    def escala(self, ano, mes):
+        escala = self.escalas.get((ano, mes))
+        if escala is None:
+            escala = self.carregar(ano, mes) if self.carregar else None
+            if escala is None:
+                escala = Escala(mes, ano)
+            self.escalas[(ano, mes)] = escala
+        return escala
+
+    def localizar(self, row):
+        data_obj = self.data(row)
+        return self.escala(data_obj.year, data_obj.month), data_obj.day - 1
+
+    def linha_da_data(self, data_obj):
+        row = data_obj.toordinal() - self.inicio
+        return row if 0 <= row < self.num_dias else -1
+
+
+def ler_escala(caminho, nomes=None):
+    """Lê uma escala salva em JSON ou no formato binário (``armazenamento``)."""
+    from armazenamento import eh_binario, ler_binario  # importa modelo
+    contar('arquivos_lidos')
+    if eh_binario(caminho):
+        return ler_binario(caminho, nomes)
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return Escala.de_dict(json.load(f), nomes)
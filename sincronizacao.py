@@ -0,0 +1,386 @@
+"""Sincronização da escala entre estações por um servidor HTTP pequeno.
+
+O servidor guarda, para cada escala (unidade + mês), o médico de cada
+célula com um vetor de versão ``{usuario: contador}`` e um número de
+sequência. As estações enviam só as células alteradas, com o vetor da
+versão que conheciam: se o vetor guardado no servidor não estiver contido
+nele, a alteração foi concorrente e é recusada (a estação recebe o valor do
+servidor). Cada estação consulta periodicamente as células com sequência
+maior que a última vista. Células em edição ficam travadas para os demais
+usuários por ``TEMPO_TRAVA`` segundos.
+
+O estado fica em memória; cada estação continua salvando as escalas em
+``escalas/`` normalmente. Para executar o servidor::
+
+    python3 sincronizacao.py --host 0.0.0.0 --porta 8765
+"""
+import argparse
+import getpass
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from unidades import slug_unidade
+
+
+# Endereço do servidor (p.ex. http://192.168.0.10:8765); vazio desativa a sincronização.
+URL_SINCRONIZACAO = os.environ.get('PLANTAO_SYNC', '')
+USUARIO_SINCRONIZACAO = os.environ.get('PLANTAO_USUARIO') or getpass.getuser()
+PORTA_PADRAO = 8765
+TEMPO_TRAVA = 60
+INTERVALO_CONSULTA = 1.0
+INTERVALO_MAXIMO = 30.0
+TEMPO_LIMITE = 3
+DOCUMENTO_VALIDO = re.compile(r'^[a-z0-9-]+$')
+
+
+def documento(unidade, ano, mes):
+    return f"{slug_unidade(unidade) or 'unidade'}-{ano}-{mes:02d}"
+
+
+def contido(a, b):
+    """Verdadeiro se o vetor de versão ``a`` é anterior ou igual a ``b``."""
+    return all(b.get(usuario, 0) >= contador for usuario, contador in a.items())
+
+
+class DocumentoSincronizado:
+    """Estado de uma escala no servidor."""
+
+    def __init__(self):
+        self.seq = 0
+        self.celulas = {}  # pos -> (nome, vetor, seq)
+        self.travas = {}   # pos -> (usuario, expira)
+
+    def _dono_trava(self, pos, agora):
+        trava = self.travas.get(pos)
+        if trava is None:
+            return None
+        if trava[1] < agora:
+            del self.travas[pos]
+            return None
+        return trava[0]
+
+    def alteracoes_desde(self, seq):
+        return [[pos, nome, vetor] for pos, (nome, vetor, s) in self.celulas.items() if s > seq]
+
+    def travas_ativas(self, agora):
+        for pos in list(self.travas):
+            self._dono_trava(pos, agora)
+        return {pos: dono for pos, (dono, _) in self.travas.items()}
+
+    def aplicar(self, usuario, celulas, agora):
+        """Aplica [pos, nome, vetor]; devolve as recusadas com o valor atual do servidor."""
+        recusadas = []
+        for pos, nome, vetor in celulas:
+            atual = self.celulas.get(pos)
+            dono = self._dono_trava(pos, agora)
+            if (dono is not None and dono != usuario) or (
+                    atual is not None and not contido(atual[1], vetor)):
+                if atual is not None:
+                    recusadas.append([pos, atual[0], atual[1]])
+                else:
+                    recusadas.append([pos, '', {}])
+                continue
+            self.seq += 1
+            self.celulas[pos] = (nome, vetor, self.seq)
+        return recusadas
+
+    def travar(self, usuario, pos, travar, agora):
+        """Trava (ou libera) a célula para ``usuario``; devolve o dono atual da trava."""
+        dono = self._dono_trava(pos, agora)
+        if dono is not None and dono != usuario:
+            return dono
+        if travar:
+            self.travas[pos] = (usuario, agora + TEMPO_TRAVA)
+            return usuario
+        self.travas.pop(pos, None)
+        return None
+
+
+class ManipuladorSincronizacao(BaseHTTPRequestHandler):
+    """GET /doc/<id>?desde=N, POST /doc/<id>/celulas e POST /doc/<id>/travas."""
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _rota(self):
+        url = urlsplit(self.path)
+        partes = url.path.strip('/').split('/')
+        if len(partes) < 2 or partes[0] != 'doc' or not DOCUMENTO_VALIDO.match(partes[1]):
+            return None, None, None
+        return partes[1], '/'.join(partes[2:]), parse_qs(url.query)
+
+    def do_GET(self):
+        nome, acao, parametros = self._rota()
+        if nome is None or acao:
+            self._responder(404, {'erro': 'rota desconhecida'})
+            return
+        try:
+            desde = int(parametros.get('desde', ['0'])[0])
+        except ValueError:
+            self._responder(400, {'erro': 'desde inválido'})
+            return
+        with self.server.trava:
+            doc = self.server.documento(nome)
+            self._responder(200, {'seq': doc.seq, 'celulas': doc.alteracoes_desde(desde),
+                                  'travas': doc.travas_ativas(time.monotonic())})
+
+    def do_POST(self):
+        nome, acao, _ = self._rota()
+        if nome is None or acao not in ('celulas', 'travas'):
+            self._responder(404, {'erro': 'rota desconhecida'})
+            return
+        try:
+            dados = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            usuario = str(dados['usuario'])
+            if acao == 'celulas':
+                celulas = [(int(pos), str(nome_medico), {str(k): int(v) for k, v in vetor.items()})
+                           for pos, nome_medico, vetor in dados['celulas']]
+            else:
+                pos, travar = int(dados['pos']), bool(dados['travar'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._responder(400, {'erro': 'requisição inválida'})
+            return
+        agora = time.monotonic()
+        with self.server.trava:
+            doc = self.server.documento(nome)
+            if acao == 'celulas':
+                recusadas = doc.aplicar(usuario, celulas, agora)
+                self._responder(200, {'seq': doc.seq, 'recusadas': recusadas})
+            else:
+                self._responder(200, {'dono': doc.travar(usuario, pos, travar, agora)})
+
+
+class ServidorSincronizacao(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, verboso=False):
+        super().__init__(endereco, ManipuladorSincronizacao)
+        self.verboso = verboso
+        self.trava = threading.Lock()
+        self.documentos = {}
+
+    def documento(self, nome):
+        doc = self.documentos.get(nome)
+        if doc is None:
+            doc = self.documentos[nome] = DocumentoSincronizado()
+        return doc
+
+
+class ClienteSincronizacao:
+    """Lado da estação: vetores de versão das células e última sequência vista.
+
+    Não é seguro para várias threads; na estação, só a thread da
+    ``SessaoSincronizacao`` o usa.
+    """
+
+    def __init__(self, url, usuario, nome_documento, tempo_limite=TEMPO_LIMITE):
+        self.base = f"{url.rstrip('/')}/doc/{nome_documento}"
+        self.usuario = usuario
+        self.tempo_limite = tempo_limite
+        self.vetores = {}
+        self.seq = 0
+
+    def _pedir(self, caminho, dados=None):
+        corpo = None if dados is None else json.dumps(dados).encode('utf-8')
+        pedido = urllib.request.Request(self.base + caminho, data=corpo,
+                                        headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(pedido, timeout=self.tempo_limite) as resposta:
+            return json.loads(resposta.read())
+
+    def _receber(self, celulas):
+        """Atualiza os vetores; devolve (pos, nome) só das células que mudaram para nós."""
+        novas = []
+        for pos, nome, vetor in celulas:
+            if self.vetores.get(pos) != vetor:
+                self.vetores[pos] = vetor
+                novas.append((pos, nome))
+        return novas
+
+    def consultar(self):
+        """Células alteradas desde a última consulta e as travas de outros usuários."""
+        resposta = self._pedir(f"?desde={self.seq}")
+        self.seq = resposta['seq']
+        travas = {int(pos): dono for pos, dono in resposta['travas'].items()
+                  if dono != self.usuario}
+        return self._receber(resposta['celulas']), travas
+
+    def enviar(self, alteracoes):
+        """Envia [(pos, nome)]; devolve as recusadas com o valor do servidor, como (pos, nome)."""
+        celulas = []
+        for pos, nome in alteracoes:
+            vetor = dict(self.vetores.get(pos, {}))
+            vetor[self.usuario] = vetor.get(self.usuario, 0) + 1
+            self.vetores[pos] = vetor
+            celulas.append([pos, nome, vetor])
+        if not celulas:
+            return []
+        resposta = self._pedir("/celulas", {'usuario': self.usuario, 'celulas': celulas})
+        recusadas = []
+        for pos, nome, vetor in resposta['recusadas']:
+            self.vetores[pos] = vetor
+            recusadas.append((pos, nome))
+        return recusadas
+
+    def travar(self, pos, travar=True):
+        """Pede a trava da célula; devolve o dono atual (``None`` se ficou livre)."""
+        return self._pedir("/travas", {'usuario': self.usuario, 'pos': pos,
+                                       'travar': travar})['dono']
+
+
+class SessaoSincronizacao:
+    """Thread que entra na escala do servidor, envia as alterações locais e consulta as remotas.
+
+    Toda a comunicação acontece na thread da sessão: ``enviar`` e ``travar``
+    só enfileiram. Ao entrar, se o servidor ainda não conhece a escala (ou
+    com ``publicar``), as células ``locais`` (nome por posição) são enviadas;
+    senão vale o que está no servidor.
+
+    Da thread da sessão são chamados ``ao_receber(celulas, travas, erro,
+    inicial)``, com as células a aplicar na tabela (remotas e recusadas,
+    como (pos, nome); ``inicial`` na primeira resposta após entrar), e
+    ``ao_travar(pos, dono)`` com o resultado de cada pedido de trava. Depois
+    de uma falha de conexão a sessão fica ``offline``, tentando de novo em
+    intervalos crescentes (até ``INTERVALO_MAXIMO``), e descarta os pedidos
+    de trava até o servidor voltar a responder.
+    """
+
+    def __init__(self, cliente, ao_receber, locais=(), publicar=False, ao_travar=None,
+                 intervalo=INTERVALO_CONSULTA):
+        self.cliente = cliente
+        self.ao_receber = ao_receber
+        self.ao_travar = ao_travar
+        self.locais = list(locais)
+        self.publicar = publicar
+        self.intervalo = intervalo
+        self.offline = False
+        self.fila = queue.Queue()
+        self.parar_evento = threading.Event()
+        self.thread = threading.Thread(target=self._executar, daemon=True)
+
+    def iniciar(self):
+        self.thread.start()
+
+    def enviar(self, alteracoes):
+        self.fila.put(list(alteracoes))
+
+    def travar(self, pos, travar=True):
+        self.fila.put((pos, travar))
+
+    def parar(self):
+        self.parar_evento.set()
+        self.fila.put(None)
+
+    def _pendentes(self, pendentes, travas, espera):
+        """Junta o que chegou na fila: alterações em ``pendentes``, pedidos de trava em ``travas``."""
+        try:
+            item = self.fila.get(timeout=espera)
+        except queue.Empty:
+            return
+        while item is not None:
+            if isinstance(item, tuple):
+                travas.append(item)
+            else:
+                pendentes.extend(item)
+            try:
+                item = self.fila.get_nowait()
+            except queue.Empty:
+                break
+
+    def _entrar(self):
+        self.cliente.seq = 0
+        self.cliente.vetores.clear()
+        remotas, travas = self.cliente.consultar()
+        servidor = dict(remotas)
+        if self.publicar or self.cliente.seq == 0:
+            celulas = self.cliente.enviar([(pos, nome) for pos, nome in enumerate(self.locais)
+                                           if nome != servidor.get(pos, '')])
+        else:
+            celulas = [(pos, servidor.get(pos, '')) for pos in range(len(self.locais))]
+        return celulas, travas
+
+    def _executar(self):
+        pendentes = []
+        pedidos_trava = []
+        travas_anteriores = None
+        entrou = False
+        espera = 0
+        while not self.parar_evento.is_set():
+            if self.offline:
+                # Sem servidor, as alterações só se acumulam até a próxima tentativa.
+                self.parar_evento.wait(espera)
+                self._pendentes(pendentes, pedidos_trava, 0)
+            else:
+                self._pendentes(pendentes, pedidos_trava, espera)
+            if self.parar_evento.is_set():
+                break
+            try:
+                if not entrou:
+                    celulas, travas = self._entrar()
+                    entrou = True
+                    travas_anteriores = travas
+                    self.offline = False
+                    self.ao_receber(celulas, travas, None, True)
+                while pedidos_trava:
+                    pos, travar = pedidos_trava[0]
+                    dono = self.cliente.travar(pos, travar)
+                    pedidos_trava.pop(0)
+                    if travar and self.ao_travar is not None:
+                        self.ao_travar(pos, dono)
+                recusadas = self.cliente.enviar(pendentes)
+                pendentes = []
+                remotas, travas = self.cliente.consultar()
+            except (OSError, ValueError, KeyError) as e:
+                self.offline = True
+                pedidos_trava = [pedido for pedido in pedidos_trava if not pedido[1]]
+                espera = min(max(espera * 2, self.intervalo), INTERVALO_MAXIMO)
+                self.ao_receber([], None, str(e), False)
+                continue
+            self.offline = False
+            espera = self.intervalo
+            if travas == travas_anteriores:
+                travas = None
+            else:
+                travas_anteriores = travas
+            if remotas or recusadas or travas is not None:
+                self.ao_receber(remotas + recusadas, travas, None, False)
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Servidor de sincronização das escalas entre estações.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="endereço de escuta (padrão: 127.0.0.1; 0.0.0.0 para a rede)")
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('-v', '--verboso', action='store_true', help="registra cada requisição")
+    args = parser.parse_args(argv)
+
+    servidor = ServidorSincronizacao((args.host, args.porta), args.verboso)
+    print(f"sincronização em http://{args.host}:{servidor.server_address[1]} (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())
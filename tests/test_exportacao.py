@@ -0,0 +1,56 @@
+"""Testes da exportação; executar a partir da raiz do repositório:
+
+    python3 -m unittest discover tests
+"""
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from exportacao import gerar_pdf, gerar_pdf_combinado
+from modelo import Escala, TURNOS
+
+
+def escala_sintetica(mes, nome):
+    escala = Escala(mes, 2025, unidade="UTI")
+    for row in range(escala.num_dias):
+        for turno in range(len(TURNOS)):
+            escala.definir(row, turno, nome(row * len(TURNOS) + turno))
+    return escala
+
+
+def paginas_pdf(caminho):
+    return len(re.findall(rb"/Type /Page\b(?!s)", Path(caminho).read_bytes()))
+
+
+class TestPdfCombinado(unittest.TestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        nomes = (lambda i: f"Dr(a). Médico {i % 40}",
+                 lambda i: f"Dr(a). Maria Aparecida dos Santos Albuquerque Cavalcanti {i % 40}")
+        self.escalas = [escala_sintetica(mes, nomes[mes % 2]) for mes in range(1, 6)]
+
+    def test_paginas_de_todas_as_escalas(self):
+        esperado = 0
+        for i, escala in enumerate(self.escalas):
+            caminho = Path(self.pasta.name) / f"escala_{i}.pdf"
+            gerar_pdf(escala, str(caminho))
+            esperado += paginas_pdf(caminho)
+        self.assertGreater(esperado, len(self.escalas))
+
+        combinado = Path(self.pasta.name) / "combinado.pdf"
+        gerar_pdf_combinado(iter(self.escalas), str(combinado), total=len(self.escalas))
+        self.assertEqual(paginas_pdf(combinado), esperado)
+
+    def test_sem_escalas(self):
+        combinado = Path(self.pasta.name) / "vazio.pdf"
+        gerar_pdf_combinado([], str(combinado))
+        self.assertTrue(combinado.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
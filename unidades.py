@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+
+from conflitos import VerificadorConflitos, NOITE
+from diario import gravar_json_atomico
+from historico import ESCALAS_DIR, HistoryIndex
+from modelo import TURNOS, Escala, TabelaNomes, ler_escala
+
+
+UNIDADE_PADRAO = "Geral"
+PASTA_UNIDADES = "unidades"
+REGISTRO_UNIDADES = "unidades.json"
+ESCALAS_EM_CACHE = 64
+
+# Escalas já lidas, por caminho, com o mtime do arquivo na leitura. São só
+# lidas (``AreaTrabalho.adotar`` copia as células), então podem ser
+# reaproveitadas pelas áreas de trabalho seguintes.
+_lidas = OrderedDict()
+
+
+def slug_unidade(nome):
+    texto = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-')
+
+
+def diretorio_unidade(unidade, raiz=ESCALAS_DIR):
+    """Pasta (shard) com as escalas salvas de uma unidade.
+
+    A unidade padrão continua em ``escalas/``, como antes das unidades
+    existirem; as demais ficam em ``escalas/unidades/<slug>/``, cada uma com
+    seu próprio índice de histórico e salvamento automático.
+    """
+    if unidade == UNIDADE_PADRAO:
+        return raiz
+    return raiz / PASTA_UNIDADES / slug_unidade(unidade)
+
+
+def diretorio_autosave(unidade, raiz=ESCALAS_DIR):
+    return diretorio_unidade(unidade, raiz) / "autosave"
+
+
+def listar_unidades(raiz=ESCALAS_DIR):
+    try:
+        with open(raiz / PASTA_UNIDADES / REGISTRO_UNIDADES, 'r', encoding='utf-8') as f:
+            nomes = json.load(f)
+    except (OSError, ValueError):
+        nomes = []
+    return [UNIDADE_PADRAO] + [nome for nome in nomes if nome != UNIDADE_PADRAO]
+
+
+def criar_unidade(nome, raiz=ESCALAS_DIR):
+    nome = nome.strip()
+    slug = slug_unidade(nome)
+    if not slug:
+        raise ValueError("Nome de unidade inválido")
+    unidades = listar_unidades(raiz)
+    if any(slug_unidade(existente) == slug for existente in unidades):
+        raise ValueError(f"A unidade '{nome}' já existe")
+    diretorio_unidade(nome, raiz).mkdir(parents=True, exist_ok=True)
+    gravar_json_atomico(raiz / PASTA_UNIDADES / REGISTRO_UNIDADES, unidades[1:] + [nome], indent=2)
+    return nome
+
+
+def ler_escala_em_cache(caminho):
+    """``ler_escala`` que reaproveita a leitura anterior se o arquivo não mudou."""
+    chave = str(caminho)
+    mtime = os.stat(caminho).st_mtime_ns
+    lida = _lidas.get(chave)
+    if lida is not None and lida[0] == mtime:
+        _lidas.move_to_end(chave)
+        return lida[1]
+    escala = ler_escala(caminho)
+    _lidas[chave] = (mtime, escala)
+    if len(_lidas) > ESCALAS_EM_CACHE:
+        _lidas.popitem(last=False)
+    return escala
+
+
+def abrir_indice(unidade, raiz=ESCALAS_DIR):
+    diretorio = diretorio_unidade(unidade, raiz)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return HistoryIndex(diretorio)
+
+
+class AreaTrabalho:
+    """Escalas de um mês em todas as unidades, com um cadastro único de médicos.
+
+    Todas as escalas usam a mesma ``TabelaNomes`` e o mesmo conjunto de
+    feriados, então um médico tem o mesmo id em qualquer unidade e os
+    conflitos podem ser verificados entre unidades. A escala de cada unidade
+    só é lida (a versão mais recente salva na pasta dela) quando é pedida, e
+    arquivos já lidos por outra área são reaproveitados.
+
+    O verificador de conflitos é montado uma vez, na primeira chamada de
+    ``verificador``, e depois só a unidade cuja escala é trocada é
+    reindexada.
+    """
+
+    def __init__(self, mes, ano, feriados=None, unidades=None, raiz=ESCALAS_DIR):
+        self.mes = mes
+        self.ano = ano
+        self.feriados = feriados if feriados is not None else set()
+        self.raiz = raiz
+        self.unidades = list(unidades) if unidades else listar_unidades(raiz)
+        self.nomes = TabelaNomes()
+        self.escalas = {}
+        self._verificador = None
+
+    def _nova(self, unidade):
+        return Escala(self.mes, self.ano, self.feriados, self.nomes,
+                      None if unidade == UNIDADE_PADRAO else unidade)
+
+    def _carregar(self, unidade):
+        indice = abrir_indice(unidade, self.raiz)
+        try:
+            indice.sincronizar()
+            caminho = indice.mais_recente(self.ano, self.mes)
+        finally:
+            indice.close()
+        if caminho is None:
+            return self._nova(unidade)
+        return self.adotar(unidade, ler_escala_em_cache(caminho), substituir_feriados=False)
+
+    def _guardar(self, unidade, escala):
+        self.escalas[unidade] = escala
+        if self._verificador is not None:
+            self._verificador.substituir(self.unidades.index(unidade), escala, unidade)
+
+    def escala(self, unidade):
+        escala = self.escalas.get(unidade)
+        if escala is None:
+            escala = self._carregar(unidade)
+            self._guardar(unidade, escala)
+        return escala
+
+    def nova_escala(self, unidade):
+        escala = self._nova(unidade)
+        self._guardar(unidade, escala)
+        return escala
+
+    def adotar(self, unidade, escala, substituir_feriados=True):
+        """Traz uma escala lida de fora para a área: ids e feriados compartilhados."""
+        anteriores = set(self.feriados)
+        if substituir_feriados:
+            self.feriados.clear()
+        self.feriados.update(escala.feriados)
+        adotada = self._nova(unidade)
+        nomes = escala.nomes.nomes
+        for pos, id_medico in enumerate(escala.celulas):
+            if id_medico:
+                adotada.celulas[pos] = self.nomes.id(nomes[id_medico])
+        self._guardar(unidade, adotada)
+        if self.feriados != anteriores:
+            self.recalcular_destaques()
+        return adotada
+
+    def recalcular_destaques(self):
+        for escala in self.escalas.values():
+            escala.recalcular_destaques()
+
+    def adicionar_unidade(self, unidade):
+        if unidade not in self.unidades:
+            self.unidades.append(unidade)
+            if self._verificador is not None:
+                self.escala(unidade)
+
+    def verificador(self):
+        if self._verificador is None:
+            escalas = [self.escala(u) for u in self.unidades]
+            self._verificador = VerificadorConflitos(escalas, self.unidades)
+        return self._verificador
+
+    def indisponibilidades(self, unidade):
+        """Dias (e manhãs após noites) em que cada médico já trabalha em outra unidade."""
+        indisponivel = {}
+        for outra in self.unidades:
+            if outra == unidade:
+                continue
+            escala = self.escala(outra)
+            for pos, id_medico in enumerate(escala.celulas):
+                if not id_medico:
+                    continue
+                row, turno = divmod(pos, len(TURNOS))
+                itens = indisponivel.setdefault(self.nomes.nome(id_medico), set())
+                itens.add(row + 1)
+                if turno == NOITE and row + 1 < escala.num_dias:
+                    itens.add((row + 2, 'manha'))
+        return indisponivel
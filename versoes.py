@@ -0,0 +1,187 @@
+"""Comparação entre versões salvas de uma escala (mesmo mês e unidade).
+
+Cada salvamento cria um arquivo novo. Para comparar cadeias longas, cada
+versão é lida uma única vez, numa TabelaNomes compartilhada, e reduzida a
+um hash por linha (os três turnos do dia) e um hash da versão inteira.
+Hash diferente já prova que as linhas (ou versões) diferem; hash igual é só
+um indício, confirmado comparando os ids diretamente, porque hashes de
+conteúdos diferentes podem colidir. Assim as linhas iguais custam uma
+comparação de fatias do ``array`` e só as diferentes são percorridas turno
+a turno.
+"""
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+from armazenamento import ERROS_LEITURA
+from modelo import CABECALHOS, COLUNAS_FIXAS, TURNOS, Escala, TabelaNomes, ler_escala
+from unidades import UNIDADE_PADRAO, abrir_indice
+
+
+CABECALHOS_ALTERACOES = ['Versão', 'Data', 'Turno', 'Antes', 'Depois']
+
+
+def assinaturas(escala):
+    """Hash de cada linha da escala, pelos ids (comparável só com a mesma TabelaNomes)."""
+    n = len(TURNOS)
+    celulas = escala.celulas
+    return [hash(tuple(celulas[base:base + n])) for base in range(0, len(celulas), n)]
+
+
+class Versao:
+    """Escala lida de um arquivo, com os hashes usados na comparação."""
+
+    __slots__ = ('arquivo', 'escala', 'linhas', 'hash')
+
+    def __init__(self, escala, arquivo=None):
+        self.arquivo = arquivo
+        self.escala = escala
+        self.linhas = assinaturas(escala)
+        self.hash = hash(tuple(self.linhas))
+
+
+def comparar(antiga, nova):
+    """Células diferentes entre duas versões, como (row, turno, antes, depois).
+
+    Aceita ``Escala`` ou ``Versao``; as duas precisam ser do mesmo mês.
+    """
+    if not isinstance(antiga, Versao):
+        antiga = Versao(antiga)
+    if not isinstance(nova, Versao):
+        nova = Versao(nova)
+    a, b = antiga.escala, nova.escala
+    if (a.mes, a.ano) != (b.mes, b.ano):
+        raise ValueError("Só é possível comparar versões do mesmo mês")
+
+    n = len(TURNOS)
+    mesma_tabela = a.nomes is b.nomes
+    if mesma_tabela and antiga.hash == nova.hash and a.celulas == b.celulas:
+        return []
+
+    alteracoes = []
+    for row in range(a.num_dias):
+        # Com tabelas diferentes os ids não se comparam: cada turno é comparado pelo nome.
+        if mesma_tabela and antiga.linhas[row] == nova.linhas[row]:
+            base = row * n
+            if a.celulas[base:base + n] == b.celulas[base:base + n]:
+                continue
+        for turno in range(n):
+            antes, depois = a.medico(row, turno), b.medico(row, turno)
+            if antes != depois:
+                alteracoes.append((row, turno, antes, depois))
+    return alteracoes
+
+
+def feriados_alterados(antiga, nova):
+    """Datas marcadas e desmarcadas como feriado entre duas versões."""
+    if isinstance(antiga, Versao):
+        antiga = antiga.escala
+    if isinstance(nova, Versao):
+        nova = nova.escala
+    return sorted(nova.feriados - antiga.feriados), sorted(antiga.feriados - nova.feriados)
+
+
+class CadeiaVersoes:
+    """Versões salvas de um mês numa unidade, da mais antiga à mais recente."""
+
+    def __init__(self, indice, ano, mes):
+        self.indice = indice
+        self.ano = ano
+        self.mes = mes
+        self.arquivos = indice.versoes(ano, mes)
+        self.nomes = TabelaNomes()
+
+    def versao(self, arquivo):
+        """Versão lida do arquivo, ou ``None`` se ele não puder ser lido."""
+        try:
+            escala = ler_escala(self.indice.caminho(arquivo), self.nomes)
+        except ERROS_LEITURA:
+            return None
+        return Versao(escala, arquivo)
+
+    def passos(self):
+        """(arquivo anterior, arquivo, alterações, feriados) de cada versão para a seguinte.
+
+        Só duas versões ficam em memória de cada vez. Uma versão ilegível
+        gera um passo com alterações e feriados ``None`` e é pulada: a
+        seguinte é comparada com a última versão lida.
+        """
+        anterior = None
+        for arquivo in self.arquivos:
+            atual = self.versao(arquivo)
+            if atual is None:
+                yield anterior.arquivo if anterior else None, arquivo, None, None
+                continue
+            if anterior is not None:
+                yield (anterior.arquivo, arquivo, comparar(anterior, atual),
+                       feriados_alterados(anterior, atual))
+            anterior = atual
+
+
+def linhas_relatorio(escala, alteracoes, feriados=((), ()), versao=''):
+    """Linhas do relatório de alterações (ver ``CABECALHOS_ALTERACOES``)."""
+    adicionados, removidos = feriados
+    linhas = [(versao, data, "Feriado", "", "marcado") for data in adicionados]
+    linhas.extend((versao, data, "Feriado", "marcado", "") for data in removidos)
+    linhas.sort(key=lambda linha: linha[1])
+    for row, turno, antes, depois in alteracoes:
+        linhas.append((versao, escala.data_texto(row), CABECALHOS[COLUNAS_FIXAS + turno],
+                       antes, depois))
+    return linhas
+
+
+def relatorio_cadeia(cadeia):
+    # As datas só dependem de mês/ano: uma escala vazia do mês basta para formatá-las.
+    referencia = Escala(cadeia.mes, cadeia.ano, nomes=cadeia.nomes)
+    linhas = []
+    for _, arquivo, alteracoes, feriados in cadeia.passos():
+        if alteracoes is None:
+            linhas.append((Path(arquivo).stem, "", "Arquivo", "", "ilegível"))
+            continue
+        linhas.extend(linhas_relatorio(referencia, alteracoes, feriados, Path(arquivo).stem))
+    return linhas
+
+
+def salvar_csv(linhas, caminho):
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CABECALHOS_ALTERACOES)
+        writer.writerows(linhas)
+
+
+def executar_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Alterações entre as versões salvas de uma escala.")
+    parser.add_argument('--mes', type=int, required=True)
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--unidade', default=UNIDADE_PADRAO,
+                        help=f"unidade da escala (padrão: {UNIDADE_PADRAO})")
+    parser.add_argument('--csv', help="grava o relatório neste arquivo CSV")
+    args = parser.parse_args(argv)
+
+    indice = abrir_indice(args.unidade)
+    try:
+        indice.sincronizar()
+        cadeia = CadeiaVersoes(indice, args.ano, args.mes)
+        if len(cadeia.arquivos) < 2:
+            print(f"{len(cadeia.arquivos)} versão(ões) salva(s) de {args.mes:02d}/{args.ano}; "
+                  "nada a comparar", file=sys.stderr)
+            return 1
+        linhas = relatorio_cadeia(cadeia)
+    finally:
+        indice.close()
+
+    if args.csv:
+        salvar_csv(linhas, args.csv)
+        print(f"relatório gravado em {args.csv}")
+        return 0
+    print(f"{'Versão':<34}{'Data':<12}{'Turno':<9}{'Antes':<25}Depois")
+    for versao, data, turno, antes, depois in linhas:
+        print(f"{versao:<34}{data:<12}{turno:<9}{antes or '-':<25}{depois or '-'}")
+    print(f"\n{len(cadeia.arquivos)} versões, {len(linhas)} alterações")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(executar_cli())